@@ -0,0 +1,588 @@
+"""Acesso às APIs externas (Groq, Replicate, downloads), compartilhado pelos bots v2 e v3.
+
+HTTPClient reaproveita conexões e repete falhas transitórias; CircuitBreakerRegistry
+pula provedores fora do ar e ReplicatePredictionTracker espera as previsões do
+Replicate (webhook ou consultas). Um de cada por processo (get_http_client,
+get_circuit_breakers, get_replicate_tracker).
+"""
+import os
+import re
+import json
+import time
+import random
+import logging
+import threading
+import requests
+
+
+class HTTPClient:
+    """Cliente HTTP compartilhado para as APIs externas (Groq, Replicate, downloads).
+
+    Uma `requests.Session` mantém conexões keep-alive por host (sem novo
+    handshake TCP+TLS a cada chamada). Falhas transitórias (erro de conexão,
+    timeout, 429/5xx) são repetidas com backoff exponencial com jitter, sem
+    passar do prazo total da chamada (`deadline`). A latência de cada tentativa
+    vai para um histograma por rótulo.
+    """
+
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+    # Limites superiores (segundos) dos baldes do histograma de latência
+    LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, float('inf'))
+
+    def __init__(self, pool_maxsize=10, retries=3, backoff_base=0.5, backoff_max=8.0):
+        from requests.adapters import HTTPAdapter
+
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=pool_maxsize)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.lock = threading.Lock()
+        self.histograms = {}
+
+    def backoff_delay(self, attempt, response=None):
+        """Espera antes da próxima tentativa: Retry-After do servidor ou backoff com jitter total"""
+        if response is not None:
+            retry_after = response.headers.get('Retry-After', '')
+            if retry_after.isdigit():
+                return min(float(retry_after), self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def record(self, label, elapsed, failed):
+        with self.lock:
+            histogram = self.histograms.setdefault(label, {
+                'counts': [0] * len(self.LATENCY_BUCKETS), 'total': 0, 'errors': 0, 'sum': 0.0, 'max': 0.0
+            })
+            for i, bound in enumerate(self.LATENCY_BUCKETS):
+                if elapsed <= bound:
+                    histogram['counts'][i] += 1
+                    break
+            histogram['total'] += 1
+            histogram['sum'] += elapsed
+            histogram['max'] = max(histogram['max'], elapsed)
+            if failed:
+                histogram['errors'] += 1
+
+    def request(self, method, url, label=None, timeout=15, deadline=None, retries=None, **kwargs):
+        """Faz a requisição com novas tentativas; a resposta final (mesmo 4xx/5xx) é devolvida.
+
+        `timeout` vale para cada tentativa e `deadline` (segundos) para a chamada
+        inteira, incluindo as esperas. Exceções de rede só sobem depois da
+        última tentativa.
+        """
+        from urllib.parse import urlsplit
+
+        label = label or urlsplit(url).hostname
+        retries = self.retries if retries is None else retries
+        deadline_at = time.monotonic() + (deadline if deadline is not None else float('inf'))
+
+        attempt = 0
+        while True:
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                raise requests.Timeout(f"Prazo de {deadline}s esgotado para {label}")
+
+            response = None
+            error = None
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, timeout=min(timeout, remaining), **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            failed = error is not None or response.status_code in self.RETRY_STATUSES
+            self.record(label, time.perf_counter() - started, failed)
+
+            if not failed:
+                return response
+
+            delay = self.backoff_delay(attempt, response)
+            if attempt >= retries or time.monotonic() + delay >= deadline_at:
+                if error is not None:
+                    raise error
+                return response
+
+            reason = str(error) if error is not None else f"HTTP {response.status_code}"
+            logging.warning(f"⚠️ {label}: {reason}, nova tentativa em {delay:.1f}s ({attempt + 1}/{retries})")
+            if response is not None:
+                response.close()
+            time.sleep(delay)
+            attempt += 1
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def download(self, url, part_path, expected_sha256=None, label='download', max_resumes=5,
+                 chunk_size=64 * 1024, timeout=30, deadline=60, cancel_event=None):
+        """Baixa `url` para `part_path` em partes; True se o arquivo ficou completo e íntegro.
+
+        Se a conexão cair, o download é retomado de onde parou com um cabeçalho
+        Range (o que já está em `part_path` também é retomado). Tamanho e hash
+        (expected_sha256 ou o ETag MD5, quando o servidor fornece) são conferidos
+        no fim; um arquivo corrompido é apagado. A memória não depende do tamanho.
+        Um bloco incompleto se perde na queda, então `chunk_size` limita o que é
+        baixado de novo. Com `cancel_event` definido, o download para no bloco
+        seguinte e o .part é apagado.
+        """
+        expected_size = None
+        etag = None
+
+        for attempt in range(max_resumes + 1):
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+            headers = {'Range': f'bytes={offset}-'} if offset else {}
+            try:
+                response = self.get(url, label=label, headers=headers, stream=True, timeout=timeout, deadline=deadline)
+                with response:
+                    if response.status_code == 416 and offset:
+                        # Nada a partir do offset: o .part já está completo (ou é inválido)
+                        total = response.headers.get('Content-Range', '').rpartition('/')[2]
+                        expected_size = int(total) if total.isdigit() else offset
+                        break
+                    if response.status_code == 206:
+                        total = response.headers.get('Content-Range', '').rpartition('/')[2]
+                        expected_size = int(total) if total.isdigit() else None
+                        mode = 'ab'
+                    elif response.status_code == 200:
+                        # Servidor ignorou o Range: recomeçar do zero
+                        length = response.headers.get('Content-Length', '')
+                        expected_size = int(length) if length.isdigit() else None
+                        mode = 'wb'
+                    else:
+                        logging.error(f"❌ Erro no download: HTTP {response.status_code}")
+                        return False
+
+                    etag = response.headers.get('ETag', '').strip('"') or etag
+                    with open(part_path, mode) as f:
+                        for chunk in response.iter_content(chunk_size=chunk_size):
+                            if cancel_event is not None and cancel_event.is_set():
+                                break
+                            f.write(chunk)
+                break
+
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+                received = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+                if attempt == max_resumes:
+                    logging.error(f"❌ Erro no download: {str(e)}")
+                    return False
+                logging.warning(f"⚠️ Download interrompido em {received / 1024 ** 2:.1f} MB, retomando ({attempt + 1}/{max_resumes}): {str(e)[:80]}")
+            except Exception as e:
+                logging.error(f"❌ Erro no download: {str(e)}")
+                return False
+
+        if cancel_event is not None and cancel_event.is_set():
+            logging.info("🛑 Download cancelado")
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            return False
+        if not self.verify_file(part_path, expected_size, expected_sha256, etag):
+            os.remove(part_path)
+            return False
+        return True
+
+    @staticmethod
+    def verify_file(path, expected_size=None, expected_sha256=None, etag=None, chunk_size=1024 * 1024):
+        """Confere tamanho e hash do arquivo baixado (lido em partes, memória constante)"""
+        import hashlib
+
+        size = os.path.getsize(path)
+        if size == 0 or (expected_size is not None and size != expected_size):
+            logging.error(f"❌ Download incompleto: {size} de {expected_size} bytes")
+            return False
+
+        # ETag de 32 hex sem sufixo (upload simples no S3/GCS) é o MD5 do conteúdo
+        check_md5 = etag is not None and re.fullmatch(r'[0-9a-fA-F]{32}', etag) is not None
+        if expected_sha256 is None and not check_md5:
+            return True
+
+        sha256 = hashlib.sha256()
+        md5 = hashlib.md5()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                if expected_sha256 is not None:
+                    sha256.update(chunk)
+                if check_md5:
+                    md5.update(chunk)
+
+        if expected_sha256 is not None and sha256.hexdigest() != expected_sha256.lower():
+            logging.error("❌ Download corrompido: SHA-256 não confere")
+            return False
+        if check_md5 and md5.hexdigest() != etag.lower():
+            logging.error("❌ Download corrompido: MD5 não confere com o ETag")
+            return False
+        return True
+
+    def percentile(self, label, fraction):
+        """Estimativa do percentil pelo limite superior do balde, nunca acima do máximo observado"""
+        histogram = self.histograms.get(label)
+        if not histogram or not histogram['total']:
+            return None
+        target = fraction * histogram['total']
+        cumulative = 0
+        for bound, count in zip(self.LATENCY_BUCKETS, histogram['counts']):
+            cumulative += count
+            if cumulative >= target:
+                return min(bound, histogram['max'])
+        return histogram['max']
+
+    def log_latency_summary(self):
+        with self.lock:
+            labels = sorted(self.histograms)
+        for label in labels:
+            histogram = self.histograms[label]
+            mean = histogram['sum'] / histogram['total']
+            logging.info(
+                f"🌐 {label}: {histogram['total']} chamadas, {histogram['errors']} falhas, "
+                f"média {mean:.2f}s, p50 ≤{self.percentile(label, 0.5):.2f}s, p95 ≤{self.percentile(label, 0.95):.2f}s"
+            )
+
+
+# Um cliente por processo: as conexões abertas são reaproveitadas entre jobs
+_http_client = None
+_http_client_lock = threading.Lock()
+
+
+def get_http_client():
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None:
+            _http_client = HTTPClient()
+        return _http_client
+
+
+class CircuitBreakerRegistry:
+    """Disjuntores por provedor externo (Groq, Replicate), com estado persistido em disco.
+
+    Após `failure_threshold` falhas seguidas o circuito abre e o provedor é
+    pulado na hora, sem pagar timeouts. Passado o `cooldown`, ou quando a sonda
+    de saúde em segundo plano responde, o circuito fica semiaberto: a próxima
+    chamada real decide se ele fecha ou abre de novo. As transições vão para o
+    log e são contadas para o resumo do job.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, state_path='circuit_breakers.json', failure_threshold=3, cooldown=600, probe_interval=60):
+        self.state_path = state_path
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.probe_interval = probe_interval
+        self.lock = threading.RLock()
+        self.states = self._load()
+        self.transitions = {}
+        self.probes = {}
+        self.probe_thread = None
+
+    def _load(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logging.warning(f"⚠️ Estado dos disjuntores ilegível, começando fechados: {str(e)}")
+            return {}
+
+    def _save(self):
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.states, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def _state(self, provider):
+        return self.states.setdefault(provider, {'state': self.CLOSED, 'failures': 0, 'opened_at': 0.0})
+
+    def _transition(self, provider, new_state):
+        state = self._state(provider)
+        old_state = state['state']
+        state['state'] = new_state
+        if new_state == self.OPEN:
+            state['opened_at'] = time.time()
+        elif new_state == self.CLOSED:
+            state['failures'] = 0
+        self._save()
+        if old_state == new_state:
+            return
+
+        key = f"{provider}: {old_state} -> {new_state}"
+        self.transitions[key] = self.transitions.get(key, 0) + 1
+        if new_state == self.OPEN:
+            logging.warning(f"🔌 Circuito {key} ({state['failures']} falhas, pausa de {self.cooldown}s)")
+        else:
+            logging.info(f"🔌 Circuito {key}")
+
+    def allow(self, provider):
+        """True se o provedor pode ser chamado agora"""
+        with self.lock:
+            state = self._state(provider)
+            if state['state'] == self.OPEN and time.time() - state['opened_at'] >= self.cooldown:
+                self._transition(provider, self.HALF_OPEN)
+            return state['state'] != self.OPEN
+
+    def record_success(self, provider):
+        with self.lock:
+            state = self._state(provider)
+            if state['state'] != self.CLOSED or state['failures']:
+                self._transition(provider, self.CLOSED)
+
+    def record_failure(self, provider):
+        with self.lock:
+            state = self._state(provider)
+            state['failures'] += 1
+            if state['state'] == self.HALF_OPEN or state['failures'] >= self.failure_threshold:
+                self._transition(provider, self.OPEN)
+            else:
+                self._save()
+
+    def register_probe(self, provider, probe):
+        """Sonda de saúde (função sem argumentos que retorna True/False) para circuitos abertos"""
+        with self.lock:
+            self.probes[provider] = probe
+            if self.probe_thread is None:
+                self.probe_thread = threading.Thread(target=self._probe_loop, daemon=True)
+                self.probe_thread.start()
+
+    def _probe_loop(self):
+        while True:
+            time.sleep(self.probe_interval)
+            with self.lock:
+                open_providers = [(provider, probe) for provider, probe in self.probes.items()
+                                  if self._state(provider)['state'] == self.OPEN]
+            for provider, probe in open_providers:
+                try:
+                    healthy = probe()
+                except Exception:
+                    healthy = False
+                if healthy:
+                    with self.lock:
+                        if self._state(provider)['state'] == self.OPEN:
+                            logging.info(f"🩺 {provider} respondeu à sonda de saúde")
+                            self._transition(provider, self.HALF_OPEN)
+
+    def log_summary(self):
+        with self.lock:
+            for provider, state in sorted(self.states.items()):
+                logging.info(f"🔌 {provider}: {state['state']} ({state['failures']} falhas seguidas)")
+            for key, count in sorted(self.transitions.items()):
+                logging.info(f"🔌 Transições {key}: {count}")
+
+
+# Um conjunto de disjuntores por processo, compartilhado entre jobs e threads
+_circuit_breakers = None
+_circuit_breakers_lock = threading.Lock()
+
+
+def get_circuit_breakers():
+    global _circuit_breakers
+    with _circuit_breakers_lock:
+        if _circuit_breakers is None:
+            _circuit_breakers = CircuitBreakerRegistry()
+        return _circuit_breakers
+
+
+class ReplicatePredictionTracker:
+    """Acompanha previsões do Replicate até terminarem.
+
+    Com `webhook_port` e `webhook_secret` definidos, um servidor HTTP embutido
+    recebe os webhooks de conclusão, só aceitando os assinados com o segredo. Ele
+    escuta em `webhook_host` (127.0.0.1 por padrão) e o Replicate o alcança pela
+    `public_url` (ex.: túnel ou proxy reverso na mesma máquina). A espera acorda
+    no instante em que o webhook chega; sem ele, o status é consultado com
+    intervalo adaptativo: rápido no início, depois crescendo até `poll_max`. Várias previsões podem ser acompanhadas ao mesmo
+    tempo, cada uma esperada por sua própria thread.
+    """
+
+    TERMINAL_STATUSES = ('succeeded', 'failed', 'canceled')
+    WEBHOOK_PATH = '/replicate/webhook'
+
+    def __init__(self, http, api_key, api_base='https://api.replicate.com/v1', webhook_port=None, public_url=None,
+                 webhook_secret=None, webhook_host='127.0.0.1', poll_initial=1.0, poll_factor=1.5, poll_max=15.0):
+        self.http = http
+        self.api_key = api_key
+        self.api_base = api_base.rstrip('/')
+        self.public_url = public_url.rstrip('/') if public_url else None
+        self.webhook_key = self.decode_secret(webhook_secret) if webhook_secret else None
+        self.poll_initial = poll_initial
+        self.poll_factor = poll_factor
+        self.poll_max = poll_max
+        self.lock = threading.Lock()
+        self.predictions = {}
+        self.server = None
+        if webhook_port is not None:
+            if self.webhook_key:
+                self._start_receiver(webhook_host, webhook_port)
+            else:
+                # Sem segredo qualquer um que alcance a porta forjaria um vídeo "pronto"
+                logging.warning("⚠️ Webhooks do Replicate sem segredo de assinatura válido: receptor desativado, usando consultas")
+
+    @staticmethod
+    def decode_secret(secret):
+        """Chave HMAC do segredo 'whsec_<base64>' (None se o segredo for inválido)"""
+        import base64
+        import binascii
+
+        try:
+            return base64.b64decode(secret.split('_', 1)[-1], validate=True) or None
+        except (binascii.Error, ValueError):
+            logging.error("❌ Segredo de webhook do Replicate inválido (esperado whsec_<base64>)")
+            return None
+
+    def _start_receiver(self, host, port):
+        from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+        tracker = self
+
+        class _WebhookHandler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                try:
+                    body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                except ValueError:
+                    self.send_response(400)
+                    self.end_headers()
+                    return
+                if self.path.split('?')[0] != tracker.WEBHOOK_PATH or not tracker.verify_signature(self.headers, body):
+                    self.send_response(404 if self.path.split('?')[0] != tracker.WEBHOOK_PATH else 401)
+                    self.end_headers()
+                    return
+                try:
+                    tracker.update(json.loads(body))
+                    self.send_response(200)
+                except (ValueError, KeyError):
+                    self.send_response(400)
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            self.server = ThreadingHTTPServer((host, port), _WebhookHandler)
+        except OSError as e:
+            logging.warning(f"⚠️ Receptor de webhooks indisponível na porta {port}: {str(e)}")
+            return
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        logging.info(f"📡 Receptor de webhooks do Replicate em {host}:{self.server.server_port}")
+
+    def verify_signature(self, headers, body):
+        """Confere a assinatura do webhook (webhook-id.webhook-timestamp.corpo, HMAC-SHA256)"""
+        if not self.webhook_key:
+            return False
+
+        import base64
+        import hashlib
+        import hmac
+
+        webhook_id = headers.get('webhook-id', '')
+        timestamp = headers.get('webhook-timestamp', '')
+        if not timestamp.isdigit() or abs(time.time() - int(timestamp)) > 300:
+            return False
+
+        signed = f"{webhook_id}.{timestamp}.".encode('utf-8') + body
+        expected = base64.b64encode(hmac.new(self.webhook_key, signed, hashlib.sha256).digest()).decode('ascii')
+        signatures = [item.split(',', 1)[-1] for item in headers.get('webhook-signature', '').split()]
+        return any(hmac.compare_digest(expected, signature) for signature in signatures)
+
+    def webhook_url(self):
+        """URL a enviar na criação da previsão (None se o receptor não estiver ativo)"""
+        if self.server is None or not self.public_url:
+            return None
+        return f"{self.public_url}{self.WEBHOOK_PATH}"
+
+    def track(self, prediction_id):
+        with self.lock:
+            return self.predictions.setdefault(prediction_id, {'done': threading.Event(), 'prediction': None})
+
+    def update(self, prediction):
+        """Registra um estado recebido (webhook ou consulta) e acorda quem espera.
+
+        Só previsões já acompanhadas: ids desconhecidos são ignorados.
+        """
+        with self.lock:
+            entry = self.predictions.get(prediction['id'])
+        if entry is None:
+            return
+        entry['prediction'] = prediction
+        if prediction.get('status') in self.TERMINAL_STATUSES:
+            entry['done'].set()
+
+    def poll(self, prediction_id):
+        response = self.http.get(
+            f"{self.api_base}/predictions/{prediction_id}", label='replicate',
+            headers={"Authorization": f"Token {self.api_key}"}, timeout=15, deadline=30
+        )
+        if response.status_code == 200:
+            self.update(response.json())
+
+    def cancel(self, prediction_id):
+        """Cancela a previsão na API (melhor esforço: ela pode já ter terminado)"""
+        try:
+            self.http.post(
+                f"{self.api_base}/predictions/{prediction_id}/cancel", label='replicate',
+                headers={"Authorization": f"Token {self.api_key}"}, timeout=10, deadline=15, retries=0
+            )
+            logging.info(f"🛑 Previsão {prediction_id} cancelada")
+        except Exception as e:
+            logging.warning(f"⚠️ Erro ao cancelar previsão {prediction_id}: {str(e)}")
+
+    def wait(self, prediction_id, timeout=900, cancel_event=None):
+        """Espera a previsão terminar; retorna o último estado conhecido, ou None no timeout ou cancelamento"""
+        entry = self.track(prediction_id)
+        deadline = time.monotonic() + timeout
+        interval = self.poll_initial
+        next_poll = time.monotonic() + interval
+        last_status = None
+
+        try:
+            while not entry['done'].is_set():
+                now = time.monotonic()
+                if now >= deadline:
+                    return None
+                if cancel_event is not None and cancel_event.is_set():
+                    self.cancel(prediction_id)
+                    return None
+
+                # Acorda antes se o webhook chegar; com cancelamento possível, confere a cada segundo
+                timeout_slice = min(next_poll, deadline) - now
+                if cancel_event is not None:
+                    timeout_slice = min(timeout_slice, 1.0)
+                if entry['done'].wait(max(timeout_slice, 0)):
+                    break
+                if time.monotonic() < next_poll:
+                    continue
+
+                try:
+                    self.poll(prediction_id)
+                except Exception as e:
+                    logging.warning(f"⚠️ Erro ao verificar status: {str(e)}")
+
+                status = (entry['prediction'] or {}).get('status', 'unknown')
+                if status != last_status:
+                    logging.info(f"⏳ Status: {status}...")
+                    last_status = status
+                interval = min(interval * self.poll_factor, self.poll_max)
+                next_poll = time.monotonic() + interval
+
+            return entry['prediction']
+        finally:
+            with self.lock:
+                self.predictions.pop(prediction_id, None)
+
+
+# Um receptor por processo: a porta do webhook não pode ser aberta duas vezes
+_replicate_tracker = None
+_replicate_tracker_lock = threading.Lock()
+
+
+def get_replicate_tracker(http, api_key, **kwargs):
+    global _replicate_tracker
+    with _replicate_tracker_lock:
+        if _replicate_tracker is None:
+            _replicate_tracker = ReplicatePredictionTracker(http, api_key, **kwargs)
+        return _replicate_tracker
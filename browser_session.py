@@ -0,0 +1,640 @@
+"""Sessão do Instagram no Chrome, compartilhada pelos bots v1, v2 e v3.
+
+Cada conta usa um diretório de perfil próprio do Chrome (browser_profiles/<conta>)
+e um snapshot dos cookies. Uma execução "quente" já abre logada e vai direto
+para o fluxo de criação; o login por formulário só roda quando a sessão expirou.
+BrowserPool mantém esses navegadores abertos entre os jobs agendados (um por
+conta) e
+PageWaiter troca os sleeps fixos do fluxo por esperas de condição da página e
+SelectorStats lembra qual seletor acertou em cada etapa (selector_stats.json) e
+probe_elements testa todos os seletores de uma etapa numa só chamada ao navegador.
+"""
+import os
+import re
+import json
+import time
+import random
+import atexit
+import logging
+import threading
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import (TimeoutException, NoSuchElementException, StaleElementReferenceException,
+                                        JavascriptException)
+
+INSTAGRAM_URL = "https://www.instagram.com/"
+
+
+def chrome_options(profile_dir=None, headless_safe=True):
+    """Opções padrão do Chrome dos bots; com profile_dir, o perfil (cookies, cache) persiste"""
+    options = Options()
+    if headless_safe:
+        options.add_argument("--no-sandbox")
+        options.add_argument("--disable-dev-shm-usage")
+        options.add_argument("--disable-gpu")
+    if profile_dir:
+        options.add_argument(f"--user-data-dir={os.path.abspath(profile_dir)}")
+    return options
+
+
+# Conta as requisições fetch/XHR iniciadas (o Resource Timing só registra as concluídas)
+_NETWORK_STATE_SCRIPT = """
+if (!window.__botNetwork) {
+    const state = window.__botNetwork = {started: 0};
+    const originalFetch = window.fetch;
+    if (originalFetch) {
+        window.fetch = function() { state.started++; return originalFetch.apply(this, arguments); };
+    }
+    const originalSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function() { state.started++; return originalSend.apply(this, arguments); };
+}
+return [document.readyState, window.__botNetwork.started, performance.getEntriesByType('resource').length];
+"""
+
+
+def page_ready(driver):
+    """Condição: documento completamente carregado"""
+    return driver.execute_script("return document.readyState") == 'complete'
+
+
+class network_idle:
+    """Condição: documento carregado e nenhuma requisição nova iniciada ou concluída por `quiet` segundos.
+
+    Conexões longas (long polling, websockets) já abertas não impedem o ocioso.
+    """
+
+    def __init__(self, quiet=1.0):
+        self.quiet = quiet
+        self.last_state = None
+        self.stable_since = None
+
+    def __call__(self, driver):
+        ready_state, started, finished = driver.execute_script(_NETWORK_STATE_SCRIPT)
+        state = (started, finished)
+        now = time.monotonic()
+        if ready_state != 'complete' or state != self.last_state:
+            self.last_state = state
+            self.stable_since = now
+            return False
+        return now - self.stable_since >= self.quiet
+
+
+class PageWaiter:
+    """Esperas por condição da página no lugar de time.sleep fixos.
+
+    `until` retorna assim que a condição é satisfeita (ou no timeout) e soma um
+    pequeno atraso aleatório humano (`jitter`, None desliga) que conta dentro do
+    timeout: com o timeout no limite superior do sleep antigo, o pior caso nunca
+    passa dele. Cada etapa registra o tempo real gasto e o sleep
+    fixo que ela substituiu; `log_summary` mostra o tempo morto eliminado.
+    """
+
+    def __init__(self, jitter=(0.3, 1.2), poll_frequency=0.25, log=logging.info):
+        self.jitter = jitter
+        self.poll_frequency = poll_frequency
+        self.log = log
+        self.steps = []
+
+    def until(self, driver, step, condition, timeout, fixed=0.0):
+        """Espera `condition` por até `timeout`s (jitter incluído); `fixed` é a média do sleep que a etapa substituiu"""
+        jitter = random.uniform(*self.jitter) if self.jitter else 0.0
+        started = time.perf_counter()
+        try:
+            WebDriverWait(driver, max(timeout - jitter, self.poll_frequency), poll_frequency=self.poll_frequency,
+                          ignored_exceptions=(NoSuchElementException, StaleElementReferenceException)).until(condition)
+            met = True
+        except TimeoutException:
+            met = False
+        condition_time = time.perf_counter() - started
+        time.sleep(jitter)
+
+        self.steps.append({'step': step, 'condition': condition_time, 'jitter': jitter, 'fixed': fixed, 'met': met})
+        status = "condição atendida" if met else "timeout"
+        self.log(f"⏳ {step}: {condition_time + jitter:.1f}s ({status}; sleep fixo era ~{fixed:.0f}s)")
+        return met
+
+    def log_summary(self):
+        if not self.steps:
+            return
+        real = sum(s['condition'] + s['jitter'] for s in self.steps)
+        fixed = sum(s['fixed'] for s in self.steps)
+        self.log(f"⏳ Esperas: {real:.1f}s reais contra ~{fixed:.0f}s de sleeps fixos ({fixed - real:+.1f}s de tempo morto eliminado)")
+        for s in self.steps:
+            self.log(f"   {s['step']}: condição {s['condition']:.1f}s + jitter {s['jitter']:.1f}s "
+                     f"(fixo ~{s['fixed']:.0f}s){'' if s['met'] else ' [timeout]'}")
+
+
+# Procura todos os candidatos de uma vez e devolve [índice, elemento] do primeiro (na ordem
+# dada) com um elemento visível e habilitado; sem nenhum, vigia o DOM até o timeout
+_PROBE_SCRIPT = """
+const candidates = arguments[0];
+const timeoutMs = arguments[1];
+const done = arguments[arguments.length - 1];
+
+function usable(el) {
+    if (el.nodeType !== 1 || el.disabled || el.getAttribute('aria-disabled') === 'true') return false;
+    const style = window.getComputedStyle(el);
+    if (style.visibility === 'hidden' || style.display === 'none') return false;
+    const rect = el.getBoundingClientRect();
+    return rect.width > 0 && rect.height > 0;
+}
+
+function find() {
+    for (let i = 0; i < candidates.length; i++) {
+        const [using, selector] = candidates[i];
+        let nodes;
+        if (using === 'xpath') {
+            const snapshot = document.evaluate(selector, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            nodes = Array.from({length: snapshot.snapshotLength}, (_, j) => snapshot.snapshotItem(j));
+        } else {
+            nodes = document.querySelectorAll(selector);
+        }
+        for (const node of nodes) {
+            if (usable(node)) return [i, node];
+        }
+    }
+    return null;
+}
+
+const found = find();
+if (found || timeoutMs <= 0) {
+    done(found);
+    return;
+}
+
+let finished = false;
+let scheduled = false;
+const finish = (result) => {
+    if (finished) return;
+    finished = true;
+    observer.disconnect();
+    clearInterval(interval);
+    clearTimeout(timer);
+    done(result);
+};
+const check = () => {
+    scheduled = false;
+    const result = find();
+    if (result) finish(result);
+};
+const observer = new MutationObserver(() => {
+    if (!scheduled) {
+        scheduled = true;
+        setTimeout(check, 50);
+    }
+});
+observer.observe(document.documentElement, {childList: true, subtree: true, attributes: true, characterData: true});
+// Transições de CSS mudam a visibilidade sem mutar o DOM
+const interval = setInterval(check, 500);
+const timer = setTimeout(() => finish(null), timeoutMs);
+"""
+
+
+def probe_elements(driver, candidates, timeout=0):
+    """Sonda vários seletores em uma única chamada ao navegador.
+
+    `candidates` é uma lista de (By.XPATH ou By.CSS_SELECTOR, seletor) em ordem de
+    prioridade. Retorna (índice, elemento) do primeiro candidato com um elemento
+    visível e habilitado, ou (None, None). Com `timeout` > 0, um MutationObserver
+    vigia a página até algum candidato aparecer: uma única espera limitada no
+    lugar de um timeout por seletor.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = max(deadline - time.monotonic(), 0)
+        driver.set_script_timeout(remaining + 5)
+        try:
+            found = driver.execute_async_script(_PROBE_SCRIPT, [list(c) for c in candidates], int(remaining * 1000))
+        except JavascriptException:
+            # A página navegou durante a espera: sonda de novo no documento novo
+            if remaining <= 0:
+                return None, None
+            time.sleep(0.2)
+            continue
+        if not found:
+            return None, None
+        return found[0], found[1]
+
+
+class SelectorStats:
+    """Estatísticas persistidas de quais seletores acertaram em cada etapa do fluxo.
+
+    `prioritized` põe o último vencedor da etapa na frente dos candidatos, de
+    modo que, numa sondagem em lote (`probe_elements`), ele ganha quando mais de
+    um candidato está na tela e o caso comum resolve na primeira verificação.
+    Um vencedor envelhece quando erra depois do último acerto ou quando esse
+    acerto tem mais de `max_age_days` dias; aí vale de novo a ordem original.
+    """
+
+    def __init__(self, state_path='selector_stats.json', max_age_days=14):
+        self.state_path = state_path
+        self.max_age = max_age_days * 86400
+        self.lock = threading.Lock()
+        self.steps = self._load()
+
+    def _load(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logging.warning(f"⚠️ Estatísticas de seletores ilegíveis, começando do zero: {str(e)}")
+            return {}
+
+    def _save(self):
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.steps, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def winner(self, step, selectors):
+        """Seletor que acertou por último na etapa, se ainda está entre os candidatos e não envelheceu"""
+        with self.lock:
+            stats = self.steps.get(step, {})
+            now = time.time()
+            best, best_hit = None, 0.0
+            for selector in selectors:
+                entry = stats.get(selector)
+                if not entry or entry['last_hit'] <= entry['last_miss'] or now - entry['last_hit'] > self.max_age:
+                    continue
+                if entry['last_hit'] > best_hit:
+                    best, best_hit = selector, entry['last_hit']
+            return best
+
+    def prioritized(self, step, selectors):
+        """Candidatos com o vencedor atual da etapa na frente"""
+        winner = self.winner(step, selectors)
+        if winner is None:
+            return list(selectors)
+        return [winner] + [selector for selector in selectors if selector != winner]
+
+    def record(self, step, selector, hit):
+        with self.lock:
+            entry = self.steps.setdefault(step, {}).setdefault(
+                selector, {'hits': 0, 'misses': 0, 'last_hit': 0.0, 'last_miss': 0.0})
+            if hit:
+                entry['hits'] += 1
+                entry['last_hit'] = time.time()
+            else:
+                entry['misses'] += 1
+                entry['last_miss'] = time.time()
+            try:
+                self._save()
+            except Exception as e:
+                logging.warning(f"⚠️ Não foi possível salvar as estatísticas de seletores: {str(e)}")
+
+    def record_probe(self, step, selectors, selector):
+        """Resultado de uma sondagem: `selector` acertou (None = nenhum); o vencedor anterior, se errou, envelhece"""
+        previous = self.winner(step, selectors)
+        if previous is not None and previous != selector:
+            self.record(step, previous, False)
+        if selector is not None:
+            self.record(step, selector, True)
+
+
+_selector_stats = None
+_selector_stats_lock = threading.Lock()
+
+
+def get_selector_stats():
+    global _selector_stats
+    with _selector_stats_lock:
+        if _selector_stats is None:
+            _selector_stats = SelectorStats()
+        return _selector_stats
+
+
+class InstagramSession:
+    """Login persistente de uma conta do Instagram.
+
+    Ordem de tentativa ao iniciar: perfil do Chrome já logado, snapshot de
+    cookies (se ainda válido) e, por último, o formulário de login, que grava
+    um snapshot novo.
+    """
+
+    def __init__(self, username, password, profile_root="browser_profiles", cookie_max_age_days=30, log=logging.info):
+        self.username = username
+        self.password = password
+        self.cookie_max_age = cookie_max_age_days * 86400
+        self.log = log
+
+        safe_name = re.sub(r'[^\w.-]', '_', username) or 'default'
+        self.profile_dir = os.path.join(profile_root, safe_name)
+        self.cookie_path = os.path.join(profile_root, f"{safe_name}.cookies.json")
+
+    def start_driver(self, headless_safe=True):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        return webdriver.Chrome(options=chrome_options(self.profile_dir, headless_safe))
+
+    def is_logged_in(self, driver):
+        """Cookie de sessão presente e nenhum formulário de login na página"""
+        if not driver.get_cookie('sessionid'):
+            return False
+        return not driver.find_elements(By.NAME, "username")
+
+    def save_cookies(self, driver):
+        data = {'saved_at': time.time(), 'cookies': driver.get_cookies()}
+        os.makedirs(os.path.dirname(self.cookie_path) or '.', exist_ok=True)
+        tmp_path = f"{self.cookie_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, self.cookie_path)
+
+    def load_cookies(self, driver):
+        """Restaura o snapshot de cookies; False se não existe ou já expirou"""
+        try:
+            with open(self.cookie_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return False
+
+        now = time.time()
+        session_cookie = next((c for c in data['cookies'] if c.get('name') == 'sessionid'), None)
+        if (now - data.get('saved_at', 0) > self.cookie_max_age or session_cookie is None
+                or session_cookie.get('expiry', now + 1) <= now):
+            return False
+
+        for cookie in data['cookies']:
+            # O ChromeDriver rejeita valores de sameSite fora destes três
+            if cookie.get('sameSite') not in ('Strict', 'Lax', 'None'):
+                cookie.pop('sameSite', None)
+            try:
+                driver.add_cookie(cookie)
+            except Exception:
+                continue
+        driver.refresh()
+        return True
+
+    def login_with_form(self, driver, wait, waiter=None):
+        """Fluxo de login original: formulário, espera pelo login e pop-up 'Not now'"""
+        waiter = waiter or PageWaiter(log=self.log)
+        username_field = driver.find_element(By.NAME, "username")
+        username_field.send_keys(self.username)
+        time.sleep(random.uniform(1, 3))
+
+        password_field = driver.find_element(By.NAME, "password")
+        password_field.send_keys(self.password)
+        time.sleep(random.uniform(1, 3))
+
+        login_button = driver.find_element(By.CSS_SELECTOR, 'button[type="submit"]')
+        login_button.click()
+        # Logado quando o formulário some e a página termina de carregar
+        waiter.until(driver, "login", EC.all_of(
+            EC.invisibility_of_element_located((By.NAME, "password")), page_ready
+        ), timeout=10, fixed=10)
+
+        # Lidar com pop-ups pós-login
+        try:
+            not_now_specific = wait.until(EC.element_to_be_clickable((
+                By.XPATH,
+                "//div[@role='button' and contains(@class, 'x1i10hfl') and text()='Not now']"
+            )))
+            not_now_specific.click()
+            self.log("✅ Clicou no botão 'Not now'!")
+            time.sleep(random.uniform(2, 4))
+        except TimeoutException:
+            self.log("Botão 'Not now' não encontrado...")
+
+    def ensure_logged_in(self, driver, wait, waiter=None):
+        """Abre o Instagram logado; retorna 'profile', 'cookies' ou 'form' conforme o caminho usado"""
+        waiter = waiter or PageWaiter(log=self.log)
+        started = time.perf_counter()
+        driver.get(INSTAGRAM_URL)
+        # O app renderiza depois do load: espera o formulário de login ou a navegação logada
+        waiter.until(driver, "página inicial", EC.any_of(
+            EC.presence_of_element_located((By.NAME, "username")),
+            EC.presence_of_element_located((By.CSS_SELECTOR, "nav, [role='navigation']"))
+        ), timeout=5, fixed=3.5)
+
+        if self.is_logged_in(driver):
+            method = 'profile'
+        elif self.load_cookies(driver) and self.is_logged_in(driver):
+            method = 'cookies'
+        else:
+            self.log("🔐 Sessão expirada ou inexistente, fazendo login...")
+            self.login_with_form(driver, wait, waiter)
+            method = 'form'
+
+        # Renova o snapshot a cada login para a validade contar a partir de agora
+        if method != 'profile':
+            try:
+                self.save_cookies(driver)
+            except Exception as e:
+                self.log(f"⚠️ Não foi possível salvar os cookies: {str(e)}")
+
+        self.log(f"🔐 Login via {method} em {time.perf_counter() - started:.1f}s")
+        return method
+
+
+class BrowserPool:
+    """Chromes pré-abertos e já logados, emprestados aos jobs e reaproveitados entre eles.
+
+    Cada conta tem seu próprio Chrome e perfil (contexto isolado: cookies e
+    armazenamento não se misturam). O Chrome trava o diretório de perfil, então o
+    pool tem exatamente um navegador por conta: jobs da mesma conta se revezam
+    nele, só contas diferentes rodam em paralelo. Depois de cada job o navegador
+    volta para a página inicial em segundo plano; ele é reciclado ao atingir
+    `max_uses` jobs, passar de `max_memory_mb` ou falhar na checagem de saúde
+    periódica, e um substituto é aberto logo em seguida. Enquanto um navegador
+    volta ou é reciclado, a conta fica em `returning` e quem pede espera: abrir
+    outro Chrome nesse intervalo esbarraria no perfil travado.
+    """
+
+    def __init__(self, max_uses=20, max_memory_mb=1500, health_interval=60, headless_safe=True, log=logging.info):
+        self.max_uses = max_uses
+        self.max_memory_mb = max_memory_mb
+        self.health_interval = health_interval
+        self.headless_safe = headless_safe
+        self.log = log
+        self.condition = threading.Condition()
+        self.sessions = {}
+        # idle: conta -> driver; leased e uses são indexados pelo próprio driver (um id()
+        # poderia ser reaproveitado por outro objeto depois que o driver reciclado fosse coletado)
+        self.idle = {}
+        self.leased = {}
+        self.uses = {}
+        self.launching = set()
+        self.returning = set()
+        self.launch_errors = {}
+        self.closed = False
+
+        threading.Thread(target=self._health_loop, daemon=True).start()
+        atexit.register(self.shutdown)
+
+    def warm(self, session):
+        """Abre e loga o Chrome da conta em segundo plano, se ainda não houver um"""
+        with self.condition:
+            self.sessions[session.username] = session
+            busy = (session.username in self.idle or session.username in self.returning
+                    or session.username in self.leased.values())
+            if not self.closed and not busy and session.username not in self.launching:
+                self._start_launch(session)
+
+    def _start_launch(self, session):
+        self.launching.add(session.username)
+        self.launch_errors.pop(session.username, None)
+        threading.Thread(target=self._launch, args=(session,), daemon=True).start()
+
+    def _launch(self, session):
+        started = time.perf_counter()
+        driver = None
+        try:
+            driver = session.start_driver(self.headless_safe)
+            session.ensure_logged_in(driver, WebDriverWait(driver, 15))
+        except Exception as e:
+            self.log(f"⚠️ Falha ao abrir navegador para {session.username}: {str(e)[:100]}")
+            self._quit(driver)
+            with self.condition:
+                self.launching.discard(session.username)
+                self.launch_errors[session.username] = e
+                self.condition.notify_all()
+            return
+
+        self.log(f"🌐 Navegador pronto para {session.username} em {time.perf_counter() - started:.1f}s")
+        with self.condition:
+            self.launching.discard(session.username)
+            if self.closed:
+                self._quit(driver)
+                return
+            self.uses[driver] = 0
+            self.idle[session.username] = driver
+            self.condition.notify_all()
+
+    def lease(self, session, timeout=180):
+        """Empresta o navegador da conta, esperando ele ficar pronto se preciso"""
+        username = session.username
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            self.sessions[username] = session
+            while True:
+                driver = self.idle.pop(username, None)
+                if driver is not None:
+                    self.leased[driver] = username
+                    self.log(f"♻️ Navegador reaproveitado ({self.uses[driver]} usos anteriores)")
+                    return driver
+                if username in self.launch_errors:
+                    raise self.launch_errors.pop(username)
+                if username not in self.launching and username not in self.returning:
+                    self._start_launch(session)
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"Navegador de {username} não ficou pronto em {timeout}s")
+                self.condition.wait(remaining)
+
+    def release(self, driver, healthy=True):
+        """Devolve o navegador; a volta para a página inicial e a reciclagem rodam em segundo plano"""
+        with self.condition:
+            username = self.leased.pop(driver, None)
+            if username is not None:
+                self.uses[driver] += 1
+                self.returning.add(username)
+        if username is None:
+            self._quit(driver)
+            return
+        threading.Thread(target=self._return, args=(username, driver, healthy), daemon=True).start()
+
+    def _return(self, username, driver, healthy):
+        reason = None
+        if not healthy:
+            reason = "erro no job"
+        elif self.uses[driver] >= self.max_uses:
+            reason = f"{self.uses[driver]} usos"
+        else:
+            memory_mb = self.memory_mb(driver)
+            if memory_mb > self.max_memory_mb:
+                reason = f"{memory_mb:.0f} MB de memória"
+            else:
+                try:
+                    # Pré-navegar: o próximo job já encontra a página inicial carregada
+                    driver.get(INSTAGRAM_URL)
+                except Exception:
+                    reason = "não respondeu"
+
+        if reason is not None:
+            self._recycle(username, driver, reason)
+            return
+
+        with self.condition:
+            self.returning.discard(username)
+            self.condition.notify_all()
+            if self.closed:
+                self._quit(driver)
+                return
+            self.idle[username] = driver
+
+    def _recycle(self, username, driver, reason):
+        """Fecha o navegador (a conta já está em `returning`) e abre o substituto"""
+        self.log(f"🔄 Reciclando navegador de {username}: {reason}")
+        self._quit(driver)
+        with self.condition:
+            self.uses.pop(driver, None)
+            self.returning.discard(username)
+            session = self.sessions.get(username)
+            # Na mesma seção crítica: ninguém abre outro Chrome entre o fim do quit e o substituto
+            if not self.closed and session is not None and username not in self.launching:
+                self._start_launch(session)
+            self.condition.notify_all()
+
+    @staticmethod
+    def memory_mb(driver):
+        """RSS do Chrome e de seus processos filhos (psutil) ou, sem ele, o heap JS da página"""
+        try:
+            import psutil
+
+            process = psutil.Process(driver.service.process.pid)
+            processes = [process] + process.children(recursive=True)
+            return sum(p.memory_info().rss for p in processes) / 1024 ** 2
+        except ImportError:
+            pass
+        except Exception:
+            return 0.0
+        try:
+            return (driver.execute_script("return performance.memory ? performance.memory.usedJSHeapSize : 0") or 0) / 1024 ** 2
+        except Exception:
+            return 0.0
+
+    def _health_loop(self):
+        while not self.closed:
+            time.sleep(self.health_interval)
+            with self.condition:
+                idle = list(self.idle.items())
+            for username, driver in idle:
+                try:
+                    driver.execute_script("return document.readyState")
+                    memory_mb = self.memory_mb(driver)
+                    reason = f"{memory_mb:.0f} MB de memória" if memory_mb > self.max_memory_mb else None
+                except Exception:
+                    reason = "falhou na checagem de saúde"
+                if reason is None:
+                    continue
+                with self.condition:
+                    # Só recicla se ninguém o pegou emprestado nesse meio tempo
+                    if self.idle.get(username) is not driver:
+                        continue
+                    del self.idle[username]
+                    self.returning.add(username)
+                self._recycle(username, driver, reason)
+
+    @staticmethod
+    def _quit(driver):
+        if driver is None:
+            return
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def shutdown(self):
+        with self.condition:
+            self.closed = True
+            drivers = list(self.idle.values())
+            self.idle.clear()
+            self.condition.notify_all()
+        for driver in drivers:
+            self._quit(driver)
@@ -0,0 +1,209 @@
+"""Normalização das legendas do Instagram, compartilhada pelos bots v1, v2 e v3.
+
+Substitui as várias passadas por caractere (unicodedata.category, ord) e o
+laço de str.replace por um único regex pré-compilado (a tabela de tradução
+de controle só é aplicada aos trechos removidos, para achar emojis do v1).
+A saída de `clean` é idêntica à das funções antigas de cada versão; `normalize`
+também aplica os limites de legenda do Instagram.
+
+Benchmark (compara com as implementações antigas e confere a saída):
+    python caption_normalizer.py [tamanho_do_corpus]
+"""
+import re
+import sys
+import time
+import random
+
+# Limites de legenda do Instagram
+INSTAGRAM_CAPTION_MAX_CHARS = 2200
+INSTAGRAM_CAPTION_MAX_HASHTAGS = 30
+
+# Categoria Unicode Cc (caracteres de controle) é exatamente U+0000–U+001F e U+007F–U+009F
+_CONTROL_CHARS = dict.fromkeys([*range(0x00, 0x20), *range(0x7F, 0xA0)])
+
+# Emojis convertidos em texto pelo v1
+V1_EMOJI_REPLACEMENTS = {
+    '🔥': '[fire]',
+    '💯': '[100]',
+    '✨': '[sparkles]',
+    '❤️': '[heart]',
+    '😍': '[heart_eyes]',
+    '🚀': '[rocket]',
+    '🎉': '[party]',
+    '💪': '[muscle]',
+    '👏': '[clap]',
+    '🌟': '[star]',
+    '📸': '[camera]',
+    '🎨': '[art]',
+    '💝': '[gift_heart]',
+    '🌈': '[rainbow]',
+    '⭐': '[star]',
+    '💎': '[diamond]',
+    '🔴': '[red_circle]',
+    '🟢': '[green_circle]',
+    '🔵': '[blue_circle]',
+    '⚡': '[lightning]',
+    '🎯': '[target]',
+    '💡': '[bulb]'
+}
+
+_HASHTAG = re.compile(r'#\w+')
+_REPEATED_SPACES = re.compile(r'[ ]{2,}')
+
+
+def _kept_character_class(allowed):
+    """Classe de regex com os caracteres que sobrevivem à limpeza antiga.
+
+    Equivale a: não ser de controle (Cc), estar no BMP e casar com [\\w\\s<allowed>].
+    Calculada uma vez com o próprio `re`, então \\w e \\s têm a mesma semântica
+    do regex antigo; fora do BMP nada é mantido.
+    """
+    permitted = re.compile(rf'[\w\s{allowed}]')
+    ranges = []
+    for code in range(0x10000):
+        if code in _CONTROL_CHARS or not permitted.match(chr(code)):
+            continue
+        if ranges and ranges[-1][1] == code - 1:
+            ranges[-1][1] = code
+        else:
+            ranges.append([code, code])
+    return ''.join(f'\\u{start:04x}' if start == end else f'\\u{start:04x}-\\u{end:04x}' for start, end in ranges)
+
+
+class CaptionNormalizer:
+    """Limpa legendas para o Selenium em uma passada de regex.
+
+    `allowed` é o trecho da classe de caracteres permitidos além de \\w e \\s
+    (igual ao regex antigo de cada versão). Um único padrão pré-compilado casa
+    sequências de caracteres a remover (controle, fora do BMP, não permitidos);
+    emojis de `replacements` dentro dessas sequências viram texto.
+    """
+
+    def __init__(self, allowed, replacements=None, max_chars=INSTAGRAM_CAPTION_MAX_CHARS, max_hashtags=INSTAGRAM_CAPTION_MAX_HASHTAGS):
+        self.replacements = dict(replacements or {})
+        self.max_chars = max_chars
+        self.max_hashtags = max_hashtags
+
+        kept = _kept_character_class(allowed)
+        self.pattern = re.compile(f'[^{kept}]+')
+        self.emoji_pattern = None
+        if self.replacements:
+            # Todo emoji substituível é formado só por caracteres removíveis, logo cai
+            # inteiro dentro de uma sequência casada por self.pattern
+            kept_pattern = re.compile(f'[{kept}]')
+            assert not any(kept_pattern.match(char) for emoji in self.replacements for char in emoji)
+            emojis = '|'.join(re.escape(emoji) for emoji in sorted(self.replacements, key=len, reverse=True))
+            self.emoji_pattern = re.compile(emojis)
+
+    def _replace_run(self, match):
+        # Controle sai antes, como na limpeza antiga: um emoji "partido" por \x00 volta a casar
+        run = match.group(0).translate(_CONTROL_CHARS)
+        return ''.join(self.replacements[emoji] for emoji in self.emoji_pattern.findall(run))
+
+    def clean(self, text):
+        """Mesma saída da limpeza antiga da versão"""
+        if self.emoji_pattern is not None:
+            text = self.pattern.sub(self._replace_run, text)
+        else:
+            text = self.pattern.sub('', text)
+        return text.strip()
+
+    def enforce_limits(self, text):
+        """Mantém só as primeiras `max_hashtags` hashtags e corta em `max_chars`"""
+        # str.count é O(n) em C: o regex só roda quando o limite é de fato excedido
+        if text.count('#') > self.max_hashtags:
+            kept = 0
+
+            def keep_first(match):
+                nonlocal kept
+                kept += 1
+                return match.group(0) if kept <= self.max_hashtags else ''
+
+            text = _HASHTAG.sub(keep_first, text)
+            text = _REPEATED_SPACES.sub(' ', text).strip()
+
+        # Sem caracteres fora do BMP, len() coincide com a contagem UTF-16 do Instagram
+        if len(text) > self.max_chars:
+            text = text[:self.max_chars].rstrip()
+        return text
+
+    def normalize(self, text):
+        return self.enforce_limits(self.clean(text))
+
+
+# v1 troca emojis por [nome]; v2 e v3 mantêm os emojis do BMP
+V1_CAPTION_NORMALIZER = CaptionNormalizer(r'\[\].,!?@#\-_()+=<>:;"\'/\\', replacements=V1_EMOJI_REPLACEMENTS)
+VIDEO_CAPTION_NORMALIZER = CaptionNormalizer(r'.,!?@#\-_()+=<>:;"\'/\\')
+
+
+def _legacy_clean_v1(text):
+    """clean_text_for_selenium do v1 antes do normalizador (referência do benchmark)"""
+    import unicodedata
+
+    text = ''.join(char for char in text if unicodedata.category(char) != 'Cc')
+    for emoji, replacement in V1_EMOJI_REPLACEMENTS.items():
+        text = text.replace(emoji, replacement)
+    text = ''.join(char for char in text if ord(char) <= 0xFFFF)
+    text = re.sub(r'[^\w\s\[\].,!?@#\-_()+=<>:;"\'/\\]', '', text)
+    return text.strip()
+
+
+def _legacy_clean_video(text):
+    """clean_text_for_selenium do v2/v3 antes do normalizador (referência do benchmark)"""
+    import unicodedata
+
+    text = ''.join(char for char in text if unicodedata.category(char) != 'Cc')
+    text = ''.join(char for char in text if ord(char) <= 0xFFFF)
+    text = re.sub(r'[^\w\s.,!?@#\-_()+=<>:;"\'/\\]', '', text)
+    return text.strip()
+
+
+def build_caption_corpus(size, seed=42):
+    """Legendas sintéticas no estilo das geradas pela Groq: acentos, emojis, hashtags e controle"""
+    rng = random.Random(seed)
+    words = ['Promoção', 'imperdível', 'dinheiro', 'renda', 'extra', 'vídeo', 'arte', 'criativo',
+             'R$35', '50%', 'OFF', 'agora', 'ação', 'você', 'sucesso', 'Instagram', 'Reels']
+    symbols = list(V1_EMOJI_REPLACEMENTS) + ['😀', '🙌', '👉', '✅', '📖', '💰', '™', '→', '€', '🇧🇷',
+                                              '\n', '\t', '\x00', '​', '*', '&', '"', '...', '!']
+    corpus = []
+    for _ in range(size):
+        tokens = []
+        for _ in range(rng.randint(20, 120)):
+            roll = rng.random()
+            if roll < 0.7:
+                tokens.append(rng.choice(words))
+            elif roll < 0.9:
+                tokens.append(rng.choice(symbols))
+            else:
+                tokens.append('#' + rng.choice(words))
+        corpus.append(' '.join(tokens))
+    return corpus
+
+
+def benchmark(corpus_size=20000):
+    corpus = build_caption_corpus(corpus_size)
+    total_chars = sum(len(text) for text in corpus)
+    print(f"Corpus: {corpus_size} legendas, {total_chars / 1e6:.1f}M caracteres")
+
+    for name, legacy, normalizer in (('v1', _legacy_clean_v1, V1_CAPTION_NORMALIZER),
+                                     ('v2/v3', _legacy_clean_video, VIDEO_CAPTION_NORMALIZER)):
+        started = time.perf_counter()
+        expected = [legacy(text) for text in corpus]
+        legacy_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        cleaned = [normalizer.clean(text) for text in corpus]
+        clean_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for text in corpus:
+            normalizer.normalize(text)
+        normalize_time = time.perf_counter() - started
+
+        mismatches = sum(1 for a, b in zip(expected, cleaned) if a != b)
+        print(f"{name}: antigo {legacy_time:.2f}s | clean {clean_time:.2f}s ({legacy_time / clean_time:.1f}x) | "
+              f"normalize com limites {normalize_time:.2f}s | saídas diferentes: {mismatches}")
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
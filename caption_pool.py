@@ -0,0 +1,191 @@
+"""Estoque de legendas pré-geradas, compartilhado pelos bots v2 e v3."""
+import os
+import json
+import time
+import logging
+import threading
+
+
+class CaptionPool:
+    """Estoque de legendas pré-geradas, persistido em disco.
+
+    Uma thread em segundo plano mantém `target_size` legendas por prompt e volta
+    a encher o estoque quando ele cai abaixo de `low_water`. Legendas expiram após
+    `ttl_hours`, e textos repetidos (no estoque ou já postados nos últimos
+    `used_ttl_hours`) são descartados. `pop` só lê da memória, então a latência
+    ou uma queda da API nunca atrasa a postagem. A legenda retirada fica reservada
+    até o post: `commit` a marca como usada e `restore` a devolve ao estoque.
+    """
+
+    VERSION = 1
+
+    def __init__(self, store_path='caption_pool.json', target_size=10, low_water=3, ttl_hours=168, used_ttl_hours=720):
+        self.store_path = store_path
+        self.target_size = target_size
+        self.low_water = low_water
+        self.ttl = ttl_hours * 3600
+        self.used_ttl = used_ttl_hours * 3600
+        self.fetch_caption = None
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        self.revision = 0
+        self.saved_revision = 0
+        self.refilling = set()
+        self.reserved = {}
+        self.prompts, self.used = self._load()
+
+    @staticmethod
+    def prompt_key(prompt):
+        import hashlib
+
+        return hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:16]
+
+    @staticmethod
+    def text_key(text):
+        import hashlib
+
+        # Ignora caixa e espaços: variações triviais contam como repetição
+        normalized = ' '.join(text.casefold().split())
+        return hashlib.sha256(normalized.encode('utf-8')).hexdigest()[:16]
+
+    def _load(self):
+        try:
+            with open(self.store_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == self.VERSION:
+                return data.get('prompts', {}), data.get('used', {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logging.warning(f"⚠️ Estoque de legendas ilegível, começando vazio: {str(e)}")
+        return {}, {}
+
+    def _save(self):
+        """Grava o estoque; só a serialização roda sob o lock, a escrita em disco fica fora dele"""
+        with self.lock:
+            self.revision += 1
+            revision = self.revision
+            data = json.dumps({'version': self.VERSION, 'prompts': self.prompts, 'used': self.used},
+                              ensure_ascii=False, indent=2)
+
+        with self.save_lock:
+            # Outra thread já gravou um estado mais novo
+            if revision < self.saved_revision:
+                return
+            tmp_path = f"{self.store_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, self.store_path)
+            self.saved_revision = revision
+
+    def _prune(self, now):
+        """Descarta legendas vencidas e o histórico de uso antigo"""
+        for entry in self.prompts.values():
+            entry['captions'] = [c for c in entry['captions'] if now - c['created_at'] < self.ttl]
+        self.used = {key: ts for key, ts in self.used.items() if now - ts < self.used_ttl}
+
+    def available(self, prompt):
+        with self.lock:
+            self._prune(time.time())
+            entry = self.prompts.get(self.prompt_key(prompt))
+            return len(entry['captions']) if entry else 0
+
+    def add(self, prompt, text):
+        """Guarda uma legenda nova; retorna False se ela repetir outra recente"""
+        text = text.strip()
+        if not text:
+            return False
+
+        key = self.text_key(text)
+        with self.lock:
+            entry = self.prompts.setdefault(self.prompt_key(prompt), {'prompt': prompt, 'captions': []})
+            if key in self.used or key in self.reserved or any(c['key'] == key for c in entry['captions']):
+                return False
+            entry['captions'].append({'key': key, 'text': text, 'created_at': time.time()})
+        self._save()
+        return True
+
+    def pop(self, prompt):
+        """Reserva a legenda mais antiga do estoque (None se vazio) e agenda a reposição.
+
+        Não grava em disco: se o processo cair antes do `commit`, a legenda
+        continua no arquivo.
+        """
+        with self.lock:
+            self._prune(time.time())
+            entry = self.prompts.get(self.prompt_key(prompt))
+            caption = None
+            if entry and entry['captions']:
+                caption = entry['captions'].pop(0)
+                self.reserved[caption['key']] = (self.prompt_key(prompt), caption)
+
+        self.prefetch(prompt)
+        return caption['text'] if caption else None
+
+    def commit(self, text):
+        """Marca a legenda reservada como postada: ela não volta ao estoque nem se repete"""
+        with self.lock:
+            reservation = self.reserved.pop(self.text_key(text), None)
+            if reservation is None:
+                return
+            self.used[reservation[1]['key']] = time.time()
+        self._save()
+
+    def restore(self, text):
+        """Devolve a legenda reservada ao início do estoque (o post falhou)"""
+        with self.lock:
+            reservation = self.reserved.pop(self.text_key(text), None)
+            if reservation is None:
+                return
+            prompt_key, caption = reservation
+            entry = self.prompts.get(prompt_key)
+            if entry is not None:
+                entry['captions'].insert(0, caption)
+
+    def prefetch(self, prompt):
+        """Inicia a reposição em segundo plano se o estoque estiver abaixo do mínimo"""
+        if self.fetch_caption is None or self.available(prompt) >= self.low_water:
+            return
+
+        with self.lock:
+            key = self.prompt_key(prompt)
+            if key in self.refilling:
+                return
+            self.refilling.add(key)
+
+        threading.Thread(target=self._refill, args=(prompt, key), daemon=True).start()
+
+    def _refill(self, prompt, key):
+        added = 0
+        try:
+            # Limite de tentativas para a API não ficar presa devolvendo repetições
+            attempts = 2 * self.target_size
+            while attempts > 0 and self.available(prompt) < self.target_size:
+                attempts -= 1
+                try:
+                    text = self.fetch_caption(prompt)
+                except Exception as e:
+                    logging.warning(f"⚠️ Reposição de legendas interrompida: {str(e)}")
+                    break
+                if text and self.add(prompt, text):
+                    added += 1
+        finally:
+            with self.lock:
+                self.refilling.discard(key)
+
+        if added:
+            logging.info(f"📝 Estoque de legendas: +{added} (total {self.available(prompt)})")
+
+
+# Um estoque por processo, compartilhado entre as instâncias do bot
+_caption_pool = None
+_caption_pool_lock = threading.Lock()
+
+
+def get_caption_pool(fetch_caption, store_path='caption_pool.json'):
+    global _caption_pool
+    with _caption_pool_lock:
+        if _caption_pool is None:
+            _caption_pool = CaptionPool(store_path)
+        _caption_pool.fetch_caption = fetch_caption
+        return _caption_pool
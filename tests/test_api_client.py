@@ -0,0 +1,214 @@
+"""HTTPClient contra um servidor local em 127.0.0.1."""
+import hashlib
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+import requests
+
+from api_client import HTTPClient
+from conftest import local_server
+
+PAYLOAD = bytes(range(256)) * 1024
+
+
+class Stub:
+    """Respostas programadas por caminho; guarda as chamadas recebidas"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.client_ports = []
+        self.ranges = []
+        self.script = {}
+
+    def handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def send_body(self, status, body, headers=()):
+                self.send_response(status)
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                with stub.lock:
+                    count = stub.calls[self.path] = stub.calls.get(self.path, 0) + 1
+                    stub.client_ports.append(self.client_address[1])
+                if self.path == '/slow':
+                    time.sleep(2)
+                    self.send_body(200, b'late')
+                elif self.path == '/video':
+                    self.send_video()
+                elif self.path in stub.script:
+                    # Respostas na ordem; a última se repete
+                    responses = stub.script[self.path]
+                    status, headers = responses[min(count, len(responses)) - 1]
+                    self.send_body(status, str(status).encode('ascii'), headers)
+                else:
+                    self.send_body(404, b'')
+
+            def send_video(self):
+                etag = ('ETag', f'"{hashlib.md5(PAYLOAD).hexdigest()}"')
+                range_header = self.headers.get('Range')
+                stub.ranges.append(range_header)
+                if range_header is None:
+                    # Anuncia o arquivo inteiro e derruba a conexão na metade
+                    self.send_response(200)
+                    self.send_header('Content-Length', str(len(PAYLOAD)))
+                    self.send_header(*etag)
+                    self.end_headers()
+                    self.wfile.write(PAYLOAD[:len(PAYLOAD) // 2])
+                    self.wfile.flush()
+                    self.close_connection = True
+                    return
+                start = int(range_header.split('=')[1].rstrip('-'))
+                self.send_body(206, PAYLOAD[start:], [
+                    ('Content-Range', f'bytes {start}-{len(PAYLOAD) - 1}/{len(PAYLOAD)}'), etag
+                ])
+
+        return Handler
+
+
+@pytest.fixture
+def stub():
+    server = Stub()
+    with local_server(server.handler()) as base_url:
+        server.base_url = base_url
+        yield server
+
+
+def test_retries_5xx_until_success(stub):
+    stub.script['/flaky'] = [(503, ()), (502, ()), (200, ())]
+    client = HTTPClient(retries=3, backoff_base=0.01)
+
+    response = client.get(f'{stub.base_url}/flaky', label='flaky')
+
+    assert response.status_code == 200
+    assert stub.calls['/flaky'] == 3
+    assert client.histograms['flaky']['total'] == 3
+    assert client.histograms['flaky']['errors'] == 2
+
+
+def test_retries_429_honouring_retry_after(stub):
+    stub.script['/limited'] = [(429, [('Retry-After', '1')]), (200, ())]
+    client = HTTPClient(retries=2, backoff_base=5)
+
+    started = time.monotonic()
+    response = client.get(f'{stub.base_url}/limited')
+    elapsed = time.monotonic() - started
+
+    assert response.status_code == 200
+    assert stub.calls['/limited'] == 2
+    assert 0.9 < elapsed < 2
+
+
+def test_gives_up_after_last_retry_with_final_response(stub):
+    stub.script['/down'] = [(503, ())]
+    client = HTTPClient(retries=2, backoff_base=0.01)
+
+    response = client.get(f'{stub.base_url}/down')
+
+    assert response.status_code == 503
+    assert stub.calls['/down'] == 3
+
+
+def test_client_errors_are_not_retried(stub):
+    client = HTTPClient(retries=3, backoff_base=0.01)
+
+    assert client.get(f'{stub.base_url}/missing').status_code == 404
+    assert stub.calls['/missing'] == 1
+
+
+def test_backoff_is_jittered_and_capped():
+    client = HTTPClient(backoff_base=0.5, backoff_max=8.0)
+
+    for attempt in range(8):
+        delays = [client.backoff_delay(attempt) for _ in range(200)]
+        assert all(0 <= delay <= min(8.0, 0.5 * 2 ** attempt) for delay in delays)
+        assert len(set(delays)) > 1
+
+
+def test_deadline_interrupts_a_slow_request(stub):
+    client = HTTPClient(retries=3, backoff_base=0.01)
+
+    started = time.monotonic()
+    with pytest.raises(requests.Timeout):
+        client.get(f'{stub.base_url}/slow', label='slow', timeout=10, deadline=0.5)
+
+    assert time.monotonic() - started < 1.5
+
+
+def test_deadline_stops_retrying_before_a_long_backoff(stub):
+    stub.script['/busy'] = [(503, [('Retry-After', '5')])]
+    client = HTTPClient(retries=5)
+
+    started = time.monotonic()
+    response = client.get(f'{stub.base_url}/busy', deadline=1)
+
+    assert response.status_code == 503
+    assert stub.calls['/busy'] == 1
+    assert time.monotonic() - started < 0.5
+
+
+def test_connections_are_reused(stub):
+    stub.script['/ok'] = [(200, ())]
+    client = HTTPClient()
+
+    for _ in range(5):
+        assert client.get(f'{stub.base_url}/ok').status_code == 200
+
+    assert len(stub.client_ports) == 5
+    assert len(set(stub.client_ports)) == 1
+
+
+def test_download_resumes_with_range(stub, tmp_path):
+    client = HTTPClient(retries=0)
+    part_path = tmp_path / 'video.part'
+
+    assert client.download(f'{stub.base_url}/video', str(part_path), expected_sha256=hashlib.sha256(PAYLOAD).hexdigest())
+
+    assert part_path.read_bytes() == PAYLOAD
+    assert stub.ranges == [None, f'bytes={len(PAYLOAD) // 2}-']
+
+
+def test_download_with_wrong_hash_is_deleted(stub, tmp_path):
+    client = HTTPClient(retries=0)
+    part_path = tmp_path / 'video.part'
+
+    assert not client.download(f'{stub.base_url}/video', str(part_path), expected_sha256='0' * 64)
+    assert not part_path.exists()
+
+
+def test_latency_percentiles(caplog):
+    client = HTTPClient()
+    for elapsed in [0.01] * 50 + [0.2] * 44 + [3.0] * 5:
+        client.record('groq', elapsed, failed=False)
+    client.record('groq', 0.2, failed=True)
+
+    assert client.percentile('groq', 0.5) == 0.05
+    assert client.percentile('groq', 0.95) == 0.25
+    assert client.percentile('groq', 1.0) == 3.0
+    assert client.percentile('unknown', 0.5) is None
+
+    with caplog.at_level(logging.INFO):
+        client.log_latency_summary()
+    assert "groq: 100 chamadas, 1 falhas" in caplog.text
+    assert "p50 ≤0.05s, p95 ≤0.25s" in caplog.text
+
+
+def test_percentile_never_exceeds_the_observed_maximum():
+    client = HTTPClient()
+    client.record('replicate', 0.7, failed=False)
+
+    assert client.percentile('replicate', 0.5) == 0.7
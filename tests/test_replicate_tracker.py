@@ -0,0 +1,185 @@
+"""ReplicatePredictionTracker contra um Replicate falso em 127.0.0.1."""
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+from api_client import HTTPClient, ReplicatePredictionTracker
+from conftest import local_server
+
+SECRET_KEY = b'replicate-test-key'
+SECRET = 'whsec_' + base64.b64encode(SECRET_KEY).decode('ascii')
+
+
+class FakeReplicate:
+    """Estado do Replicate falso: status por previsão, consultas e cancelamentos recebidos"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.statuses = {}
+        self.finish_after = {}
+        self.polls = {}
+        self.cancelled = []
+
+    def handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                prediction_id = self.path.rstrip('/').split('/')[-1]
+                with fake.lock:
+                    fake.polls.setdefault(prediction_id, []).append(time.monotonic())
+                    status = fake.statuses.get(prediction_id, 'processing')
+                    final = fake.finish_after.get(prediction_id)
+                    if final and len(fake.polls[prediction_id]) >= final[0]:
+                        status = fake.statuses[prediction_id] = final[1]
+                self._json({'id': prediction_id, 'status': status, 'output': f'https://cdn/{prediction_id}.mp4'})
+
+            def do_POST(self):
+                prediction_id = self.path.rstrip('/').split('/')[-2]
+                with fake.lock:
+                    fake.cancelled.append(prediction_id)
+                    fake.statuses[prediction_id] = 'canceled'
+                self._json({'id': prediction_id, 'status': 'canceled'})
+
+            def _json(self, payload):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+@pytest.fixture
+def replicate():
+    fake = FakeReplicate()
+    with local_server(fake.handler()) as base_url:
+        fake.base_url = base_url
+        yield fake
+
+
+def make_tracker(replicate, **kwargs):
+    kwargs.setdefault('poll_initial', 0.05)
+    return ReplicatePredictionTracker(HTTPClient(), 'token', api_base=replicate.base_url, **kwargs)
+
+
+def post_webhook(tracker, payload, key=SECRET_KEY):
+    body = json.dumps(payload).encode('utf-8')
+    timestamp = str(int(time.time()))
+    signature = base64.b64encode(hmac.new(key, f"msg_1.{timestamp}.".encode('utf-8') + body, hashlib.sha256).digest())
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{tracker.server.server_port}{tracker.WEBHOOK_PATH}", data=body,
+        headers={'webhook-id': 'msg_1', 'webhook-timestamp': timestamp,
+                 'webhook-signature': f"v1,{signature.decode('ascii')}"}
+    )
+    try:
+        return urllib.request.urlopen(request, timeout=5).status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def wait_in_thread(tracker, prediction_id, **kwargs):
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(value=tracker.wait(prediction_id, **kwargs)))
+    thread.start()
+    return thread, result
+
+
+def test_poll_interval_grows_until_poll_max(replicate):
+    replicate.finish_after['p1'] = (7, 'succeeded')
+    tracker = make_tracker(replicate, poll_initial=0.05, poll_factor=2.0, poll_max=0.2)
+
+    prediction = tracker.wait('p1', timeout=10)
+
+    assert prediction['status'] == 'succeeded'
+    gaps = [b - a for a, b in zip(replicate.polls['p1'], replicate.polls['p1'][1:])]
+    assert gaps[0] < 0.15
+    assert all(later >= earlier - 0.03 for earlier, later in zip(gaps, gaps[1:]))
+    assert all(0.15 < gap < 0.35 for gap in gaps[-3:])
+
+
+def test_concurrent_waits_resolve_independently(replicate):
+    replicate.finish_after.update({'a': (2, 'succeeded'), 'b': (4, 'failed'), 'c': (6, 'succeeded')})
+    tracker = make_tracker(replicate, poll_max=0.1)
+
+    waits = {prediction_id: wait_in_thread(tracker, prediction_id, timeout=10) for prediction_id in 'abc'}
+    for thread, _ in waits.values():
+        thread.join(10)
+
+    assert {prediction_id: result['value']['status'] for prediction_id, (_, result) in waits.items()} == \
+        {'a': 'succeeded', 'b': 'failed', 'c': 'succeeded'}
+    assert all(result['value']['id'] == prediction_id for prediction_id, (_, result) in waits.items())
+    assert tracker.predictions == {}
+
+
+def test_signed_webhook_wakes_the_wait(replicate):
+    tracker = make_tracker(replicate, webhook_port=0, webhook_secret=SECRET, poll_initial=30)
+    tracker.track('w1')
+    thread, result = wait_in_thread(tracker, 'w1', timeout=10)
+
+    started = time.monotonic()
+    assert post_webhook(tracker, {'id': 'w1', 'status': 'succeeded'}) == 200
+    thread.join(5)
+
+    assert result['value']['status'] == 'succeeded'
+    assert time.monotonic() - started < 2
+    assert 'w1' not in replicate.polls
+
+
+def test_webhook_with_bad_signature_is_rejected(replicate):
+    tracker = make_tracker(replicate, webhook_port=0, webhook_secret=SECRET, poll_initial=30)
+    tracker.track('w2')
+
+    assert post_webhook(tracker, {'id': 'w2', 'status': 'succeeded'}, key=b'wrong-key') == 401
+    assert not tracker.predictions['w2']['done'].is_set()
+
+
+def test_webhook_for_untracked_prediction_is_ignored(replicate):
+    tracker = make_tracker(replicate, webhook_port=0, webhook_secret=SECRET)
+
+    assert post_webhook(tracker, {'id': 'unknown', 'status': 'succeeded'}) == 200
+    assert tracker.predictions == {}
+
+
+def test_receiver_needs_a_valid_secret(replicate):
+    without_secret = make_tracker(replicate, webhook_port=0)
+    malformed = make_tracker(replicate, webhook_port=0, webhook_secret='whsec_not*base64')
+
+    assert without_secret.server is None and without_secret.webhook_url() is None
+    assert malformed.server is None
+    assert malformed.verify_signature({}, b'{}') is False
+
+
+def test_receiver_binds_to_loopback_by_default(replicate):
+    tracker = make_tracker(replicate, webhook_port=0, webhook_secret=SECRET, public_url='https://bot.example')
+
+    assert tracker.server.server_address[0] == '127.0.0.1'
+    assert tracker.webhook_url() == f"https://bot.example{tracker.WEBHOOK_PATH}"
+
+
+def test_cancel_event_stops_the_wait_and_cancels_the_prediction(replicate):
+    tracker = make_tracker(replicate, poll_max=0.1)
+    cancel_event = threading.Event()
+    thread, result = wait_in_thread(tracker, 'slow', timeout=30, cancel_event=cancel_event)
+
+    time.sleep(0.3)
+    cancelled_at = time.monotonic()
+    cancel_event.set()
+    thread.join(5)
+
+    assert result['value'] is None
+    assert time.monotonic() - cancelled_at < 1.5
+    assert replicate.cancelled == ['slow']
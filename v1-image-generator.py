@@ -1,63 +1,23 @@
 import os
 import time
 import random
-import unicodedata
-import re
 import pyperclip
 from pollinations import Text, Image
-from selenium import webdriver
+from caption_normalizer import V1_CAPTION_NORMALIZER
+from browser_session import InstagramSession
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
 from selenium.common.exceptions import TimeoutException, ElementClickInterceptedException
 
 # Função para limpar texto de caracteres problemáticos
 def clean_text_for_selenium(text):
     """
     Remove ou substitui caracteres que podem causar problemas no Selenium
+    (emojis comuns viram [nome]) e aplica os limites de legenda do Instagram
     """
-    # Remover caracteres de controle
-    text = ''.join(char for char in text if unicodedata.category(char) != 'Cc')
-    
-    # Converter emojis comuns para texto alternativo
-    emoji_replacements = {
-        '🔥': '[fire]',
-        '💯': '[100]',
-        '✨': '[sparkles]',
-        '❤️': '[heart]',
-        '😍': '[heart_eyes]',
-        '🚀': '[rocket]',
-        '🎉': '[party]',
-        '💪': '[muscle]',
-        '👏': '[clap]',
-        '🌟': '[star]',
-        '📸': '[camera]',
-        '🎨': '[art]',
-        '💝': '[gift_heart]',
-        '🌈': '[rainbow]',
-        '⭐': '[star]',
-        '💎': '[diamond]',
-        '🔴': '[red_circle]',
-        '🟢': '[green_circle]',
-        '🔵': '[blue_circle]',
-        '⚡': '[lightning]',
-        '🎯': '[target]',
-        '💡': '[bulb]'
-    }
-    
-    for emoji, replacement in emoji_replacements.items():
-        text = text.replace(emoji, replacement)
-    
-    # Remover qualquer caractere fora do BMP (Basic Multilingual Plane)
-    # Mantém apenas caracteres Unicode de U+0000 a U+FFFF
-    text = ''.join(char for char in text if ord(char) <= 0xFFFF)
-    
-    # Remover caracteres especiais problemáticos, mas manter pontuação básica
-    text = re.sub(r'[^\w\s\[\].,!?@#\-_()+=<>:;"\'/\\]', '', text)
-    
-    return text.strip()
+    return V1_CAPTION_NORMALIZER.normalize(text)
 
 # Passo 1: Gerar prompt para imagem
 text_model = Text()
@@ -86,43 +46,15 @@ print(f"Legenda original: {caption}")
 print(f"Legenda limpa: {caption_clean}")
 
 # Passo 4: Automatizar post no Instagram
-options = Options()
-driver = webdriver.Chrome(options=options)
+# Perfil do Chrome e cookies persistem em browser_profiles/<conta>: com sessão válida o login é pulado
+username = os.getenv('INSTAGRAM_USERNAME', 'xxxxxx')
+password = os.getenv('INSTAGRAM_PASSWORD', 'xxxxxx')
+instagram_session = InstagramSession(username, password, log=print)
+driver = instagram_session.start_driver(headless_safe=False)
 wait = WebDriverWait(driver, 15)
 
 try:
-    driver.get("https://www.instagram.com/")
-    time.sleep(random.uniform(2, 5))
-
-    # Login
-    username = os.getenv('INSTAGRAM_USERNAME', 'xxxxxx')
-    password = os.getenv('INSTAGRAM_PASSWORD', 'xxxxxx')
-
-    username_field = driver.find_element(By.NAME, "username")
-    username_field.send_keys(username)
-    time.sleep(random.uniform(1, 3))
-
-    password_field = driver.find_element(By.NAME, "password")
-    password_field.send_keys(password)
-    time.sleep(random.uniform(1, 3))
-
-    login_button = driver.find_element(By.CSS_SELECTOR, 'button[type="submit"]')
-    login_button.click()
-    time.sleep(10)
-
-    # Lidar com pop-ups pós-login
-    print("Procurando pop-ups para dispensar...")
-    try:
-        print("Tentando clicar no botão 'Not now' específico...")
-        not_now_specific = wait.until(EC.element_to_be_clickable((
-            By.XPATH, 
-            "//div[@role='button' and contains(@class, 'x1i10hfl') and text()='Not now']"
-        )))
-        not_now_specific.click()
-        print("✅ Clicou no botão 'Not now' específico!")
-        time.sleep(random.uniform(2, 4))
-    except TimeoutException:
-        print("Botão 'Not now' específico não encontrado...")
+    instagram_session.ensure_logged_in(driver, wait)
 
     # Função para clicar com segurança nos botões "Next" e "Share"
     def safe_click_advance(step_name, button_text):
@@ -1,21 +1,22 @@
 import os
 import time
 import random
-import unicodedata
-import re
+import shutil
 import pyperclip
 import schedule
 import threading
-import requests
 import json
 from datetime import datetime, timedelta
 import logging
-from selenium import webdriver
+from caption_normalizer import VIDEO_CAPTION_NORMALIZER
+from video_output import FFmpegPipeWriter, RenderCache
+from api_client import get_http_client, get_circuit_breakers, get_replicate_tracker
+from caption_pool import get_caption_pool
+from browser_session import InstagramSession, BrowserPool, PageWaiter, network_idle, get_selector_stats, probe_elements
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
 from selenium.common.exceptions import TimeoutException, ElementClickInterceptedException, NoSuchElementException
 
 # Configuração de logs
@@ -28,40 +29,540 @@ logging.basicConfig(
     ]
 )
 
+class TextSpriteCache:
+    """Cache LRU de sprites de texto já rasterizados.
+
+    Cada combinação (texto, fonte, escala, contorno) é rasterizada uma única
+    vez em um sprite com máscara alfa; depois, desenhar o texto em um frame é
+    uma única colagem do sprite.
+    """
+
+    # Deslocamentos do contorno usados pelo vídeo com Pillow
+    PIL_OUTLINE_OFFSETS = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+
+    def __init__(self, max_sprites=256):
+        from collections import OrderedDict
+
+        self.max_sprites = max_sprites
+        self.sprites = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, rasterize):
+        """Retorna o sprite da chave, rasterizando-o apenas na primeira vez"""
+        sprite = self.sprites.get(key)
+        if sprite is not None:
+            self.sprites.move_to_end(key)
+            self.hits += 1
+            return sprite
+
+        self.misses += 1
+        sprite = rasterize()
+        self.sprites[key] = sprite
+        if len(self.sprites) > self.max_sprites:
+            self.sprites.popitem(last=False)
+        return sprite
+
+    def cv2_sprite(self, text, font_face, scale, layers):
+        """Sprite equivalente a chamadas sucessivas de cv2.putText.
+
+        `layers` é uma tupla de (cor, espessura) desenhadas em ordem, por
+        exemplo contorno preto grosso seguido do preenchimento branco.
+        """
+        key = ('cv2', text, font_face, scale, layers)
+        return self.get(key, lambda: self._rasterize_cv2(text, font_face, scale, layers))
+
+    def _rasterize_cv2(self, text, font_face, scale, layers):
+        import cv2
+        import numpy as np
+
+        pad = max(thickness for _, thickness in layers)
+        (text_width, text_height), baseline = cv2.getTextSize(text, font_face, scale, pad)
+        sprite_height = text_height + baseline + 2 * pad
+        sprite_width = text_width + 2 * pad
+
+        colors = np.zeros((sprite_height, sprite_width, 3), dtype=np.uint8)
+        mask = np.zeros((sprite_height, sprite_width), dtype=bool)
+        origin = (pad, pad + text_height)
+
+        # putText sem antialiasing gera máscaras binárias: a colagem é idêntica ao desenho direto
+        layer = np.zeros((sprite_height, sprite_width), dtype=np.uint8)
+        for color, thickness in layers:
+            layer[:] = 0
+            cv2.putText(layer, text, origin, font_face, scale, 255, thickness)
+            hit = layer > 0
+            colors[hit] = color
+            mask |= hit
+
+        return colors, mask, origin
+
+    def blit_cv2(self, frame, sprite, org):
+        """Cola o sprite no frame com `org` no mesmo ponto que o cv2.putText usaria"""
+        colors, mask, (origin_x, origin_y) = sprite
+        x, y = org[0] - origin_x, org[1] - origin_y
+        frame_height, frame_width = frame.shape[:2]
+        sprite_height, sprite_width = mask.shape
+
+        # Recortar o sprite aos limites do frame
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + sprite_width, frame_width), min(y + sprite_height, frame_height)
+        if x0 >= x1 or y0 >= y1:
+            return
+
+        sub_mask = mask[y0 - y:y1 - y, x0 - x:x1 - x]
+        frame[y0:y1, x0:x1][sub_mask] = colors[y0 - y:y1 - y, x0 - x:x1 - x][sub_mask]
+
+    def pil_sprite(self, text, font, font_key, outline=2):
+        """Sprite RGBA de texto branco com contorno preto, como no vídeo com Pillow.
+
+        Retorna (sprite, origem do texto dentro do sprite, bbox do texto).
+        """
+        key = ('pil', text, font_key, outline)
+        return self.get(key, lambda: self._rasterize_pil(text, font, outline))
+
+    def _rasterize_pil(self, text, font, outline):
+        from PIL import Image, ImageDraw
+
+        bbox = ImageDraw.Draw(Image.new('L', (1, 1))).textbbox((0, 0), text, font=font)
+        size = (bbox[2] - bbox[0] + 2 * outline, bbox[3] - bbox[1] + 2 * outline)
+        origin = (outline - bbox[0], outline - bbox[1])
+
+        # Máscaras de cobertura do contorno (4 passadas deslocadas) e do preenchimento
+        outline_mask = Image.new('L', size, 0)
+        outline_draw = ImageDraw.Draw(outline_mask)
+        for dx, dy in self.PIL_OUTLINE_OFFSETS:
+            outline_draw.text((origin[0] + dx * outline, origin[1] + dy * outline), text, font=font, fill=255)
+
+        fill_mask = Image.new('L', size, 0)
+        ImageDraw.Draw(fill_mask).text(origin, text, font=font, fill=255)
+
+        outline_layer = Image.new('RGBA', size, (0, 0, 0, 0))
+        outline_layer.putalpha(outline_mask)
+        fill_layer = Image.new('RGBA', size, (255, 255, 255, 0))
+        fill_layer.putalpha(fill_mask)
+
+        return Image.alpha_composite(outline_layer, fill_layer), origin, bbox
+
+    def blit_pil(self, img, sprite, position):
+        """Cola o sprite na imagem com o texto na mesma posição do draw.text"""
+        sprite_img, (origin_x, origin_y), _ = sprite
+        img.paste(sprite_img, (position[0] - origin_x, position[1] - origin_y), sprite_img)
+
+
+class OpenCVFrameEngine:
+    """Motor de frames vetorizado para o vídeo aprimorado com OpenCV.
+
+    O gradiente de fundo é calculado a partir de tabelas pré-computadas
+    (fase de cada linha e paletas) em uma única operação por frame, e o
+    buffer do frame é alocado uma única vez e reaproveitado. A `seed` sorteia
+    a ordem das paletas e das palavras e a fase dos elementos, então cada job
+    gera um vídeo diferente (e a mesma semente reproduz o mesmo vídeo).
+    """
+
+    # Cores vibrantes
+    COLOR_PALETTES = [
+        [(255, 100, 150), (100, 255, 200), (200, 150, 255)],  # Rosa, Verde, Roxo
+        [(255, 150, 100), (100, 200, 255), (255, 255, 100)],  # Laranja, Azul, Amarelo
+        [(200, 100, 255), (100, 255, 150), (255, 200, 100)],  # Roxo, Verde, Pêssego
+    ]
+
+    TEXTS = ['CREATIVE', 'VIRAL', 'AMAZING', 'TRENDING', 'ARTISTIC']
+
+    def __init__(self, width=720, height=1280, fps=30, duration=45, text_scale_step=0.02, loop_frames=None, seed=None):
+        import numpy as np
+
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.duration = duration
+        self.total_frames = fps * duration
+
+        # Modo loop: toda a animação se repete a cada `loop_frames` frames. As velocidades
+        # são ajustadas para fechar um número inteiro de ciclos dentro do loop.
+        self.loop_frames = loop_frames
+        self.orbit_speed = self.periodic_speed(0.05)
+        self.radius_speed = self.periodic_speed(0.08)
+        self.wave_speed = self.periodic_speed(0.1)
+        self.pulse_speed = self.periodic_speed(0.2)
+        self.particle_speed = self.periodic_speed(3, cycle=width + 100)
+
+        # Variação por semente (None mantém a ordem e a fase originais). Uma fase
+        # constante não muda o período, então o modo loop continua fechando
+        self.palettes = list(self.COLOR_PALETTES)
+        self.texts = list(self.TEXTS)
+        self.phase = 0.0
+        if seed is not None:
+            rng = random.Random(seed)
+            rng.shuffle(self.palettes)
+            rng.shuffle(self.texts)
+            self.phase = rng.uniform(0, 2 * np.pi)
+
+        # Palavras: uma a cada 6 segundos (180 frames). No loop, o número de trocas por
+        # ciclo é múltiplo do número de palavras, para a sequência fechar na emenda
+        self.words_per_loop = None
+        if loop_frames:
+            self.words_per_loop = len(self.texts) * max(1, round(loop_frames / (180 * len(self.texts))))
+
+        # Escala do texto pulsante arredondada para este passo, para que os sprites se repitam
+        # (None desenha na escala exata, sem reaproveitamento)
+        self.text_scale_step = text_scale_step
+        self.text_sprites = TextSpriteCache()
+
+        # Tabelas pré-computadas: fase vertical de cada linha e paletas em matriz
+        self.row_phase = np.arange(height) / height
+        self.palette_table = np.array(self.palettes)
+
+        # Buffer reaproveitado em todos os frames (evita np.zeros por frame)
+        self.frame = np.zeros((height, width, 3), dtype=np.uint8)
+
+    def periodic_speed(self, speed, cycle=None):
+        """Velocidade por frame de um elemento periódico (padrão: ciclo de 2π).
+
+        Sem loop a velocidade original é mantida; com loop, é arredondada para
+        que o elemento complete um número inteiro de ciclos em `loop_frames`.
+        """
+        import numpy as np
+
+        if not self.loop_frames:
+            return speed
+
+        cycle = cycle or 2 * np.pi
+        cycles = max(1, round(speed * self.loop_frames / cycle))
+        return cycles * cycle / self.loop_frames
+
+    def render_gradient(self, frame_num):
+        """Preenche o buffer com o gradiente dinâmico e retorna a paleta atual"""
+        import numpy as np
+
+        progress = frame_num / (self.loop_frames or self.total_frames)
+
+        # Mudar paleta de cores periodicamente
+        palette_index = int(progress * 3) % len(self.palettes)
+        palette = self.palette_table[palette_index]
+        num_colors = len(palette)
+
+        # Mesma aritmética do laço original por linha, aplicada a todas as linhas de uma vez
+        color_progress = (self.row_phase + progress) % 1.0
+        scaled_progress = color_progress * num_colors
+        color_index = scaled_progress.astype(np.intp) % num_colors
+        next_color_index = (color_index + 1) % num_colors
+        blend_factor = (scaled_progress % 1.0)[:, np.newaxis]
+
+        blended_rows = palette[color_index] * (1 - blend_factor) + palette[next_color_index] * blend_factor
+        self.frame[:] = blended_rows.astype(np.uint8)[:, np.newaxis, :]
+
+        return self.palettes[palette_index]
+
+    def render(self, frame_num):
+        """Renderiza o frame completo no buffer interno e o retorna"""
+        import cv2
+        import numpy as np
+
+        width, height = self.width, self.height
+        frame = self.frame
+        if self.loop_frames:
+            frame_num %= self.loop_frames
+        current_palette = self.render_gradient(frame_num)
+
+        # Adicionar múltiplos elementos animados
+        num_circles = 5
+        for i in range(num_circles):
+            # Círculos com movimento orbital
+            angle = (frame_num * self.orbit_speed + i * (2 * np.pi / num_circles) + self.phase)
+            center_x = int(width/2 + (150 + i*20) * np.cos(angle))
+            center_y = int(height/2 + (100 + i*15) * np.sin(angle))
+            radius = int(30 + 20 * np.sin(frame_num * self.radius_speed + i))
+
+            # Cores dinâmicas para círculos
+            circle_color = current_palette[i % len(current_palette)]
+
+            cv2.circle(frame, (center_x, center_y), radius, (255, 255, 255), 3)
+            cv2.circle(frame, (center_x, center_y), radius-8, circle_color, -1)
+
+        # Adicionar ondas
+        wave_amplitude = 50
+        wave_frequency = 0.02
+        for x in range(0, width, 10):
+            wave_y = int(height/2 + wave_amplitude * np.sin(x * wave_frequency + frame_num * self.wave_speed + self.phase))
+            cv2.circle(frame, (x, wave_y), 8, (255, 255, 255), -1)
+
+        # Adicionar partículas em movimento
+        num_particles = 15
+        for p in range(num_particles):
+            particle_x = int((frame_num * self.particle_speed + p * 50) % (width + 100))
+            particle_y = int(height * 0.3 + 200 * np.sin((frame_num + p * 20) * self.orbit_speed + self.phase))
+            particle_size = abs(int(3 + 5 * np.sin(frame_num * self.wave_speed + p)))
+
+            if 0 <= particle_x < width and 0 <= particle_y < height:
+                cv2.circle(frame, (particle_x, particle_y), particle_size, (255, 255, 255), -1)
+
+        # Adicionar texto dinâmico (muda a cada 6 segundos; no loop, a cada loop_frames / words_per_loop)
+        if self.words_per_loop:
+            text = self.texts[(frame_num * self.words_per_loop // self.loop_frames) % len(self.texts)]
+        else:
+            text = self.texts[(frame_num // 180) % len(self.texts)]
+        font = cv2.FONT_HERSHEY_SIMPLEX
+        text_size = cv2.getTextSize(text, font, 2, 3)[0]
+        text_x = (width - text_size[0]) // 2
+        text_y = int(height * 0.8)
+
+        # Texto com efeito pulsante
+        pulse = 1 + 0.3 * np.sin(frame_num * self.pulse_speed)
+        scaled_font_size = 2 * pulse
+        if self.text_scale_step:
+            scaled_font_size = round(round(scaled_font_size / self.text_scale_step) * self.text_scale_step, 6)
+
+        # Contorno preto + preenchimento branco, rasterizados uma vez por (texto, escala)
+        sprite = self.text_sprites.cv2_sprite(text, font, scaled_font_size, (((0, 0, 0), 6), ((255, 255, 255), 3)))
+        self.text_sprites.blit_cv2(frame, sprite, (text_x, text_y))
+
+        return frame
+
+
+class PillowFrameRenderer:
+    """Renderizador de frames do vídeo básico com Pillow (a `seed` sorteia a ordem das cores e palavras)"""
+
+    # Cores
+    COLORS = [
+        (255, 100, 150), (100, 255, 200), (200, 150, 255),
+        (255, 150, 100), (100, 200, 255), (255, 255, 100)
+    ]
+
+    TEXTS = ['CREATIVE', 'VIRAL', 'AMAZING', 'TRENDING', 'ARTISTIC']
+
+    def __init__(self, width=720, height=1280, fps=24, duration=45, seed=None):
+        from PIL import ImageFont
+
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.duration = duration
+        self.total_frames = fps * duration
+
+        self.colors = list(self.COLORS)
+        self.texts = list(self.TEXTS)
+        if seed is not None:
+            rng = random.Random(seed)
+            rng.shuffle(self.colors)
+            rng.shuffle(self.texts)
+
+        # Fonte carregada uma única vez
+        try:
+            # Tentar fonte do sistema
+            self.font = ImageFont.truetype("arial.ttf", 60)
+            self.font_key = ("arial.ttf", 60)
+        except:
+            # Fonte padrão
+            self.font = ImageFont.load_default()
+            self.font_key = ("default", None)
+
+        self.text_sprites = TextSpriteCache()
+
+    def render(self, frame_num):
+        """Renderiza um frame como imagem PIL"""
+        from PIL import Image
+
+        width, height, fps = self.width, self.height, self.fps
+
+        # Criar imagem
+        img = Image.new('RGB', (width, height), self.colors[frame_num % len(self.colors)])
+
+        # Adicionar texto
+        text = self.texts[(frame_num // (fps * 9)) % len(self.texts)]
+
+        # Texto com contorno rasterizado uma vez; aqui é só uma colagem
+        sprite = self.text_sprites.pil_sprite(text, self.font, self.font_key, outline=2)
+
+        # Posição do texto
+        bbox = sprite[2]
+        text_width = bbox[2] - bbox[0]
+        text_height = bbox[3] - bbox[1]
+        text_x = (width - text_width) // 2
+        text_y = (height - text_height) // 2
+
+        self.text_sprites.blit_pil(img, sprite, (text_x, text_y))
+
+        return img
+
+
+def loop_video_segment(segment_path, video_path, repeats, duration):
+    """Repete um segmento já codificado com o concat do ffmpeg (cópia de stream, sem recodificar)"""
+    import subprocess
+
+    list_path = f'{video_path}.concat.txt'
+    segment_abspath = os.path.abspath(segment_path).replace("'", "'\\''")
+    with open(list_path, 'w', encoding='utf-8') as f:
+        for _ in range(repeats):
+            f.write(f"file '{segment_abspath}'\n")
+
+    cmd = [
+        'ffmpeg', '-y', '-loglevel', 'error',
+        '-f', 'concat', '-safe', '0', '-i', list_path,
+        '-t', str(duration), '-c', 'copy',
+        video_path
+    ]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True)
+    finally:
+        os.remove(list_path)
+
+    if result.returncode != 0:
+        logging.error(f"❌ Erro ao repetir segmento no ffmpeg: {result.stderr}")
+        return False
+    return True
+
+
+# Renderizadores disponíveis para os processos do pool (cada frame depende só de frame_num)
+FRAME_RENDERERS = {
+    'opencv': OpenCVFrameEngine,
+    'pillow': PillowFrameRenderer,
+}
+
+# Um renderizador por processo, reaproveitado entre faixas de frames
+_worker_renderers = {}
+
+
+def _render_frame_chunk(renderer_name, renderer_kwargs, start, end):
+    """Executado nos processos do pool: renderiza os frames [start, end)"""
+    key = (renderer_name, tuple(sorted(renderer_kwargs.items())))
+    renderer = _worker_renderers.get(key)
+    if renderer is None:
+        renderer = FRAME_RENDERERS[renderer_name](**renderer_kwargs)
+        _worker_renderers[key] = renderer
+
+    # O motor OpenCV reaproveita o buffer, então cada frame é copiado antes de voltar
+    reuses_buffer = renderer_name == 'opencv'
+    frames = []
+    for frame_num in range(start, end):
+        frame = renderer.render(frame_num)
+        frames.append(frame.copy() if reuses_buffer else frame)
+    return frames
+
+
+class RenderCancelled(Exception):
+    """Renderização interrompida de propósito (ex.: outro gerador venceu a corrida)"""
+
+
+def render_frames_in_order(renderer_name, renderer_kwargs, total_frames, sink, workers, chunk_size=8, max_in_flight=None):
+    """Renderiza faixas de frames em um pool de processos e entrega ao sink na ordem dos índices.
+
+    No máximo `max_in_flight` faixas ficam pendentes ao mesmo tempo, o que
+    limita a memória a max_in_flight * chunk_size frames. Os processos são
+    criados com `spawn`: um fork herdaria travas presas pelas threads do
+    Selenium e do cliente HTTP e poderia travar o filho.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    from collections import deque
+
+    if max_in_flight is None:
+        max_in_flight = workers * 2
+
+    pending = deque()
+    next_start = 0
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        try:
+            while next_start < total_frames or pending:
+                # Manter a janela de faixas em processamento cheia
+                while next_start < total_frames and len(pending) < max_in_flight:
+                    end = min(next_start + chunk_size, total_frames)
+                    future = pool.submit(_render_frame_chunk, renderer_name, renderer_kwargs, next_start, end)
+                    pending.append((next_start, future))
+                    next_start = end
+
+                # A fila é FIFO: esperar sempre a faixa mais antiga garante a ordem
+                start, future = pending.popleft()
+                for offset, frame in enumerate(future.result()):
+                    sink(start + offset, frame)
+        except BaseException:
+            for _, future in pending:
+                future.cancel()
+            raise
+
+
 class InstagramVideoBot:
-    def __init__(self, target_post_time=None):
+    def __init__(self, target_post_time=None, browser_pool=None):
         # CONFIGURAÇÕES DIRETAS
         self.username = 'xxxxxx'
         self.password = 'xxxxxx'
         self.target_post_time = target_post_time
         
+        # Sessão persistente: perfil do Chrome e cookies em browser_profiles/<conta>
+        self.instagram_session = InstagramSession(self.username, self.password)
+        
+        # Pool de navegadores (opcional): Chrome já aberto e logado, reaproveitado entre jobs
+        self.browser_pool = browser_pool
+        if self.browser_pool is not None:
+            self.browser_pool.warm(self.instagram_session)
+        
+        # Esperas por condição da página (no lugar de sleeps fixos), com tempo por etapa
+        self.page_waiter = PageWaiter()
+        
+        # Último seletor que acertou em cada etapa, tentado primeiro (selector_stats.json)
+        self.selector_stats = get_selector_stats()
+
         # API Keys - DEFINIDAS DIRETAMENTE
         self.replicate_api_key = None  # Desabilitado por enquanto
         self.groq_api_key = 'xxxxxx'
         
+        # Webhooks do Replicate: porta local do receptor e URL pública que chega até ela
+        # (None = só consultas com intervalo adaptativo)
+        self.replicate_webhook_port = None
+        self.replicate_public_url = None
+        self.replicate_webhook_secret = None
+        self.replicate_webhook_host = '127.0.0.1'
+        
+        # Estratégia com o Replicate ativo: 'race' corre o Replicate contra o OpenCV e usa o
+        # primeiro vídeo válido dentro de race_deadline segundos; 'sequential' tenta um depois do outro
+        self.video_strategy = 'race'
+        self.race_deadline = 240
+        
+        # Cliente HTTP com conexões reaproveitadas, novas tentativas e métricas de latência
+        self.http = get_http_client()
+        
+        # Disjuntores: provedor fora do ar é pulado na hora, sem esperar timeouts
+        self.circuit_breakers = get_circuit_breakers()
+        self.circuit_breakers.register_probe('groq', self.probe_groq)
+        if self.replicate_api_key:
+            self.circuit_breakers.register_probe('replicate', self.probe_replicate)
+        
+        # Renderização de vídeo: 1 = serial, >1 = pool de processos (ex.: os.cpu_count())
+        self.render_workers = 1
+        
+        # Codificador do OpenCV: 'opencv' (cv2.VideoWriter) ou 'ffmpeg' (pipe para o ffmpeg)
+        self.video_backend = 'opencv'
+        
+        # Parâmetros dos vídeos procedurais (também compõem a chave do cache)
+        # loop_frames (ex.: 900 = 30s) ativa o modo loop: só os frames únicos são renderizados
+        self.opencv_video_settings = {'width': 720, 'height': 1280, 'fps': 30, 'duration': 45, 'text_scale_step': 0.02, 'loop_frames': None}
+        self.pillow_video_settings = {'width': 720, 'height': 1280, 'fps': 24, 'duration': 45}
+        
+        # Cache de renderização: vídeos idênticos não são renderizados de novo (None desativa)
+        self.render_cache = RenderCache('render_cache', max_bytes=2 * 1024 ** 3)
+        # Semente de variação dos geradores locais, nova a cada job: posts diferentes não
+        # recebem o mesmo vídeo do cache. Fixar a semente reproduz o vídeo (ex.: repostar
+        # após falha no upload) e aí o cache é reaproveitado
+        self.render_seed = random.randrange(2 ** 32)
+        
+        # Estoque de legendas pré-geradas (caption_pool.json); a reposição começa já,
+        # enquanto o vídeo é renderizado
+        self.caption_prompt = "vídeo artístico e criativo com cores vibrantes"
+        self.caption_pool = get_caption_pool(self.request_description_from_groq)
+        self.caption_pool.prefetch(self.caption_prompt)
+        # Legenda do estoque reservada neste job: confirmada ou devolvida ao fim do post
+        self.reserved_caption = None
+        
         # Verificar configurações
         logging.info(f"✅ Username configurado: {self.username}")
         logging.info(f"✅ Password configurado: {'*' * len(self.password)}")
         logging.info(f"✅ GROQ_API_KEY configurada: {self.groq_api_key[:8]}...")
 
     def clean_text_for_selenium(self, text):
-        """Remove ou substitui caracteres que podem causar problemas no Selenium, mantendo emojis."""
-        # Remover caracteres de controle
-        text = ''.join(char for char in text if unicodedata.category(char) != 'Cc')
-        
-        # 🛠️ MUDANÇA: Remoção da substituição de emojis. Agora eles são mantidos.
-        # O novo método de inserção de legenda lida bem com emojis.
-        
-        # Remover qualquer caractere fora do BMP (Basic Multilingual Plane) - opcional, mas seguro
-        text = ''.join(char for char in text if ord(char) <= 0xFFFF)
-        
-        # Remover caracteres especiais problemáticos, mas mantendo os básicos para legendas
-        # Esta regex foi ajustada para ser menos agressiva
-        text = re.sub(r'[^\w\s.,!?@#\-_()+=<>:;"\'/\\]', '', text)
-        
-        return text.strip()
+        """Remove caracteres que podem causar problemas no Selenium, mantendo emojis, e aplica os limites do Instagram."""
+        return VIDEO_CAPTION_NORMALIZER.normalize(text)
 
-    def create_video_with_runwayml(self):
+    def create_video_with_runwayml(self, cancel_event=None):
         """Cria vídeo usando API RunwayML"""
         try:
             logging.info("🎬 Criando vídeo com RunwayML...")
@@ -95,14 +596,22 @@ class InstagramVideoBot:
                 }
             }
             
-            response = requests.post(url, headers=headers, json=payload, timeout=30)
+            tracker = self.get_replicate_tracker()
+            if tracker.webhook_url():
+                payload["webhook"] = tracker.webhook_url()
+                payload["webhook_events_filter"] = ["completed"]
+            
+            # Só uma nova tentativa: repetir a criação pode gerar previsões duplicadas
+            response = self.http.post(url, label='replicate', headers=headers, json=payload, timeout=30, retries=1)
             
             if response.status_code == 201:
                 prediction = response.json()
                 prediction_id = prediction['id']
+                # Acompanhar já: o webhook pode chegar antes de a espera começar
+                tracker.track(prediction_id)
                 
                 logging.info(f"✅ Vídeo iniciado! ID: {prediction_id}")
-                return self.wait_for_replicate_video(prediction_id)
+                return self.wait_for_replicate_video(prediction_id, cancel_event=cancel_event)
             else:
                 logging.warning(f"⚠️ RunwayML/Replicate falhou: {response.status_code}")
                 return None
@@ -111,43 +620,37 @@ class InstagramVideoBot:
             logging.error(f"❌ Erro na API RunwayML/Replicate: {str(e)}")
             return None
 
-    def wait_for_replicate_video(self, prediction_id):
-        """Aguarda processamento do vídeo Replicate"""
+    def get_replicate_tracker(self):
+        return get_replicate_tracker(
+            self.http, self.replicate_api_key, webhook_port=self.replicate_webhook_port,
+            public_url=self.replicate_public_url, webhook_secret=self.replicate_webhook_secret,
+            webhook_host=self.replicate_webhook_host
+        )
+
+    def wait_for_replicate_video(self, prediction_id, timeout=900, cancel_event=None):
+        """Aguarda processamento do vídeo Replicate (webhook ou consultas adaptativas)"""
         logging.info("⏳ Aguardando processamento Replicate...")
         
-        max_attempts = 20
-        for attempt in range(max_attempts):
-            try:
-                url = f"https://api.replicate.com/v1/predictions/{prediction_id}"
-                headers = {"Authorization": f"Token {self.replicate_api_key}"}
-                
-                response = requests.get(url, headers=headers, timeout=15)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    status = data.get('status', 'unknown')
-                    
-                    if status == 'succeeded':
-                        video_url = data.get('output')
-                        if video_url:
-                            return self.download_video(video_url)
-                    elif status == 'failed':
-                        logging.error("❌ Replicate falhou no processamento")
-                        break
-                    else:
-                        logging.info(f"⏳ Status: {status}...")
-                
-                time.sleep(15)
-                
-            except Exception as e:
-                logging.warning(f"⚠️ Erro ao verificar status: {str(e)}")
-                time.sleep(15)
+        prediction = self.get_replicate_tracker().wait(prediction_id, timeout=timeout, cancel_event=cancel_event)
+        if cancel_event is not None and cancel_event.is_set():
+            return None
+        if prediction is None:
+            logging.warning("⚠️ Timeout no Replicate, usando fallback...")
+            return None
+        
+        if prediction.get('status') != 'succeeded':
+            logging.error("❌ Replicate falhou no processamento")
+            return None
         
-        logging.warning("⚠️ Timeout no Replicate, usando fallback...")
+        video_url = prediction.get('output')
+        if isinstance(video_url, list):
+            video_url = video_url[0] if video_url else None
+        if video_url:
+            return self.download_video(video_url, cancel_event=cancel_event)
         return None
 
-    def create_enhanced_video_with_opencv(self):
-        """Cria vídeo mais elaborado usando OpenCV"""
+    def create_enhanced_video_with_opencv(self, cancel_event=None):
+        """Cria vídeo mais elaborado usando OpenCV (cancel_event interrompe no próximo frame)"""
         try:
             import cv2
             import numpy as np
@@ -156,98 +659,37 @@ class InstagramVideoBot:
             os.makedirs('videos', exist_ok=True)
             
             # Configurações do vídeo (9:16 format) - 45 segundos
-            width, height = 720, 1280
-            fps = 30
-            duration = 45  # 45 segundos
+            engine_kwargs = dict(self.opencv_video_settings, seed=self.render_seed)
+            fps = engine_kwargs['fps']
+            duration = engine_kwargs['duration']
             total_frames = fps * duration
             
             video_path = 'videos/enhanced_opencv_video.mp4'
-            fourcc = cv2.VideoWriter_fourcc(*'avc1')
-            out = cv2.VideoWriter(video_path, fourcc, fps, (width, height))
             
-            # Cores vibrantes
-            color_palettes = [
-                [(255, 100, 150), (100, 255, 200), (200, 150, 255)],  # Rosa, Verde, Roxo
-                [(255, 150, 100), (100, 200, 255), (255, 255, 100)],  # Laranja, Azul, Amarelo
-                [(200, 100, 255), (100, 255, 150), (255, 200, 100)],  # Roxo, Verde, Pêssego
-            ]
+            # Modo loop: renderiza só os frames únicos e repete o segmento no ffmpeg (sem recodificar)
+            loop_frames = engine_kwargs.get('loop_frames')
+            if loop_frames and loop_frames < total_frames and not shutil.which('ffmpeg'):
+                logging.warning("⚠️ ffmpeg não encontrado, renderizando todos os frames do loop")
+                loop_frames = None
             
-            for frame_num in range(total_frames):
-                progress = frame_num / total_frames
-                
-                # Mudar paleta de cores periodicamente
-                palette_index = int(progress * 3) % len(color_palettes)
-                current_palette = color_palettes[palette_index]
-                
-                # Criar frame base
-                frame = np.zeros((height, width, 3), dtype=np.uint8)
-                
-                # Gradiente dinâmico
-                for y in range(height):
-                    color_progress = (y / height + progress) % 1.0
-                    color_index = int(color_progress * len(current_palette))
-                    next_color_index = (color_index + 1) % len(current_palette)
-                    
-                    blend_factor = (color_progress * len(current_palette)) % 1.0
-                    
-                    color1 = np.array(current_palette[color_index])
-                    color2 = np.array(current_palette[next_color_index])
-                    blended_color = color1 * (1 - blend_factor) + color2 * blend_factor
-                    
-                    frame[y, :] = blended_color.astype(np.uint8)
-                
-                # Adicionar múltiplos elementos animados
-                num_circles = 5
-                for i in range(num_circles):
-                    # Círculos com movimento orbital
-                    angle = (frame_num * 0.05 + i * (2 * np.pi / num_circles))
-                    center_x = int(width/2 + (150 + i*20) * np.cos(angle))
-                    center_y = int(height/2 + (100 + i*15) * np.sin(angle))
-                    radius = int(30 + 20 * np.sin(frame_num * 0.08 + i))
-                    
-                    # Cores dinâmicas para círculos
-                    circle_color = current_palette[i % len(current_palette)]
-                    
-                    cv2.circle(frame, (center_x, center_y), radius, (255, 255, 255), 3)
-                    cv2.circle(frame, (center_x, center_y), radius-8, circle_color, -1)
-                
-                # Adicionar ondas
-                wave_amplitude = 50
-                wave_frequency = 0.02
-                for x in range(0, width, 10):
-                    wave_y = int(height/2 + wave_amplitude * np.sin(x * wave_frequency + frame_num * 0.1))
-                    cv2.circle(frame, (x, wave_y), 8, (255, 255, 255), -1)
-                
-                # Adicionar partículas em movimento
-                num_particles = 15
-                for p in range(num_particles):
-                    particle_x = int((frame_num * 3 + p * 50) % (width + 100))
-                    particle_y = int(height * 0.3 + 200 * np.sin((frame_num + p * 20) * 0.05))
-                    particle_size = abs(int(3 + 5 * np.sin(frame_num * 0.1 + p)))
-                    
-                    if 0 <= particle_x < width and 0 <= particle_y < height:
-                        cv2.circle(frame, (particle_x, particle_y), particle_size, (255, 255, 255), -1)
-                
-                # Adicionar texto dinâmico
-                texts = ['CREATIVE', 'VIRAL', 'AMAZING', 'TRENDING', 'ARTISTIC']
-                if frame_num % 180 == 0:  # Mudar texto a cada 6 segundos
-                    current_text_index = (frame_num // 180) % len(texts)
-                else:
-                    current_text_index = (frame_num // 180) % len(texts)
-                
-                text = texts[current_text_index]
-                font = cv2.FONT_HERSHEY_SIMPLEX
-                text_size = cv2.getTextSize(text, font, 2, 3)[0]
-                text_x = (width - text_size[0]) // 2
-                text_y = int(height * 0.8)
-                
-                # Texto com efeito pulsante
-                pulse = 1 + 0.3 * np.sin(frame_num * 0.2)
-                scaled_font_size = 2 * pulse
-                
-                cv2.putText(frame, text, (text_x, text_y), font, scaled_font_size, (0, 0, 0), 6)
-                cv2.putText(frame, text, (text_x, text_y), font, scaled_font_size, (255, 255, 255), 3)
-                
+            if loop_frames and loop_frames < total_frames:
+                frames_to_render = loop_frames
+                render_path = 'videos/enhanced_opencv_loop_segment.mp4'
+                logging.info(f"🔁 Modo loop: {loop_frames} frames únicos para {total_frames} frames de vídeo")
+            else:
+                frames_to_render = total_frames
+                render_path = video_path
+            
+            frame_size = (engine_kwargs['width'], engine_kwargs['height'])
+            if self.video_backend == 'ffmpeg':
+                out = FFmpegPipeWriter(render_path, fps, frame_size)
+            else:
+                fourcc = cv2.VideoWriter_fourcc(*'avc1')
+                out = cv2.VideoWriter(render_path, fourcc, fps, frame_size)
+            
+            def write_frame(frame_num, frame):
+                if cancel_event is not None and cancel_event.is_set():
+                    raise RenderCancelled()
                 out.write(frame)
                 
                 # Log de progresso
@@ -255,15 +697,49 @@ class InstagramVideoBot:
                     seconds_done = frame_num // fps
                     logging.info(f"⏳ Criando vídeo: {seconds_done}s/{duration}s")
             
-            out.release()
+            render_start = time.perf_counter()
+            try:
+                if self.render_workers > 1:
+                    logging.info(f"🧵 Renderizando em paralelo com {self.render_workers} processos...")
+                    render_frames_in_order('opencv', engine_kwargs, frames_to_render, write_frame, self.render_workers)
+                else:
+                    engine = OpenCVFrameEngine(**engine_kwargs)
+                    for frame_num in range(frames_to_render):
+                        # O motor reaproveita o mesmo buffer; o VideoWriter copia o frame
+                        write_frame(frame_num, engine.render(frame_num))
+            finally:
+                # Liberar sempre (também em erro ou cancelamento), senão o ffmpeg fica pendurado
+                released = out.release()
             cv2.destroyAllWindows()
             
+            if self.video_backend == 'ffmpeg' and not released:
+                # Vídeo mal codificado não é devolvido (nem vai para o cache)
+                logging.error(f"❌ Erro no ffmpeg: {out.stderr}")
+                if os.path.exists(render_path):
+                    os.remove(render_path)
+                return None
+            
+            if render_path != video_path:
+                repeats = -(-total_frames // frames_to_render)
+                looped = loop_video_segment(render_path, video_path, repeats, duration)
+                os.remove(render_path)
+                if not looped:
+                    return None
+            
+            elapsed = time.perf_counter() - render_start
+            logging.info(f"⚡ {frames_to_render} frames em {elapsed:.1f}s ({frames_to_render / max(elapsed, 1e-9):.1f} frames/s)")
+            logging.info(f"🔁 Frames computados: {frames_to_render} | emitidos: {total_frames} ({total_frames / frames_to_render:.1f}x)")
             logging.info(f"✅ Vídeo aprimorado criado: {video_path}")
             return video_path
             
         except ImportError:
             logging.warning("⚠️ OpenCV não instalado")
             return None
+        except RenderCancelled:
+            if os.path.exists(render_path):
+                os.remove(render_path)
+            logging.info("🛑 Renderização OpenCV cancelada")
+            return None
         except Exception as e:
             logging.error(f"❌ Erro com OpenCV: {str(e)}")
             return None
@@ -282,7 +758,8 @@ class InstagramVideoBot:
             
             # Cores vibrantes
             colors = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4', '#FECA57', '#FF9FF3', '#54A0FF']
-            selected_colors = random.sample(colors, 5)
+            rng = random.Random(self.render_seed)
+            selected_colors = rng.sample(colors, 5)
             
             clips = []
             segment_duration = duration / len(selected_colors)
@@ -320,135 +797,316 @@ class InstagramVideoBot:
     def create_basic_video_with_pillow(self):
         """Cria vídeo básico usando Pillow + ffmpeg"""
         try:
-            from PIL import Image, ImageDraw, ImageFont
-            import subprocess
+            from PIL import Image
             
             logging.info("🎬 Criando vídeo básico com Pillow...")
             os.makedirs('videos', exist_ok=True)
-            os.makedirs('temp_frames', exist_ok=True)
             
-            width, height = 720, 1280
-            fps = 24
-            duration = 45
+            renderer_kwargs = dict(self.pillow_video_settings, seed=self.render_seed)
+            fps = renderer_kwargs['fps']
+            duration = renderer_kwargs['duration']
             total_frames = fps * duration
             
-            # Cores
-            colors = [
-                (255, 100, 150), (100, 255, 200), (200, 150, 255),
-                (255, 150, 100), (100, 200, 255), (255, 255, 100)
-            ]
-            
-            texts = ['CREATIVE', 'VIRAL', 'AMAZING', 'TRENDING', 'ARTISTIC']
+            # Frames RGB vão direto para o ffmpeg, sem PNGs temporários
+            video_path = 'videos/pillow_video.mp4'
+            writer = FFmpegPipeWriter(video_path, fps, (renderer_kwargs['width'], renderer_kwargs['height']), input_pix_fmt='rgb24')
+            if not writer.isOpened():
+                logging.error("❌ ffmpeg não disponível")
+                return None
             
-            for frame_num in range(total_frames):
-                # Criar imagem
-                img = Image.new('RGB', (width, height), colors[frame_num % len(colors)])
-                draw = ImageDraw.Draw(img)
-                
-                # Adicionar texto
-                text = texts[(frame_num // (fps * 9)) % len(texts)]
-                
-                try:
-                    # Tentar fonte do sistema
-                    font = ImageFont.truetype("arial.ttf", 60)
-                except:
-                    # Fonte padrão
-                    font = ImageFont.load_default()
-                
-                # Posição do texto
-                bbox = draw.textbbox((0, 0), text, font=font)
-                text_width = bbox[2] - bbox[0]
-                text_height = bbox[3] - bbox[1]
-                text_x = (width - text_width) // 2
-                text_y = (height - text_height) // 2
-                
-                # Desenhar texto com contorno
-                for dx, dy in [(-2, -2), (-2, 2), (2, -2), (2, 2)]:
-                    draw.text((text_x + dx, text_y + dy), text, font=font, fill=(0, 0, 0))
-                draw.text((text_x, text_y), text, font=font, fill=(255, 255, 255))
-                
-                # Salvar frame
-                img.save(f'temp_frames/frame_{frame_num:06d}.png')
+            def write_frame(frame_num, img):
+                writer.write(img)
                 
                 if frame_num % (fps * 5) == 0:
                     logging.info(f"⏳ Gerando frames: {frame_num // fps}s/{duration}s")
             
-            # Criar vídeo com ffmpeg
-            video_path = 'videos/pillow_video.mp4'
-            cmd = [
-                'ffmpeg', '-y', '-r', str(fps),
-                '-i', 'temp_frames/frame_%06d.png',
-                '-c:v', 'libx264', '-pix_fmt', 'yuv420p',
-                video_path
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            
-            # Limpar frames temporários
-            import shutil
-            shutil.rmtree('temp_frames', ignore_errors=True)
+            try:
+                if self.render_workers > 1:
+                    logging.info(f"🧵 Renderizando em paralelo com {self.render_workers} processos...")
+                    render_frames_in_order('pillow', renderer_kwargs, total_frames, write_frame, self.render_workers)
+                else:
+                    renderer = PillowFrameRenderer(**renderer_kwargs)
+                    for frame_num in range(total_frames):
+                        write_frame(frame_num, renderer.render(frame_num))
+            finally:
+                encoded = writer.release()
             
-            if result.returncode == 0:
+            if encoded:
                 logging.info(f"✅ Vídeo básico criado: {video_path}")
                 return video_path
             else:
-                logging.error(f"❌ Erro no ffmpeg: {result.stderr}")
+                logging.error(f"❌ Erro no ffmpeg: {writer.stderr}")
                 return None
                 
         except Exception as e:
             logging.error(f"❌ Erro com Pillow: {str(e)}")
             return None
+
+    def video_cache_params(self, generator):
+        """Parâmetros que determinam completamente a saída de cada gerador local"""
+        if generator == 'opencv':
+            return {
+                **self.opencv_video_settings,
+                'palettes': OpenCVFrameEngine.COLOR_PALETTES,
+                'texts': OpenCVFrameEngine.TEXTS,
+                'backend': self.video_backend,
+            }
+        if generator == 'moviepy':
+            return {'width': 720, 'height': 1280, 'duration': 45, 'fps': 24}
+        if generator == 'pillow':
+            return {
+                **self.pillow_video_settings,
+                'colors': PillowFrameRenderer.COLORS,
+                'texts': PillowFrameRenderer.TEXTS,
+            }
+        raise ValueError(f"Gerador desconhecido: {generator}")
+
+    def fetch_cached_render(self, generator, seed=None, source_path=None):
+        """Vídeo do gerador já no cache (copiado para videos/), ou None"""
+        if self.render_cache is None:
+            return None
+        
+        key = self.render_cache.make_key(generator, self.video_cache_params(generator), seed, source_path)
+        cached_path = self.render_cache.fetch(key, 'videos')
+        if cached_path:
+            logging.info(f"⚡ Vídeo '{generator}' encontrado no cache: {cached_path}")
+        return cached_path
+
+    def store_cached_render(self, generator, video_path, seed=None, source_path=None):
+        """Guarda no cache um vídeo recém-renderizado pelo gerador"""
+        if self.render_cache is None or not video_path or not os.path.exists(video_path):
+            return
+        key = self.render_cache.make_key(generator, self.video_cache_params(generator), seed, source_path)
+        self.render_cache.store(key, video_path)
+
+    def render_with_cache(self, generator, render_function, seed=None, source_path=None):
+        """Retorna o vídeo do cache se existir; senão renderiza e guarda no cache"""
+        cached_path = self.fetch_cached_render(generator, seed, source_path)
+        if cached_path:
+            return cached_path
+        
+        video_path = render_function()
+        self.store_cached_render(generator, video_path, seed, source_path)
+        return video_path
+
+    def race_video_generators(self):
+        """Corre o Replicate contra o OpenCV; vence o primeiro vídeo válido dentro de race_deadline.
+
+        Os perdedores são cancelados (a previsão é cancelada na API, o download
+        e o render local param no bloco/frame seguinte) e cada corrida é anotada
+        em video_race_results.jsonl, para calibrar a cadeia de fallbacks com dados.
+        O OpenCV corre sem cache, senão venceria sempre. Com o vídeo dele já no
+        cache, o Replicate corre sozinho e o vídeo do cache fica de reserva, usado
+        só se o Replicate não entregar no prazo.
+        """
+        from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+        
+        cancel_event = threading.Event()
+        started = time.perf_counter()
+        outcomes = {}
+        winner = None
+        video_path = None
+        reserve_path = self.fetch_cached_render('opencv', seed=self.render_seed)
+        if reserve_path:
+            logging.info(f"🏁 Replicate com o OpenCV do cache de reserva (prazo de {self.race_deadline}s)")
+        else:
+            logging.info(f"🏁 Corrida de geradores: Replicate x OpenCV (prazo de {self.race_deadline}s)")
+        
+        executor = ThreadPoolExecutor(max_workers=2)
+        futures = {executor.submit(self.create_video_with_runwayml, cancel_event): 'replicate'}
+        if not reserve_path:
+            futures[executor.submit(self.create_enhanced_video_with_opencv, cancel_event)] = 'opencv'
+        pending = set(futures)
+        
+        try:
+            while pending:
+                remaining = self.race_deadline - (time.perf_counter() - started)
+                if remaining <= 0:
+                    logging.warning(f"⏱️ Nenhum gerador terminou em {self.race_deadline}s")
+                    break
+                
+                done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = futures[future]
+                    path = future.result() if future.exception() is None else None
+                    seconds = round(time.perf_counter() - started, 2)
+                    if path and os.path.exists(path) and os.path.getsize(path) > 0:
+                        outcomes[name] = {'status': 'won', 'seconds': seconds}
+                        winner, video_path = name, path
+                        break
+                    outcomes[name] = {'status': 'failed', 'seconds': seconds}
+                if winner:
+                    break
+        finally:
+            # Parar os perdedores e esperar que liberem arquivos e conexões
+            cancel_event.set()
+            executor.shutdown(wait=True)
+        
+        for future, name in futures.items():
+            if name in outcomes:
+                continue
+            path = future.result() if future.exception() is None else None
+            if path and os.path.exists(path):
+                # Terminou junto com o vencedor: o vídeo excedente é descartado
+                os.remove(path)
+            outcomes[name] = {'status': 'cancelled', 'seconds': round(time.perf_counter() - started, 2)}
+        
+        if reserve_path and winner is None:
+            winner, video_path = 'opencv', reserve_path
+            outcomes['opencv'] = {'status': 'cached', 'seconds': round(time.perf_counter() - started, 2)}
+        elif reserve_path:
+            os.remove(reserve_path)
+        elif winner == 'opencv':
+            self.store_cached_render('opencv', video_path, seed=self.render_seed)
+        
+        replicate_status = outcomes['replicate']['status']
+        if replicate_status == 'won':
+            self.circuit_breakers.record_success('replicate')
+        elif replicate_status == 'failed':
+            self.circuit_breakers.record_failure('replicate')
+        
+        self.record_race(winner, outcomes, time.perf_counter() - started)
+        return video_path
+
+    def record_race(self, winner, outcomes, elapsed):
+        """Anota o resultado da corrida (um JSON por linha) e registra no log"""
+        record = {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'winner': winner,
+            'deadline': self.race_deadline,
+            'seconds': round(elapsed, 2),
+            'contenders': outcomes,
+        }
+        try:
+            with open('video_race_results.jsonl', 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + '\n')
+        except OSError as e:
+            logging.warning(f"⚠️ Não foi possível registrar a corrida: {str(e)}")
+        
+        summary = ', '.join(f"{name} {outcome['status']} em {outcome['seconds']}s" for name, outcome in outcomes.items())
+        logging.info(f"🏁 Vencedor: {winner or 'nenhum'} ({summary})")
+
     def generate_video_with_fallbacks(self):
         """Gera vídeo com múltiplos fallbacks"""
         logging.info("🎬 Iniciando geração de vídeo...")
         
         # Tentar RunwayML/Replicate primeiro (se API key válida)
-        if self.replicate_api_key and self.replicate_api_key != 'r8_YOUR_REPLICATE_TOKEN':
+        replicate_ready = bool(self.replicate_api_key) and self.replicate_api_key != 'r8_YOUR_REPLICATE_TOKEN'
+        if replicate_ready and not self.circuit_breakers.allow('replicate'):
+            logging.info("🔌 Replicate com circuito aberto, indo direto para os fallbacks locais")
+            replicate_ready = False
+        
+        raced = False
+        if replicate_ready and self.video_strategy == 'race':
+            # Corrida Replicate x OpenCV; sem vencedor, segue para os fallbacks seguintes
+            raced = True
+            video_path = self.race_video_generators()
+            if video_path:
+                return video_path
+        elif replicate_ready:
             video_path = self.create_video_with_runwayml()
             if video_path and os.path.exists(video_path):
+                self.circuit_breakers.record_success('replicate')
                 return video_path
+            self.circuit_breakers.record_failure('replicate')
         
-        # Fallback 1: OpenCV aprimorado
-        video_path = self.create_enhanced_video_with_opencv()
-        if video_path and os.path.exists(video_path):
-            return video_path
+        # Fallback 1: OpenCV aprimorado (já disputou a corrida, se houve)
+        if not raced:
+            video_path = self.render_with_cache('opencv', self.create_enhanced_video_with_opencv, seed=self.render_seed)
+            if video_path and os.path.exists(video_path):
+                return video_path
         
         # Fallback 2: MoviePy simples
-        video_path = self.create_simple_fallback_video()
+        video_path = self.render_with_cache('moviepy', self.create_simple_fallback_video, seed=self.render_seed)
         if video_path and os.path.exists(video_path):
             return video_path
         
         # Fallback 3: Pillow + ffmpeg
-        video_path = self.create_basic_video_with_pillow()
+        video_path = self.render_with_cache('pillow', self.create_basic_video_with_pillow, seed=self.render_seed)
         if video_path and os.path.exists(video_path):
             return video_path
         
         logging.error("❌ Todas as opções de geração de vídeo falharam")
         return None
 
-    def download_video(self, video_url):
-        """Baixa vídeo da URL"""
-        try:
-            logging.info("📥 Baixando vídeo...")
-            response = requests.get(video_url, timeout=120)
-            
-            if response.status_code == 200:
-                os.makedirs('videos', exist_ok=True)
-                video_path = f'videos/downloaded_video_{datetime.now().strftime("%Y%m%d_%H%M%S")}.mp4'
-                
-                with open(video_path, 'wb') as f:
-                    f.write(response.content)
-                
-                logging.info(f"✅ Vídeo baixado: {video_path}")
-                return video_path
-                
-        except Exception as e:
-            logging.error(f"❌ Erro no download: {str(e)}")
+    def download_video(self, video_url, expected_sha256=None, cancel_event=None):
+        """Baixa vídeo da URL em partes, direto para o disco.
+
+        O download vai para um arquivo .part em videos/, retomado com Range se a
+        conexão cair e conferido (tamanho e hash) antes de ganhar o nome final,
+        então o upload nunca vê um vídeo pela metade. `cancel_event` interrompe
+        o download (perdedor de uma corrida).
+        """
+        import hashlib
+
+        os.makedirs('videos', exist_ok=True)
+        # Nome estável por URL: uma nova chamada retoma o que ficou no disco
+        part_path = os.path.join('videos', f".download_{hashlib.sha256(video_url.encode('utf-8')).hexdigest()[:16]}.part")
+
+        logging.info("📥 Baixando vídeo...")
+        if not self.http.download(video_url, part_path, expected_sha256=expected_sha256, cancel_event=cancel_event):
+            return None
+
+        video_path = f'videos/downloaded_video_{datetime.now().strftime("%Y%m%d_%H%M%S")}.mp4'
+        os.replace(part_path, video_path)
+        logging.info(f"✅ Vídeo baixado: {video_path}")
+        return video_path
+
+    def request_description_from_groq(self, video_prompt):
+        """Pede uma legenda à API Groq (usado pelo estoque de legendas em segundo plano)"""
+        url = "https://api.groq.com/openai/v1/chat/completions"
+        headers = {
+            "Authorization": f"Bearer {self.groq_api_key}",
+            "Content-Type": "application/json"
+        }
         
-        return None
+        payload = {
+            "model": "llama3-8b-8192",
+            "messages": [
+                {
+                    "role": "system",
+                    "content": "Você é um criador de conteúdo especialista em Instagram Reels. Crie descrições curtas, envolventes e criativas para reels."
+                },
+                {
+                    "role": "user",
+                    "content": f"Crie uma descrição curta e envolvente para Instagram Reel (máximo 150 caracteres) para um vídeo que mostra: {video_prompt}. Inclua hashtags relevantes e emojis adequados."
+                }
+            ],
+            "max_tokens": 200,
+            "temperature": 0.8
+        }
+        
+        if not self.circuit_breakers.allow('groq'):
+            raise RuntimeError("Groq indisponível (circuito aberto)")
+        
+        try:
+            response = self.http.post(url, label='groq', headers=headers, json=payload, timeout=15, deadline=45)
+            response.raise_for_status()
+        except Exception:
+            self.circuit_breakers.record_failure('groq')
+            raise
+        self.circuit_breakers.record_success('groq')
+        data = response.json()
+        return data['choices'][0]['message']['content'].strip()
+
+    def probe_groq(self):
+        """Sonda de saúde barata da API Groq (lista de modelos)"""
+        response = self.http.get(
+            "https://api.groq.com/openai/v1/models", label='groq_probe',
+            headers={"Authorization": f"Bearer {self.groq_api_key}"}, timeout=5, deadline=10, retries=0
+        )
+        return response.status_code == 200
+
+    def probe_replicate(self):
+        """Sonda de saúde barata da API Replicate (dados da conta)"""
+        response = self.http.get(
+            "https://api.replicate.com/v1/account", label='replicate_probe',
+            headers={"Authorization": f"Token {self.replicate_api_key}"}, timeout=5, deadline=10, retries=0
+        )
+        return response.status_code == 200
 
     def generate_description_with_groq(self, video_prompt):
-        """Gera descrição usando API Groq"""
+        """Retira uma descrição do estoque pré-gerado com a API Groq"""
         logging.info("📝 Gerando descrição com Groq...")
         
         fallback_descriptions = [
@@ -459,40 +1117,14 @@ class InstagramVideoBot:
             "Magia visual em cada frame! #MagicMoments #VisualMagic #ContentCreator"
         ]
         
-        try:
-            url = "https://api.groq.com/openai/v1/chat/completions"
-            headers = {
-                "Authorization": f"Bearer {self.groq_api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            payload = {
-                "model": "llama3-8b-8192",
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": "Você é um criador de conteúdo especialista em Instagram Reels. Crie descrições curtas, envolventes e criativas para reels."
-                    },
-                    {
-                        "role": "user",
-                        "content": f"Crie uma descrição curta e envolvente para Instagram Reel (máximo 150 caracteres) para um vídeo que mostra: {video_prompt}. Inclua hashtags relevantes e emojis adequados."
-                    }
-                ],
-                "max_tokens": 200,
-                "temperature": 0.8
-            }
-            
-            response = requests.post(url, headers=headers, json=payload, timeout=15)
-            
-            if response.status_code == 200:
-                data = response.json()
-                description = data['choices'][0]['message']['content'].strip()
-                logging.info(f"✅ Descrição gerada com Groq: {description}")
-                return description
-                
-        except Exception as e:
-            logging.warning(f"⚠️ Erro no Groq: {str(e)}")
+        # Não chama a API aqui: o estoque é reabastecido em segundo plano
+        description = self.caption_pool.pop(video_prompt)
+        if description:
+            self.reserved_caption = description
+            logging.info(f"✅ Descrição gerada com Groq: {description}")
+            return description
         
+        logging.warning("⚠️ Estoque de legendas vazio, reposição em andamento")
         description = random.choice(fallback_descriptions)
         logging.info(f"✅ Usando descrição fallback: {description}")
         return description
@@ -536,30 +1168,41 @@ class InstagramVideoBot:
             "//button[text()='OK']"
         ]
         
-        for i, selector in enumerate(selectors):
-            try:
-                logging.info(f"🔍 Tentando seletor #{i+1} para o botão OK...")
-                ok_button = WebDriverWait(driver, 7).until(
-                    EC.element_to_be_clickable((By.XPATH, selector))
-                )
-                
-                if ok_button.is_displayed():
-                    logging.info(f"✅ Pop-up/Botão OK encontrado com o seletor #{i+1}!")
-                    driver.execute_script("arguments[0].click();", ok_button)
-                    time.sleep(2)
-                    logging.info("✅ Botão OK clicado com sucesso via JavaScript!")
-                    return True
-                    
-            except TimeoutException:
-                logging.info(f"ℹ️ Seletor #{i+1} não encontrou o botão, tentando próximo...")
-                continue # Tenta o próximo seletor
-            except Exception as e:
-                logging.warning(f"⚠️ Erro inesperado ao tentar clicar no botão OK: {str(e)}")
-                return False
+        try:
+            # Todos os seletores sondados juntos numa única espera de 7s (antes: 7s por seletor)
+            index, ok_button = probe_elements(driver, [(By.XPATH, selector) for selector in selectors], timeout=7)
+            if ok_button is not None:
+                logging.info(f"✅ Pop-up/Botão OK encontrado com o seletor #{index+1}!")
+                driver.execute_script("arguments[0].click();", ok_button)
+                time.sleep(2)
+                logging.info("✅ Botão OK clicado com sucesso via JavaScript!")
+                return True
+        
+        except Exception as e:
+            logging.warning(f"⚠️ Erro inesperado ao tentar clicar no botão OK: {str(e)}")
+            return False
 
         logging.info("ℹ️ Pop-up 'Video posts are now reels' não apareceu ou não foi encontrado. Continuando...")
         return False
 
+    def is_vertical_9_16(self, video_path):
+        """Verifica pelo próprio arquivo se o vídeo já está na proporção 9:16"""
+        try:
+            import cv2
+        except ImportError:
+            return False
+        
+        capture = cv2.VideoCapture(video_path)
+        try:
+            width = capture.get(cv2.CAP_PROP_FRAME_WIDTH)
+            height = capture.get(cv2.CAP_PROP_FRAME_HEIGHT)
+        finally:
+            capture.release()
+        
+        if not width or not height:
+            return False
+        return abs(width / height - 9 / 16) < 0.01
+
     def change_video_format_to_9_16(self, driver, wait):
         """Mudar formato do vídeo para 9:16"""
         logging.info("📐 Tentando mudar formato para 9:16...")
@@ -619,38 +1262,38 @@ class InstagramVideoBot:
             f"//*[contains(text(), '{button_text}') and (@role='button' or self::button)]"
         ]
         
-        for selector in selectors:
+        # Último vencedor na frente; todos sondados juntos numa única espera de 10s
+        step = f"advance:{button_text}"
+        selectors = self.selector_stats.prioritized(step, selectors)
+        for _ in range(2):
+            index, button = probe_elements(driver, [(By.XPATH, selector) for selector in selectors], timeout=10)
+            if button is None:
+                break
+            selector = selectors[index]
+            logging.info(f"🔍 Botão encontrado com o seletor: {selector}")
+            
             try:
-                logging.info(f"🔍 Tentando seletor: {selector}")
-                
-                button = WebDriverWait(driver, 10).until(
-                    EC.element_to_be_clickable((By.XPATH, selector))
-                )
+                # Scroll para o elemento
+                driver.execute_script("arguments[0].scrollIntoView({block: 'center', behavior: 'smooth'});", button)
+                time.sleep(1)
                 
-                if button.is_displayed():
-                    # Scroll para o elemento
-                    driver.execute_script("arguments[0].scrollIntoView({block: 'center', behavior: 'smooth'});", button)
-                    time.sleep(1)
-                    
-                    # Tentar clicar
-                    try:
-                        button.click()
-                        logging.info(f"✅ {step_name} clicado!")
-                        time.sleep(2)
-                        return True
-                    except ElementClickInterceptedException:
-                        # Tentar JavaScript click
-                        driver.execute_script("arguments[0].click();", button)
-                        logging.info(f"✅ {step_name} clicado com JavaScript!")
-                        time.sleep(2)
-                        return True
-                        
-            except TimeoutException:
-                continue
+                # Tentar clicar
+                try:
+                    button.click()
+                    logging.info(f"✅ {step_name} clicado!")
+                except ElementClickInterceptedException:
+                    # Tentar JavaScript click
+                    driver.execute_script("arguments[0].click();", button)
+                    logging.info(f"✅ {step_name} clicado com JavaScript!")
+                self.selector_stats.record_probe(step, selectors, selector)
+                time.sleep(2)
+                return True
+            
             except Exception as e:
+                # Botão re-renderizado entre a sondagem e o clique: sonda de novo
                 logging.warning(f"⚠️ Erro no seletor: {str(e)}")
-                continue
         
+        self.selector_stats.record_probe(step, selectors, None)
         raise Exception(f"❌ Não foi possível encontrar/clicar no botão '{button_text}'")
 
     def insert_caption(self, driver, wait, caption):
@@ -744,132 +1387,215 @@ class InstagramVideoBot:
 
         return caption_inserted
 
-    def post_to_instagram(self):
-        """Função principal para postar vídeo no Instagram - Baseada na função que funciona"""
+    def open_instagram_for_upload(self):
+        """Abre o Chrome (perfil persistente), garante o login e deixa a tela de nova publicação pronta"""
+        if self.browser_pool is not None:
+            driver = self.browser_pool.lease(self.instagram_session)
+        else:
+            driver = self.instagram_session.start_driver()
+        wait = WebDriverWait(driver, 15)
+
         try:
-            logging.info("🚀 Iniciando processo de postagem automática...")
-            
-            video_path = self.generate_video_with_fallbacks()
-            if not video_path:
-                logging.error("❌ Falha na geração do vídeo. Abortando.")
-                return False
+            # Perfil/cookies válidos pulam o formulário de login e os pop-ups; um navegador do
+            # pool já está logado na página inicial
+            if self.browser_pool is None or not self.instagram_session.is_logged_in(driver):
+                self.instagram_session.ensure_logged_in(driver, wait, self.page_waiter)
 
-            video_description = self.generate_description_with_groq("vídeo artístico e criativo com cores vibrantes")
+            # Menu de criar aberto (opção 'Post') ou diálogo de upload já na tela
+            create_menu_ready = EC.any_of(
+                EC.presence_of_element_located((By.XPATH, "//span[text()='Post']")),
+                EC.presence_of_element_located((By.CSS_SELECTOR, 'input[type="file"]'))
+            )
+
+            # Encontrar e clicar no botão de nova publicação
+            create_button_selectors = [
+                'svg[aria-label="Nova publicação"]',
+                'svg[aria-label="New post"]', 
+                'svg[aria-label="Create"]',
+                'a[href*="/create/"]'
+            ]
             
-            # A função de limpeza agora mantém os emojis
-            description_clean = self.clean_text_for_selenium(video_description)
-            logging.info(f"Descrição a ser postada: {description_clean}")
+            # Último vencedor na frente; todos sondados juntos numa única espera de 15s
+            create_button_selectors = self.selector_stats.prioritized("create_button", create_button_selectors)
+            logging.info("Procurando botão criar...")
+            index, create_button = probe_elements(
+                driver, [(By.CSS_SELECTOR, selector) for selector in create_button_selectors], timeout=15)
+            winner = None if index is None else create_button_selectors[index]
+            self.selector_stats.record_probe("create_button", create_button_selectors, winner)
+            if winner is not None:
+                logging.info(f"Botão criar encontrado com: {winner}")
+            
+            if create_button is None:
+                logging.info("Tentando navegar diretamente para página de criar...")
+                driver.get("https://www.instagram.com/create/select/")
+                self.page_waiter.until(driver, "página de criar", create_menu_ready, timeout=3, fixed=3)
+            else:
+                create_button.click()
+                logging.info("✅ Clicou no botão de criar post!")
+                self.page_waiter.until(driver, "menu de criar", create_menu_ready, timeout=4, fixed=3)
 
-            options = Options()
-            options.add_argument("--no-sandbox")
-            options.add_argument("--disable-dev-shm-usage")
-            options.add_argument("--disable-gpu")
-            driver = webdriver.Chrome(options=options)
-            wait = WebDriverWait(driver, 15)
+            # Tentar clicar no botão "Post" se disponível
+            try:
+                post_button_selectors = [
+                    "//div[contains(@class, 'xdj266r') and contains(@class, 'x14z9mp')]//span[text()='Post']",
+                    "//span[text()='Post']",
+                    "//div[@role='button']//span[text()='Post']"
+                ]
+                
+                # Todos os seletores sondados juntos numa única espera de 5s (antes: 5s por seletor)
+                _, post_button = probe_elements(driver, [(By.XPATH, selector) for selector in post_button_selectors], timeout=5)
+                
+                if post_button:
+                    driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", post_button)
+                    time.sleep(1)
+                    post_button.click()
+                    logging.info("✅ Clicou no botão 'Post'!")
+                    self.page_waiter.until(driver, "diálogo de upload", EC.presence_of_element_located(
+                        (By.CSS_SELECTOR, 'input[type="file"]')), timeout=4, fixed=3)
+                    
+            except Exception as e:
+                logging.warning(f"Erro ao tentar clicar em 'Post', continuando: {str(e)[:50]}...")
 
+        except Exception:
             try:
-                driver.get("https://www.instagram.com/")
-                time.sleep(random.uniform(2, 5))
+                driver.save_screenshot(f"erro_debug_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png")
+                logging.info("📸 Screenshot salvo para debug")
+            except:
+                pass
+            self.release_browser(driver, healthy=False)
+            raise
 
-                # Login
-                username_field = driver.find_element(By.NAME, "username")
-                username_field.send_keys(self.username)
-                time.sleep(random.uniform(1, 3))
+        return driver, wait
 
-                password_field = driver.find_element(By.NAME, "password")
-                password_field.send_keys(self.password)
-                time.sleep(random.uniform(1, 3))
+    def release_browser(self, driver, healthy=True):
+        """Devolve o navegador ao pool (ou fecha, sem pool); healthy=False força a reciclagem"""
+        if self.browser_pool is not None:
+            self.browser_pool.release(driver, healthy)
+        else:
+            driver.quit()
 
-                login_button = driver.find_element(By.CSS_SELECTOR, 'button[type="submit"]')
-                login_button.click()
-                time.sleep(10)
+    def prepare_caption(self):
+        """Retira a legenda do estoque e limpa para o Selenium"""
+        video_description = self.generate_description_with_groq(self.caption_prompt)
+        
+        # A função de limpeza agora mantém os emojis
+        description_clean = self.clean_text_for_selenium(video_description)
+        logging.info(f"Descrição a ser postada: {description_clean}")
+        return description_clean
 
-                # Lidar com pop-ups pós-login
-                try:
-                    not_now_specific = wait.until(EC.element_to_be_clickable((
-                        By.XPATH, 
-                        "//div[@role='button' and contains(@class, 'x1i10hfl') and text()='Not now']"
-                    )))
-                    not_now_specific.click()
-                    logging.info("✅ Clicou no botão 'Not now'!")
-                    time.sleep(random.uniform(2, 4))
-                except TimeoutException:
-                    logging.info("Botão 'Not now' não encontrado...")
-
-                # Encontrar e clicar no botão de nova publicação
-                create_button_selectors = [
-                    'svg[aria-label="Nova publicação"]',
-                    'svg[aria-label="New post"]', 
-                    'svg[aria-label="Create"]',
-                    'a[href*="/create/"]'
-                ]
-                
-                create_button = None
-                for selector in create_button_selectors:
-                    try:
-                        logging.info(f"Tentando encontrar botão criar com: {selector}")
-                        create_button = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, selector)))
-                        break
-                    except TimeoutException:
-                        continue
-                
-                if create_button is None:
-                    logging.info("Tentando navegar diretamente para página de criar...")
-                    driver.get("https://www.instagram.com/create/select/")
-                    time.sleep(3)
-                else:
-                    create_button.click()
-                    logging.info("✅ Clicou no botão de criar post!")
-                    time.sleep(random.uniform(2, 4))
+    def settle_caption(self, shared):
+        """Confirma a legenda do estoque se o reel foi compartilhado; senão, devolve ao estoque"""
+        if self.reserved_caption is None:
+            return
+        if shared:
+            self.caption_pool.commit(self.reserved_caption)
+        else:
+            self.caption_pool.restore(self.reserved_caption)
+        self.reserved_caption = None
+
+    def prepare_post(self):
+        """Gera o vídeo, a legenda e abre o navegador logado ao mesmo tempo.
 
-                # Tentar clicar no botão "Post" se disponível
+        As três etapas só se encontram no upload. Retorna (video_path, legenda,
+        driver, wait), ou None se o vídeo ou o navegador falharem; nesse caso o
+        que ficou pronto é descartado.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        durations = {}
+
+        def timed(stage, function):
+            def run():
+                started = time.perf_counter()
                 try:
-                    post_button_selectors = [
-                        "//div[contains(@class, 'xdj266r') and contains(@class, 'x14z9mp')]//span[text()='Post']",
-                        "//span[text()='Post']",
-                        "//div[@role='button']//span[text()='Post']"
-                    ]
-                    
-                    post_button = None
-                    for selector in post_button_selectors:
-                        try:
-                            post_button = WebDriverWait(driver, 5).until(
-                                EC.element_to_be_clickable((By.XPATH, selector))
-                            )
-                            break
-                        except TimeoutException:
-                            continue
-                    
-                    if post_button:
-                        driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", post_button)
-                        time.sleep(1)
-                        post_button.click()
-                        logging.info("✅ Clicou no botão 'Post'!")
-                        time.sleep(random.uniform(2, 4))
-                        
-                except Exception as e:
-                    logging.warning(f"Erro ao tentar clicar em 'Post', continuando: {str(e)[:50]}...")
+                    return function()
+                finally:
+                    durations[stage] = time.perf_counter() - started
+            return run
+
+        # Legenda e navegador passam quase todo o tempo esperando rede ou o Chrome, então threads
+        # bastam para eles. O laço de frames em Python segura o GIL e disputa com essas threads;
+        # com render_workers > 1 os frames vão para processos e esta thread só alimenta o encoder
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = {
+                'vídeo': executor.submit(timed('vídeo', self.generate_video_with_fallbacks)),
+                'legenda': executor.submit(timed('legenda', self.prepare_caption)),
+                'navegador': executor.submit(timed('navegador', self.open_instagram_for_upload)),
+            }
+        wall_time = time.perf_counter() - started
 
+        stages = ', '.join(f"{stage} {seconds:.1f}s" for stage, seconds in durations.items())
+        logging.info(f"⏱️ Preparação: {wall_time:.1f}s em paralelo (em série seria {sum(durations.values()):.1f}s: {stages})")
+
+        results = {}
+        for stage, future in futures.items():
+            try:
+                results[stage] = future.result()
+            except Exception as e:
+                logging.error(f"❌ Erro na preparação ({stage}): {e}")
+                results[stage] = None
+
+        video_path = results['vídeo']
+        session = results['navegador']
+        if video_path and session:
+            driver, wait = session
+            return video_path, results['legenda'] or '', driver, wait
+
+        if not video_path:
+            logging.error("❌ Falha na geração do vídeo. Abortando.")
+        if session:
+            self.release_browser(session[0])
+        if video_path and os.path.exists(video_path):
+            os.remove(video_path)
+        return None
+
+    def post_to_instagram(self):
+        """Função principal para postar vídeo no Instagram - Baseada na função que funciona"""
+        job_started = time.perf_counter()
+        shared = False
+        try:
+            logging.info("🚀 Iniciando processo de postagem automática...")
+            
+            # Vídeo, legenda e login só dependem um do outro no upload: preparados em paralelo
+            prepared = self.prepare_post()
+            if prepared is None:
+                return False
+            video_path, description_clean, driver, wait = prepared
+            browser_healthy = True
+            success_xpath = ('//h3[contains(text(), "Your reel has been shared")] | //h3[contains(text(), "Seu reel foi compartilhado")] | '
+                             '//h3[contains(text(), "Your post has been shared")]')
+
+            try:
                 # Upload do vídeo
                 logging.info("Procurando input de arquivo...")
                 file_input = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, 'input[type="file"]')))
                 file_input.send_keys(os.path.abspath(video_path))
                 logging.info("✅ Vídeo enviado!")
-                time.sleep(random.uniform(5, 8))  # Mais tempo para vídeo
+                # Vídeo carregado: aparece o pop-up de reels, o botão de formato ou o Next
+                self.page_waiter.until(driver, "upload do vídeo", EC.any_of(
+                    EC.presence_of_element_located((By.XPATH, "//button[text()='OK']")),
+                    EC.presence_of_element_located((By.CSS_SELECTOR, 'svg[aria-label="Select crop"]')),
+                    EC.presence_of_element_located((By.XPATH, "//div[@role='button' and text()='Next']"))
+                ), timeout=8, fixed=6.5)
 
                 # NOVO: Verificar e clicar no botão OK se aparecer
                 self.handle_ok_button_after_upload(driver, wait)
 
-                # NOVO: Mudar formato para 9:16 antes do primeiro Next
-                self.change_video_format_to_9_16(driver, wait)
+                # NOVO: Mudar formato para 9:16 antes do primeiro Next (só se o vídeo ainda não for 9:16)
+                if self.is_vertical_9_16(video_path):
+                    logging.info("📐 Vídeo já está em 9:16, pulando ajuste de formato no navegador")
+                else:
+                    self.change_video_format_to_9_16(driver, wait)
 
                 # Primeiro Next
                 self.safe_click_advance(driver, wait, "primeiro Next", "Next")
-                time.sleep(random.uniform(3, 5))
+                self.page_waiter.until(driver, "tela de edição", network_idle(quiet=0.5), timeout=5, fixed=4)
 
                 # Segundo Next
                 self.safe_click_advance(driver, wait, "segundo Next", "Next")
-                time.sleep(random.uniform(3, 5))
+                self.page_waiter.until(driver, "tela de legenda", EC.presence_of_element_located(
+                    (By.CSS_SELECTOR, 'div[aria-label="Write a caption..."][contenteditable="true"]')), timeout=5, fixed=4)
 
                 # Inserir legenda
                 caption_inserted = self.insert_caption(driver, wait, description_clean)
@@ -879,7 +1605,10 @@ class InstagramVideoBot:
                 else:
                     logging.info(f"✅ Legenda final inserida: '{description_clean}'")
                 
-                time.sleep(random.uniform(20, 35))
+                # Upload em segundo plano concluído: a barra de progresso sumiu (a rede do Instagram
+                # nunca fica ociosa por causa das requisições de fundo, então ela não entra aqui)
+                self.page_waiter.until(driver, "processamento do upload", EC.invisibility_of_element_located(
+                    (By.CSS_SELECTOR, '[role="progressbar"]')), timeout=35, fixed=27.5)
 
                 # Aguardar horário correto antes de compartilhar
                 logging.info("🕐 Verificando se chegou a hora de postar...")
@@ -887,24 +1616,20 @@ class InstagramVideoBot:
 
                 # Compartilhar
                 self.safe_click_advance(driver, wait, "Compartilhar", "Share")
-                time.sleep(random.uniform(90, 100))  # Mais tempo para processamento do reel
-                #wait_long = WebDriverWait(driver, 90)
+                shared = True
+                published = self.page_waiter.until(driver, "publicação do reel", EC.presence_of_element_located(
+                    (By.XPATH, success_xpath)), timeout=100, fixed=95)
 
-                # Verificar sucesso - NOVO: Procurar pela mensagem específica de reel
-                try:
-                    # Tentar encontrar a mensagem de sucesso para reel
-                    success_message = wait.until(EC.presence_of_element_located((
-                        By.XPATH, 
-                        '//h3[contains(text(), "Your reel has been shared")] | //h3[contains(text(), "Seu reel foi compartilhado")] | //h3[contains(text(), "Your post has been shared")]'
-                    )))
-                    logging.info("🎉 REEL PUBLICADO COM SUCESSO!")
-                    return True
-                except TimeoutException:
-                    logging.warning("⚠️ Reel pode ter sido publicado, mas confirmação não encontrada")
-                    return True
+                # Sem a mensagem de sucesso o job falha (antes seguia como se tivesse publicado)
+                if not published:
+                    logging.error("❌ Confirmação de publicação do reel não encontrada")
+                    return False
+                logging.info("🎉 REEL PUBLICADO COM SUCESSO!")
+                return True
 
             except Exception as e:
                 logging.error(f"❌ Erro durante o posting: {e}")
+                browser_healthy = False
                 try:
                     driver.save_screenshot(f"erro_debug_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png")
                     logging.info("📸 Screenshot salvo para debug")
@@ -915,7 +1640,7 @@ class InstagramVideoBot:
             finally:
                 logging.info("🔧 Limpando recursos...")
                 try:
-                    driver.quit()
+                    self.release_browser(driver, browser_healthy)
                     # Remover vídeo após uso
                     if os.path.exists(video_path):
                         os.remove(video_path)
@@ -927,19 +1652,30 @@ class InstagramVideoBot:
             logging.error(f"❌ Erro geral na postagem: {e}")
             return False
 
+        finally:
+            self.settle_caption(shared)
+            self.page_waiter.log_summary()
+            logging.info(f"⏱️ Tempo total do job: {time.perf_counter() - job_started:.1f}s")
+
+# Pool de navegadores compartilhado pelos jobs agendados (criado em main)
+browser_pool = None
+
 def job_with_timing(target_time_str, preparation_minutes):
     """Job executado pelo scheduler"""
     logging.info("⏰ Executando job agendado...")
     
     try:
         target_time = datetime.strptime(target_time_str, "%H:%M").time()
-        bot = InstagramVideoBot(target_post_time=target_time)
+        bot = InstagramVideoBot(target_post_time=target_time, browser_pool=browser_pool)
         success = bot.post_to_instagram()
         
         if success:
             logging.info("✅ Job executado com sucesso!")
         else:
             logging.error("❌ Job falhou!")
+        
+        get_http_client().log_latency_summary()
+        get_circuit_breakers().log_summary()
             
     except Exception as e:
         logging.error(f"❌ Erro no job: {str(e)}")
@@ -990,6 +1726,10 @@ def main():
     logging.info(f"🔧 Processo inicia às {start_time_str}h")
     logging.info(f"🎬 Reel postado às {POST_TIME}h")
     
+    # Navegador aberto e logado entre os jobs (fechado ao sair do processo)
+    global browser_pool
+    browser_pool = BrowserPool()
+    
     # MODO TESTE: Executar imediatamente (remova estas 3 linhas para modo normal)
     logging.info("🧪 MODO TESTE: Executando agora...")
     job_with_timing(POST_TIME, PREPARATION_MINUTES)
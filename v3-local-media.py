@@ -1,22 +1,25 @@
 import os
+import math
 import time
 import random
-import unicodedata
-import re
+import shutil
 import pyperclip
 import schedule
 import threading
-import requests
-import json
+import queue
 from datetime import datetime, timedelta
 import logging
+from caption_normalizer import VIDEO_CAPTION_NORMALIZER
+from video_output import FFmpegPipeWriter, RenderCache
+from api_client import get_http_client, get_circuit_breakers
+from caption_pool import get_caption_pool
+from browser_session import InstagramSession, BrowserPool, PageWaiter, network_idle, get_selector_stats, probe_elements
 import cv2
-from selenium import webdriver
+import numpy as np
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
 from selenium.common.exceptions import TimeoutException, ElementClickInterceptedException, NoSuchElementException
 
 
@@ -31,33 +34,469 @@ logging.basicConfig(
 )
 
 
+def perceptual_dhash(img):
+    """dHash de 64 bits: compara pixels vizinhos da imagem reduzida a 9x8 em tons de cinza.
+
+    Resistente a mudança de tamanho e de formato (JPEG x WebP), então cópias
+    da mesma capa ficam a poucos bits de distância.
+    """
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int(np.packbits(bits).view('>u8')[0])
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count('1')
+
+
+class BKTree:
+    """Árvore BK sobre a distância de Hamming.
+
+    Cada busca por vizinhos dentro de um raio visita só os ramos que podem
+    conter resultados (desigualdade triangular), sem varrer a biblioteca toda.
+    """
+
+    def __init__(self):
+        # Nó: [hash, itens com esse hash, {distância: nó filho}]
+        self.root = None
+
+    def add(self, value, item):
+        if self.root is None:
+            self.root = [value, [item], {}]
+            return
+
+        node = self.root
+        while True:
+            distance = hamming_distance(value, node[0])
+            if distance == 0:
+                if item not in node[1]:
+                    node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [item], {}]
+                return
+            node = child
+
+    def discard(self, value, item):
+        """Remove o item (o nó permanece como ponto de passagem da árvore)"""
+        node = self.root
+        while node is not None:
+            distance = hamming_distance(value, node[0])
+            if distance == 0:
+                if item in node[1]:
+                    node[1].remove(item)
+                return
+            node = node[2].get(distance)
+
+    def search(self, value, radius):
+        """Itens cujo hash está a no máximo `radius` bits de `value`"""
+        results = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            distance = hamming_distance(value, node[0])
+            if distance <= radius:
+                results.extend(node[1])
+            for child_distance, child in node[2].items():
+                if distance - radius <= child_distance <= distance + radius:
+                    stack.append(child)
+        return results
+
+
+class MediaCatalog:
+    """Catálogo persistente (SQLite) das imagens da pasta, com rotação sem repetição.
+
+    Guarda um registro por imagem (caminho, tamanho, mtime, dimensões, hash do
+    conteúdo e hash perceptual) e só reprocessa arquivos novos ou alterados. A
+    seleção usa um "saco embaralhado": nenhuma imagem se repete até todas terem
+    saído, e candidatas quase idênticas às usadas recentemente são puladas.
+    """
+
+    VALID_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS images (
+            path TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            width INTEGER,
+            height INTEGER,
+            content_hash TEXT
+        );
+        CREATE TABLE IF NOT EXISTS rotation (
+            path TEXT PRIMARY KEY,
+            position INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS rotation_position ON rotation (position);
+        CREATE TABLE IF NOT EXISTS history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            path TEXT NOT NULL,
+            dhash INTEGER,
+            selected_at REAL NOT NULL
+        );
+    """
+
+    def __init__(self, image_folder, db_path="media_catalog.sqlite3", watch=True, recent_window=20, duplicate_distance=10):
+        import sqlite3
+
+        self.image_folder = image_folder
+        self.recent_window = recent_window
+        self.duplicate_distance = duplicate_distance
+        self.lock = threading.RLock()
+        # Fora da pasta de imagens: o journal do SQLite dispararia o monitoramento da pasta
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.executescript(self.SCHEMA)
+
+        # Migração: catálogos antigos não tinham a coluna do hash perceptual
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(images)")]
+        if "dhash" not in columns:
+            self.conn.execute("ALTER TABLE images ADD COLUMN dhash INTEGER")
+            self.conn.commit()
+
+        self.hash_index = None
+        self.dirty = True
+        self.observer = None
+        if watch:
+            self._start_watcher()
+
+    @staticmethod
+    def _to_sql_hash(value):
+        # SQLite guarda inteiros de 64 bits com sinal
+        return value - (1 << 64) if value is not None and value >= (1 << 63) else value
+
+    @staticmethod
+    def _from_sql_hash(value):
+        return value & 0xFFFFFFFFFFFFFFFF if value is not None else None
+
+    def _start_watcher(self):
+        """Usa o watchdog (inotify no Linux), se instalado, para saber quando a pasta mudou"""
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            return
+
+        catalog = self
+
+        class _FolderChangeHandler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                catalog.dirty = True
+
+        try:
+            self.observer = Observer()
+            self.observer.schedule(_FolderChangeHandler(), self.image_folder, recursive=False)
+            self.observer.daemon = True
+            self.observer.start()
+        except Exception as e:
+            logging.warning(f"⚠️ Monitoramento da pasta indisponível: {str(e)}")
+            self.observer = None
+
+    def _describe(self, path, stat):
+        """Lê dimensões, hash do conteúdo e hash perceptual de uma imagem nova ou alterada"""
+        img = cv2.imread(path)
+        if img is None:
+            return None, None, None, None
+        height, width = img.shape[:2]
+        return width, height, RenderCache.file_digest(path), perceptual_dhash(img)
+
+    def _load_hash_index(self):
+        """Monta a árvore BK a partir dos hashes salvos (uma vez por processo)"""
+        if self.hash_index is None:
+            self.hash_index = BKTree()
+            for path, dhash in self.conn.execute("SELECT path, dhash FROM images WHERE dhash IS NOT NULL"):
+                self.hash_index.add(self._from_sql_hash(dhash), path)
+        return self.hash_index
+
+    def refresh(self, force=False):
+        """Atualiza o catálogo de forma incremental; retorna quantas imagens mudaram.
+
+        Com o watchdog ativo, só varre a pasta depois de algum evento. Sem ele,
+        varre sempre: o mtime da pasta não muda quando um arquivo é editado no
+        lugar, então cada arquivo é comparado por tamanho e mtime (só um stat;
+        apenas os novos ou alterados são lidos de novo).
+        """
+        with self.lock:
+            if not force and not self.dirty and self.observer is not None:
+                return 0
+            self.dirty = False
+            hash_index = self._load_hash_index()
+
+            known = {}
+            known_hashes = {}
+            for path, size, mtime_ns, width, dhash in self.conn.execute("SELECT path, size, mtime_ns, width, dhash FROM images"):
+                # Registros sem hash perceptual (catálogo antigo) são reprocessados
+                known[path] = (size, mtime_ns) if dhash is not None or width is None else None
+                known_hashes[path] = self._from_sql_hash(dhash)
+            seen = set()
+            changed = 0
+
+            for entry in os.scandir(self.image_folder):
+                if not entry.is_file() or not entry.name.lower().endswith(self.VALID_EXTENSIONS):
+                    continue
+
+                path = os.path.join(self.image_folder, entry.name)
+                stat = entry.stat()
+                seen.add(path)
+                if known.get(path) == (stat.st_size, stat.st_mtime_ns):
+                    continue
+
+                width, height, content_hash, dhash = self._describe(path, stat)
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO images (path, size, mtime_ns, width, height, content_hash, dhash) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (path, stat.st_size, stat.st_mtime_ns, width, height, content_hash, self._to_sql_hash(dhash))
+                )
+                if known_hashes.get(path) is not None:
+                    hash_index.discard(known_hashes[path], path)
+                if dhash is not None:
+                    hash_index.add(dhash, path)
+                if path not in known and width is not None:
+                    # Imagem nova entra na rodada atual em posição aleatória
+                    self.conn.execute("INSERT OR IGNORE INTO rotation (path, position) VALUES (?, random())", (path,))
+                changed += 1
+
+            removed = [(path,) for path in known if path not in seen]
+            for (path,) in removed:
+                if known_hashes.get(path) is not None:
+                    hash_index.discard(known_hashes[path], path)
+            self.conn.executemany("DELETE FROM images WHERE path = ?", removed)
+            self.conn.executemany("DELETE FROM rotation WHERE path = ?", removed)
+
+            self.conn.commit()
+
+            if changed or removed:
+                logging.info(f"🗂️ Catálogo atualizado: {changed} novas/alteradas, {len(removed)} removidas")
+            return changed + len(removed)
+
+    def near_duplicates_of_recent(self):
+        """Caminhos a até `duplicate_distance` bits de alguma imagem usada recentemente"""
+        hash_index = self._load_hash_index()
+        recent = self.conn.execute(
+            "SELECT dhash FROM history WHERE dhash IS NOT NULL ORDER BY id DESC LIMIT ?", (self.recent_window,)
+        ).fetchall()
+
+        blocked = set()
+        for (dhash,) in recent:
+            blocked.update(hash_index.search(self._from_sql_hash(dhash), self.duplicate_distance))
+        return blocked
+
+    def next_image(self, consume=True, exclude=()):
+        """Retira a próxima imagem da rodada; uma nova rodada começa quando todas já saíram.
+
+        Com consume=False a imagem só é escolhida (continua na rodada, fora do
+        histórico) até `mark_used`; `exclude` pula imagens já reservadas.
+        """
+        with self.lock:
+            self.refresh()
+
+            if self.conn.execute("SELECT 1 FROM rotation LIMIT 1").fetchone() is None:
+                self.conn.execute(
+                    "INSERT INTO rotation (path, position) SELECT path, random() FROM images WHERE width IS NOT NULL"
+                )
+                if self.conn.execute("SELECT 1 FROM rotation LIMIT 1").fetchone() is None:
+                    self.conn.commit()
+                    return None
+                logging.info("🔄 Todas as imagens já foram usadas, iniciando nova rodada")
+
+            # Pular candidatas quase idênticas às usadas recentemente (continuam na rodada)
+            blocked = self.near_duplicates_of_recent()
+            chosen = None
+            first = None
+            for (path,) in self.conn.execute("SELECT path FROM rotation ORDER BY position"):
+                if path in exclude:
+                    continue
+                if first is None:
+                    first = path
+                if path not in blocked:
+                    chosen = path
+                    break
+
+            if first is None:
+                # Todas as restantes da rodada já estão reservadas
+                self.conn.commit()
+                return None
+            if chosen is None:
+                logging.warning("⚠️ Todas as imagens restantes são parecidas com posts recentes, usando a próxima da rodada")
+                chosen = first
+
+            if consume:
+                self.mark_used(chosen)
+            else:
+                self.conn.commit()
+            return chosen
+
+    def mark_used(self, path):
+        """Tira a imagem da rodada e a registra no histórico (ela foi postada)"""
+        with self.lock:
+            dhash = self.conn.execute("SELECT dhash FROM images WHERE path = ?", (path,)).fetchone()
+            self.conn.execute("DELETE FROM rotation WHERE path = ?", (path,))
+            self.conn.execute(
+                "INSERT INTO history (path, dhash, selected_at) VALUES (?, ?, ?)",
+                (path, dhash[0] if dhash else None, time.time())
+            )
+            self.conn.commit()
+
+
+# Um catálogo por pasta, compartilhado entre geradores e threads
+_media_catalogs = {}
+_media_catalogs_lock = threading.Lock()
+
+
+def get_media_catalog(image_folder):
+    """Retorna o catálogo (único por processo) da pasta de imagens"""
+    with _media_catalogs_lock:
+        catalog = _media_catalogs.get(image_folder)
+        if catalog is None:
+            catalog = MediaCatalog(image_folder)
+            _media_catalogs[image_folder] = catalog
+        return catalog
+
+
+class KenBurnsMotionEngine:
+    """Motor de movimento (zoom, pan e parallax) para vídeos de imagem estática.
+
+    As matrizes afins de todos os frames são calculadas de uma vez por
+    (efeito, duração, resolução) e reaproveitadas; cada frame é então um único
+    cv2.warpAffine, executado em lotes num pool de threads (o OpenCV libera o
+    GIL) e enviado direto ao encoder.
+    """
+
+    EFFECTS = ("zoom_in", "zoom_out", "pan_left", "pan_right", "parallax")
+
+    def __init__(self, zoom=0.15, workers=4, batch_size=8):
+        self.zoom = zoom
+        self.workers = workers
+        self.batch_size = batch_size
+        self.tables = {}
+
+    @staticmethod
+    def _scale_about_center(scales, size, offsets_x=0.0, offsets_y=0.0):
+        """Matrizes (N, 2, 3) de escala em torno do centro seguida de translação"""
+        width, height = size
+        center_x, center_y = (width - 1) / 2, (height - 1) / 2
+        matrices = np.zeros((len(scales), 2, 3), dtype=np.float32)
+        matrices[:, 0, 0] = scales
+        matrices[:, 1, 1] = scales
+        matrices[:, 0, 2] = (1 - scales) * center_x + offsets_x
+        matrices[:, 1, 2] = (1 - scales) * center_y + offsets_y
+        return matrices
+
+    def affine_tables(self, effect, total_frames, size, foreground_size=None, foreground_position=None):
+        """Matrizes de fundo e (no parallax) de primeiro plano, calculadas uma vez por chave"""
+        key = (effect, total_frames, size, foreground_size, foreground_position)
+        if key in self.tables:
+            return self.tables[key]
+
+        width, height = size
+        progress = np.linspace(0.0, 1.0, total_frames)
+        eased = progress * progress * (3 - 2 * progress)  # smoothstep: começa e termina suave
+        zoom = self.zoom
+        foreground = None
+
+        if effect == "zoom_in":
+            background = self._scale_about_center(1 + zoom * eased, size)
+        elif effect == "zoom_out":
+            background = self._scale_about_center(1 + zoom * (1 - eased), size)
+        elif effect in ("pan_left", "pan_right"):
+            # Zoom fixo e deslocamento horizontal dentro da margem criada pelo zoom
+            margin = zoom * width / 2
+            direction = 1 if effect == "pan_left" else -1
+            offsets = direction * margin * (1 - 2 * eased)
+            background = self._scale_about_center(np.full(total_frames, 1 + zoom), size, offsets_x=offsets)
+        elif effect == "parallax":
+            # Fundo se aproxima devagar; o primeiro plano cresce e desliza mais rápido
+            background = self._scale_about_center(1 + zoom / 3 + zoom / 3 * eased, size)
+            if foreground_size is not None:
+                fg_width, fg_height = foreground_size
+                fg_x, fg_y = foreground_position
+                fg_scales = 1 + zoom / 2 * eased
+                drift = 0.03 * width * (1 - 2 * eased)
+                foreground = np.zeros((total_frames, 2, 3), dtype=np.float32)
+                foreground[:, 0, 0] = fg_scales
+                foreground[:, 1, 1] = fg_scales
+                foreground[:, 0, 2] = fg_x + (1 - fg_scales) * (fg_width - 1) / 2 + drift
+                foreground[:, 1, 2] = fg_y + (1 - fg_scales) * (fg_height - 1) / 2
+        else:
+            raise ValueError(f"Efeito desconhecido: {effect}")
+
+        self.tables[key] = (background, foreground)
+        return self.tables[key]
+
+    def render(self, background, effect, total_frames, sink, foreground=None, foreground_position=None):
+        """Gera os frames do efeito e os entrega ao sink (frame_num, frame) em ordem"""
+        from concurrent.futures import ThreadPoolExecutor
+
+        height, width = background.shape[:2]
+        size = (width, height)
+        foreground_size = None
+        if foreground is not None and effect == "parallax":
+            foreground_size = (foreground.shape[1], foreground.shape[0])
+            foreground_mask = np.full(foreground.shape[:2], 255, dtype=np.uint8)
+        else:
+            foreground = None
+
+        background_tables, foreground_tables = self.affine_tables(
+            effect, total_frames, size, foreground_size, foreground_position if foreground_size else None
+        )
+
+        def warp_frame(frame_num):
+            frame = cv2.warpAffine(background, background_tables[frame_num], size,
+                                   flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REFLECT_101)
+            if foreground_tables is not None:
+                matrix = foreground_tables[frame_num]
+                layer = cv2.warpAffine(foreground, matrix, size, flags=cv2.INTER_LINEAR)
+                mask = cv2.warpAffine(foreground_mask, matrix, size, flags=cv2.INTER_NEAREST) > 0
+                frame[mask] = layer[mask]
+            return frame
+
+        # Lotes pequenos mantêm a memória limitada e a ordem dos frames
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for start in range(0, total_frames, self.batch_size):
+                frame_numbers = range(start, min(start + self.batch_size, total_frames))
+                for frame_num, frame in zip(frame_numbers, pool.map(warp_frame, frame_numbers)):
+                    sink(frame_num, frame)
+
+
 class EbookImageVideoGenerator:
     def __init__(self):
         """Inicializa o gerador de vídeo a partir de imagens locais."""
         self.image_folder = "imgs"
     
+        # Codificador: "opencv" (cv2.VideoWriter) ou "ffmpeg" (pipe para o ffmpeg)
+        self.video_backend = "opencv"
+    
+        # Canvas 9:16 nativo: "letterbox", "blur" ou "crop" (None mantém o tamanho original)
+        self.canvas_size = (1080, 1920)
+        self.canvas_mode = "blur"
+    
+        # Movimento: None (estático), um de KenBurnsMotionEngine.EFFECTS ou "random"
+        self.motion_effect = None
+        self.motion_engine = KenBurnsMotionEngine()
+    
+        # Imagem estática codificada uma vez pelo ffmpeg (cai no laço do OpenCV se não houver ffmpeg)
+        self.still_image_fast_path = True
+    
+        # Cache de renderização: a mesma imagem com a mesma duração não é convertida de novo
+        self.render_cache = RenderCache("render_cache", max_bytes=2 * 1024 ** 3)
+    
         # Criar diretórios se não existirem
         os.makedirs(self.image_folder, exist_ok=True)
         os.makedirs("generated_videos", exist_ok=True)
 
     def get_random_image_from_folder(self):
-        """Seleciona uma imagem aleatória da pasta 'imgs'."""
+        """Seleciona a próxima imagem da pasta 'imgs' (sem repetir até usar todas)."""
         print(f"🖼️  Procurando por imagens na pasta '{self.image_folder}'...")
     
         try:
-            # Lista apenas arquivos de imagem comuns
-            valid_extensions = ('.png', '.jpg', '.jpeg', '.webp')
-            images = [f for f in os.listdir(self.image_folder) if f.lower().endswith(valid_extensions)]
+            # Catálogo persistente: só arquivos novos/alterados são reprocessados
+            image_path = get_media_catalog(self.image_folder).next_image()
         
-            if not images:
+            if not image_path:
                 print(f"❌ Erro: Nenhuma imagem encontrada na pasta '{self.image_folder}'.")
                 print("   Por favor, adicione arquivos .png, .jpg ou .jpeg nesta pasta.")
                 return None
         
-            # Escolhe uma imagem aleatoriamente
-            chosen_image_name = random.choice(images)
-            image_path = os.path.join(self.image_folder, chosen_image_name)
-        
             print(f"✅ Imagem selecionada: {image_path}")
             return image_path
 
@@ -71,6 +510,23 @@ class EbookImageVideoGenerator:
             print(f"❌ Imagem não encontrada: {image_path}")
             return None
 
+        effect = self.motion_effect
+        if effect == "random":
+            effect = random.choice(KenBurnsMotionEngine.EFFECTS)
+
+        cache_key = None
+        if self.render_cache is not None:
+            cache_params = {
+                "duration": duration, "fps": 30, "backend": self.video_backend, "still": self.still_image_fast_path,
+                "canvas_size": self.canvas_size, "canvas_mode": self.canvas_mode,
+                "motion_effect": effect, "motion_zoom": self.motion_engine.zoom if effect else None,
+            }
+            cache_key = self.render_cache.make_key("create_video_from_image", cache_params, source_path=image_path)
+            cached_path = self.render_cache.fetch(cache_key, "generated_videos")
+            if cached_path:
+                print(f"⚡ Vídeo encontrado no cache: {cached_path}")
+                return cached_path
+
         print(f"🎬 Convertendo imagem para vídeo...")
 
         img = cv2.imread(image_path)
@@ -78,34 +534,218 @@ class EbookImageVideoGenerator:
             print(f"❌ Erro ao carregar imagem: {image_path}")
             return None
 
+        # Ajustar ao canvas 9:16 nativo (dispensa o recorte no navegador)
+        foreground, foreground_position = None, None
+        if self.canvas_mode:
+            if effect == "parallax":
+                img, foreground, foreground_position = self.canvas_layers(img)
+            else:
+                img = self.normalize_to_canvas(img)
+
         height, width, _ = img.shape
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+        # Microssegundos no nome: várias conversões podem rodar em paralelo
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
         video_filename = f"generated_videos/ebook_video_{timestamp}.mp4"
     
-        fourcc = cv2.VideoWriter_fourcc(*'X264')
         fps = 30
         total_frames = duration * fps
     
-        video_writer = cv2.VideoWriter(video_filename, fourcc, fps, (width, height))
+        if effect:
+            return self.create_motion_video(img, effect, video_filename, duration, fps, cache_key, foreground, foreground_position)
+
+        # Caminho rápido: a imagem é codificada uma vez e repetida pelo encoder
+        if self.still_image_fast_path and shutil.which("ffmpeg"):
+            if self.encode_still_image(img, video_filename, duration, fps):
+                if cache_key:
+                    self.render_cache.store(cache_key, video_filename)
+                return video_filename
+            print("⚠️ Caminho rápido falhou, codificando frame a frame...")
+    
+        if self.video_backend == "ffmpeg":
+            video_writer = FFmpegPipeWriter(video_filename, fps, (width, height))
+        else:
+            fourcc = cv2.VideoWriter_fourcc(*'X264')
+            video_writer = cv2.VideoWriter(video_filename, fourcc, fps, (width, height))
         if not video_writer.isOpened():
             print("❌ Erro ao criar o arquivo de vídeo")
             return None
 
-        for frame in range(total_frames):
-            video_writer.write(img)
-            if frame % (fps * 2) == 0:
-                progress = (frame / total_frames) * 100
-                print(f"📹  Progresso: {progress:.1f}%")
-
-        video_writer.release()
+        try:
+            for frame in range(total_frames):
+                video_writer.write(img)
+                if frame % (fps * 2) == 0:
+                    progress = (frame / total_frames) * 100
+                    print(f"📹  Progresso: {progress:.1f}%")
+        finally:
+            released = video_writer.release()
+        if not self.writer_succeeded(video_writer, released, video_filename):
+            return None
         print(f"✅ Vídeo salvo: {video_filename}")
 
         if os.path.exists(video_filename) and os.path.getsize(video_filename) > 0:
+            if cache_key:
+                self.render_cache.store(cache_key, video_filename)
             return video_filename
         else:
             print("❌ Erro: Arquivo de vídeo não foi criado ou está vazio.")
             return None
 
+    def create_motion_video(self, img, effect, video_filename, duration, fps, cache_key=None, foreground=None, foreground_position=None):
+        """Gera o vídeo com efeito de movimento, enviando os frames direto ao encoder"""
+        height, width = img.shape[:2]
+        total_frames = duration * fps
+        print(f"🎥 Aplicando efeito '{effect}' ({total_frames} frames)...")
+
+        if shutil.which("ffmpeg"):
+            video_writer = FFmpegPipeWriter(video_filename, fps, (width, height))
+        else:
+            fourcc = cv2.VideoWriter_fourcc(*'X264')
+            video_writer = cv2.VideoWriter(video_filename, fourcc, fps, (width, height))
+        if not video_writer.isOpened():
+            print("❌ Erro ao criar o arquivo de vídeo")
+            return None
+
+        def write_frame(frame_num, frame):
+            video_writer.write(frame)
+            if frame_num % (fps * 2) == 0:
+                progress = (frame_num / total_frames) * 100
+                print(f"📹  Progresso: {progress:.1f}%")
+
+        start = time.perf_counter()
+        try:
+            self.motion_engine.render(img, effect, total_frames, write_frame, foreground, foreground_position)
+        finally:
+            released = video_writer.release()
+        elapsed = time.perf_counter() - start
+        if not self.writer_succeeded(video_writer, released, video_filename):
+            return None
+
+        # Acima de 1.0x o vídeo é gerado mais rápido do que sua própria duração
+        frames_per_second = total_frames / max(elapsed, 1e-9)
+        realtime_factor = frames_per_second / fps
+        print(f"⚡ {frames_per_second:.1f} frames/s ({realtime_factor:.1f}x tempo real)")
+        if realtime_factor < 1:
+            logging.warning(f"⚠️ Efeito '{effect}' abaixo do tempo real ({realtime_factor:.2f}x)")
+
+        if os.path.exists(video_filename) and os.path.getsize(video_filename) > 0:
+            print(f"✅ Vídeo salvo: {video_filename}")
+            if cache_key:
+                self.render_cache.store(cache_key, video_filename)
+            return video_filename
+
+        print("❌ Erro: Arquivo de vídeo não foi criado ou está vazio.")
+        return None
+
+    @staticmethod
+    def writer_succeeded(video_writer, released, video_filename):
+        """False (e apaga o arquivo) se o ffmpeg terminou com erro: o vídeo não vai para o cache"""
+        if not isinstance(video_writer, FFmpegPipeWriter) or released:
+            return True
+        print(f"❌ Erro no ffmpeg: {video_writer.stderr}")
+        if os.path.exists(video_filename):
+            os.remove(video_filename)
+        return False
+
+    def normalize_to_canvas(self, img):
+        """Ajusta a imagem ao canvas 9:16 (self.canvas_size) conforme self.canvas_mode.
+
+        - "letterbox": imagem inteira centralizada sobre fundo preto
+        - "blur": imagem inteira sobre uma versão ampliada e desfocada dela mesma
+        - "crop": preenche o canvas recortando a região com mais detalhes (bordas)
+        """
+        canvas, foreground, position = self.canvas_layers(img)
+        if foreground is not None:
+            canvas = canvas.copy()
+            x, y = position
+            canvas[y:y + foreground.shape[0], x:x + foreground.shape[1]] = foreground
+        return canvas
+
+    def canvas_layers(self, img):
+        """Camadas do canvas 9:16: (fundo, imagem ajustada ou None, posição da imagem)"""
+        canvas_width, canvas_height = self.canvas_size
+        height, width = img.shape[:2]
+        if (width, height) == (canvas_width, canvas_height):
+            return img, None, None
+
+        if self.canvas_mode == "crop":
+            scale = max(canvas_width / width, canvas_height / height)
+            cover_size = (max(canvas_width, math.ceil(width * scale)), max(canvas_height, math.ceil(height * scale)))
+            interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_CUBIC
+            cover = cv2.resize(img, cover_size, interpolation=interpolation)
+            x, y = self._smart_crop_offset(cover, canvas_width, canvas_height)
+            return np.ascontiguousarray(cover[y:y + canvas_height, x:x + canvas_width]), None, None
+
+        # letterbox / blur: a imagem inteira cabe no canvas
+        scale = min(canvas_width / width, canvas_height / height)
+        fit_width, fit_height = max(1, round(width * scale)), max(1, round(height * scale))
+        interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_CUBIC
+        fitted = cv2.resize(img, (fit_width, fit_height), interpolation=interpolation)
+
+        if self.canvas_mode == "blur":
+            # Desfoque feito em baixa resolução e ampliado: barato mesmo em 1080x1920
+            cover_scale = max(canvas_width / width, canvas_height / height)
+            cover_width, cover_height = max(canvas_width, math.ceil(width * cover_scale)), max(canvas_height, math.ceil(height * cover_scale))
+            small = cv2.resize(img, (max(1, cover_width // 8), max(1, cover_height // 8)), interpolation=cv2.INTER_AREA)
+            small = cv2.GaussianBlur(small, (0, 0), sigmaX=4)
+            cover = cv2.resize(small, (cover_width, cover_height), interpolation=cv2.INTER_LINEAR)
+            x, y = (cover_width - canvas_width) // 2, (cover_height - canvas_height) // 2
+            background = cv2.convertScaleAbs(cover[y:y + canvas_height, x:x + canvas_width], alpha=0.6)
+        else:
+            background = np.zeros((canvas_height, canvas_width, 3), dtype=np.uint8)
+
+        position = ((canvas_width - fit_width) // 2, (canvas_height - fit_height) // 2)
+        return background, fitted, position
+
+    @staticmethod
+    def _smart_crop_offset(img, crop_width, crop_height):
+        """Posição da janela de recorte com maior energia de bordas (Sobel)"""
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        energy = np.abs(cv2.Sobel(gray, cv2.CV_32F, 1, 0)) + np.abs(cv2.Sobel(gray, cv2.CV_32F, 0, 1))
+
+        def best_offset(profile, window):
+            if len(profile) <= window:
+                return 0
+            cumulative = np.concatenate(([0.0], np.cumsum(profile, dtype=np.float64)))
+            return int(np.argmax(cumulative[window:] - cumulative[:-window]))
+
+        return best_offset(energy.sum(axis=0), crop_width), best_offset(energy.sum(axis=1), crop_height)
+
+    def encode_still_image(self, img, video_filename, duration, fps=30):
+        """Codifica a imagem estática (BGR) uma única vez e completa a duração no ffmpeg.
+
+        O frame é enviado uma vez pelo stdin, o filtro tpad o clona até a
+        duração desejada e o x264 (tune stillimage, um único GOP) codifica um
+        keyframe seguido de frames repetidos quase sem custo.
+        """
+        import subprocess
+
+        height, width = img.shape[:2]
+        total_frames = duration * fps
+        cmd = [
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{width}x{height}",
+            "-framerate", str(fps), "-i", "-",
+            "-vf", f"pad=ceil(iw/2)*2:ceil(ih/2)*2,tpad=stop_mode=clone:stop_duration={duration}",
+            "-t", str(duration), "-r", str(fps),
+            "-c:v", "libx264", "-preset", "veryfast", "-tune", "stillimage",
+            "-g", str(total_frames), "-pix_fmt", "yuv420p",
+            "-movflags", "+faststart",
+            video_filename
+        ]
+
+        start = time.perf_counter()
+        result = subprocess.run(cmd, input=np.ascontiguousarray(img).tobytes(), capture_output=True)
+        elapsed = time.perf_counter() - start
+
+        if result.returncode != 0 or not os.path.exists(video_filename) or os.path.getsize(video_filename) == 0:
+            print(f"❌ Erro no ffmpeg: {result.stderr.decode('utf-8', errors='replace').strip()}")
+            return False
+
+        size_kb = os.path.getsize(video_filename) / 1024
+        print(f"✅ Vídeo salvo (imagem estática): {video_filename} em {elapsed:.2f}s, {size_kb:.0f} KB")
+        return True
+
     def create_video_from_local_image(self, video_duration=5):
         """Processo completo: pega uma imagem local e converte para vídeo"""
         print("🚀 Iniciando criação de vídeo a partir de imagem local...")
@@ -133,42 +773,219 @@ class EbookImageVideoGenerator:
         return image_path, video_path
 
 
+class VideoPreRenderService:
+    """Pré-renderiza em segundo plano os vídeos das imagens da pasta 'imgs'.
+
+    Um pool de threads converte as imagens (na ordem de rotação do catálogo) e mantém uma fila de MP4s prontos em
+    'generated_videos'; o job agendado só retira um vídeo pronto da fila, sem
+    codificar nada no caminho crítico da postagem. A fila é limitada a
+    `max_ready` vídeos (prontos + em conversão) para não lotar o disco.
+
+    A imagem só é reservada na rotação do catálogo; ela é marcada como usada
+    em `settle`, quando o job posta o vídeo. Vídeos prontos há mais de
+    `max_age_hours` são descartados, assim como os que sobram no encerramento.
+    """
+
+    def __init__(self, generator, workers=2, max_ready=3, video_duration=5, max_age_hours=12):
+        self.generator = generator
+        self.workers = workers
+        self.max_ready = max_ready
+        self.video_duration = video_duration
+        self.max_age = max_age_hours * 3600
+
+        self.ready_videos = queue.Queue()
+        self.in_flight = 0
+        # Imagens em conversão, prontas na fila ou em um job; as que falharam ficam
+        # reservadas para não serem convertidas de novo em loop
+        self.reserved = set()
+        self.lock = threading.Lock()
+        self.executor = None
+        self.closed = False
+
+    def start(self):
+        """Inicia o pool e enfileira as primeiras conversões"""
+        import atexit
+        from concurrent.futures import ThreadPoolExecutor
+
+        self._remove_stale_files()
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="prerender")
+        atexit.register(self.shutdown)
+        logging.info(f"🏭 Pré-renderização iniciada com {self.workers} workers (fila de {self.max_ready} vídeos)")
+        self._fill()
+
+    def _remove_stale_files(self):
+        """Apaga vídeos de execuções anteriores que ninguém consumiu (mais velhos que max_age)"""
+        if not os.path.isdir("generated_videos"):
+            return
+        cutoff = time.time() - self.max_age
+        for entry in os.scandir("generated_videos"):
+            if not (entry.name.startswith("ebook_video_") and entry.name.endswith(".mp4")):
+                continue
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+    def _fill(self):
+        """Submete conversões até completar max_ready vídeos prontos ou em andamento"""
+        catalog = get_media_catalog(self.generator.image_folder)
+        with self.lock:
+            while not self.closed and self.ready_videos.qsize() + self.in_flight < self.max_ready:
+                # Mesma rotação sem repetição usada na seleção síncrona, sem consumir a imagem
+                image_path = catalog.next_image(consume=False, exclude=self.reserved)
+                if not image_path:
+                    break
+
+                self.reserved.add(image_path)
+                self.in_flight += 1
+                self.executor.submit(self._convert, image_path)
+
+    def _convert(self, image_path):
+        """Executado no pool: converte uma imagem e publica o vídeo na fila de prontos"""
+        video_path = None
+        try:
+            video_path = self.generator.create_video_from_image(image_path, self.video_duration)
+            if video_path:
+                self.ready_videos.put((image_path, video_path, time.time()))
+                logging.info(f"📦 Vídeo pré-renderizado pronto: {video_path}")
+        except Exception as e:
+            logging.error(f"❌ Erro na pré-renderização de {image_path}: {str(e)}")
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+        # Após uma falha não repõe a fila, para não ficar convertendo em loop imagens inválidas
+        if video_path is not None:
+            self._fill()
+
+    def get_ready_video(self, timeout=0):
+        """Retira um vídeo pronto da fila; retorna (imagem, vídeo) ou (None, None).
+
+        A imagem continua reservada até o job chamar `settle`.
+        """
+        # Idade medida no início: vídeos que ficam prontos durante a chamada nunca expiram nela
+        now = time.time()
+        while True:
+            try:
+                if timeout:
+                    image_path, video_path, created_at = self.ready_videos.get(timeout=timeout)
+                else:
+                    image_path, video_path, created_at = self.ready_videos.get_nowait()
+            except queue.Empty:
+                return None, None
+
+            if now - created_at > self.max_age:
+                logging.info(f"🗑️ Vídeo pré-renderizado expirado: {video_path}")
+                self._discard(image_path, video_path)
+            elif os.path.exists(video_path):
+                self._fill()
+                return image_path, video_path
+            else:
+                logging.warning(f"⚠️ Vídeo pré-renderizado sumiu do disco: {video_path}")
+                self._discard(image_path, None)
+            self._fill()
+
+    def _discard(self, image_path, video_path):
+        """Apaga um vídeo não usado e devolve a imagem à rotação"""
+        if video_path and os.path.exists(video_path):
+            os.remove(video_path)
+        with self.lock:
+            self.reserved.discard(image_path)
+
+    def settle(self, image_path, posted):
+        """Fim do job: a imagem postada sai da rotação; senão volta a ficar disponível"""
+        with self.lock:
+            self.reserved.discard(image_path)
+        if posted:
+            get_media_catalog(self.generator.image_folder).mark_used(image_path)
+        self._fill()
+
+    def shutdown(self):
+        """Para as conversões e apaga os vídeos prontos que não foram usados"""
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+        while True:
+            try:
+                image_path, video_path, _ = self.ready_videos.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(image_path, video_path)
+
+
 class InstagramVideoBot:
-    def __init__(self, target_post_time=None):
+    def __init__(self, target_post_time=None, prerender_service=None, browser_pool=None):
         # CONFIGURAÇÕES DIRETAS
         self.username = 'xxxxxx'
         self.password = 'xxxxxx'
         self.target_post_time = target_post_time
     
+        # Sessão persistente: perfil do Chrome e cookies em browser_profiles/<conta>
+        self.instagram_session = InstagramSession(self.username, self.password)
+    
+        # Pool de navegadores (opcional): Chrome já aberto e logado, reaproveitado entre jobs
+        self.browser_pool = browser_pool
+        if self.browser_pool is not None:
+            self.browser_pool.warm(self.instagram_session)
+    
+        # Esperas por condição da página (no lugar de sleeps fixos), com tempo por etapa
+        self.page_waiter = PageWaiter()
+    
+        # Último seletor que acertou em cada etapa, tentado primeiro (selector_stats.json)
+        self.selector_stats = get_selector_stats()
+
         # API Keys - DEFINIDAS DIRETAMENTE
         self.replicate_api_key = None  # Desabilitado por enquanto
         self.groq_api_key = 'xxxxxx'
     
+        # Cliente HTTP com conexões reaproveitadas, novas tentativas e métricas de latência
+        self.http = get_http_client()
+    
+        # Disjuntores: provedor fora do ar é pulado na hora, sem esperar timeouts
+        self.circuit_breakers = get_circuit_breakers()
+        self.circuit_breakers.register_probe('groq', self.probe_groq)
+    
         # Inicializar gerador de vídeo local
         self.video_generator = EbookImageVideoGenerator()
     
+        # Serviço de pré-renderização (opcional): fornece vídeos já prontos
+        self.prerender_service = prerender_service
+        # Imagem do vídeo pré-renderizado em uso; só marcada como usada se o reel for postado
+        self.prerendered_image = None
+    
+        # Estoque de legendas pré-geradas (caption_pool_ebook.json, separado do v2, que usa o
+        # mesmo prompt com outro pedido à API); a reposição começa já, enquanto o vídeo é preparado
+        self.caption_prompt = "vídeo artístico e criativo com cores vibrantes"
+        self.caption_pool = get_caption_pool(self.request_description_from_groq, 'caption_pool_ebook.json')
+        self.caption_pool.prefetch(self.caption_prompt)
+        # Legenda do estoque reservada neste job: confirmada ou devolvida ao fim do post
+        self.reserved_caption = None
+    
         # Verificar configurações
         logging.info(f"✅ Username configurado: {self.username}")
         logging.info(f"✅ Password configurado: {'*' * len(self.password)}")
         logging.info(f"✅ GROQ_API_KEY configurada: {self.groq_api_key[:8]}...")
 
     def clean_text_for_selenium(self, text):
-        """Remove ou substitui caracteres que podem causar problemas no Selenium, mantendo emojis."""
-        # Remover caracteres de controle
-        text = ''.join(char for char in text if unicodedata.category(char) != 'Cc')
-    
-        # Remover qualquer caractere fora do BMP (Basic Multilingual Plane) - opcional, mas seguro
-        text = ''.join(char for char in text if ord(char) <= 0xFFFF)
-    
-        # Remover caracteres especiais problemáticos, mas mantendo os básicos para legendas
-        text = re.sub(r'[^\w\s.,!?@#\-_()+=<>:;"\'/\\]', '', text)
-    
-        return text.strip()
+        """Remove caracteres que podem causar problemas no Selenium, mantendo emojis, e aplica os limites do Instagram."""
+        return VIDEO_CAPTION_NORMALIZER.normalize(text)
 
     def generate_video_with_fallbacks(self):
         """Gera vídeo usando o gerador de imagens locais"""
         logging.info("🎬 Iniciando geração de vídeo a partir de imagem local...")
         
+        if self.prerender_service is not None:
+            image_path, video_path = self.prerender_service.get_ready_video()
+            if video_path:
+                logging.info(f"⚡ Usando vídeo pré-renderizado de {image_path}: {video_path}")
+                self.prerendered_image = image_path
+                return video_path
+            logging.info("ℹ️ Nenhum vídeo pré-renderizado pronto, gerando agora...")
+        
         image_path, video_path = self.video_generator.create_video_from_local_image(video_duration=5)
         
         if video_path and os.path.exists(video_path):
@@ -178,8 +995,56 @@ class InstagramVideoBot:
             logging.error("❌ Falha na geração do vídeo a partir da imagem local")
             return None
 
+    def request_description_from_groq(self, video_prompt):
+        """Pede uma descrição à API Groq com o prompt do ebook (usado pelo estoque de legendas)"""
+        url = "https://api.groq.com/openai/v1/chat/completions"
+        headers = {
+            "Authorization": f"Bearer {self.groq_api_key}",
+            "Content-Type": "application/json"
+        }
+    
+        # Usando o prompt específico do ebook
+        ebook_prompt = "Crie uma descrição cativante e persuasiva para um anúncio no Instagram do livro '100 Maneiras de Ganhar Dinheiro'. Destaque que o livro está com uma promoção imperdível. Use um tom motivador e direto, enfatizando os benefícios do livro, como ideias práticas para aumentar a renda, estratégias acessíveis para todos os públicos e a oportunidade única de adquirir o livro por um preço especial. Inclua uma chamada para ação clara, incentivando a compra imediata, e mencione que a promoção é por tempo limitado. A descrição deve ser curta, ideal para um post no Instagram, com até 100 palavras, e incluir emojis para engajamento."
+    
+        payload = {
+            "model": "llama3-8b-8192",
+            "messages": [
+                {
+                    "role": "system",
+                    "content": "Você é um especialista em marketing digital e criação de conteúdo para Instagram, especializado em promoções de ebooks e produtos digitais."
+                },
+                {
+                    "role": "user",
+                    "content": ebook_prompt
+                }
+            ],
+            "max_tokens": 300,
+            "temperature": 0.7
+        }
+    
+        if not self.circuit_breakers.allow('groq'):
+            raise RuntimeError("Groq indisponível (circuito aberto)")
+    
+        try:
+            response = self.http.post(url, label='groq', headers=headers, json=payload, timeout=15, deadline=45)
+            response.raise_for_status()
+        except Exception:
+            self.circuit_breakers.record_failure('groq')
+            raise
+        self.circuit_breakers.record_success('groq')
+        data = response.json()
+        return data['choices'][0]['message']['content'].strip()
+
+    def probe_groq(self):
+        """Sonda de saúde barata da API Groq (lista de modelos)"""
+        response = self.http.get(
+            "https://api.groq.com/openai/v1/models", label='groq_probe',
+            headers={"Authorization": f"Bearer {self.groq_api_key}"}, timeout=5, deadline=10, retries=0
+        )
+        return response.status_code == 200
+
     def generate_description_with_groq(self, video_prompt):
-        """Gera descrição usando API Groq com prompt específico do ebook"""
+        """Retira uma descrição do estoque pré-gerado com a API Groq"""
         logging.info("📝 Gerando descrição com Groq...")
     
         fallback_descriptions = [
@@ -188,43 +1053,14 @@ class InstagramVideoBot:
             "💡 OPORTUNIDADE ÚNICA! 💡\n\n📖 100 Maneiras de Ganhar Dinheiro\n🏷️ 50% OFF - Apenas R$35!\n\n🔸 Ideias práticas e eficazes\n🔸 Para iniciantes e experientes\n🔸 Aumente sua renda hoje!\n\n⏳ Promoção por tempo limitado!\n👉 CLIQUE E GARANTE! #Dinheiro #Oportunidade"
         ]
     
-        try:
-            url = "https://api.groq.com/openai/v1/chat/completions"
-            headers = {
-                "Authorization": f"Bearer {self.groq_api_key}",
-                "Content-Type": "application/json"
-            }
-        
-            # Usando o prompt específico do ebook
-            ebook_prompt = "Crie uma descrição cativante e persuasiva para um anúncio no Instagram do livro '100 Maneiras de Ganhar Dinheiro'. Destaque que o livro está com uma promoção imperdível. Use um tom motivador e direto, enfatizando os benefícios do livro, como ideias práticas para aumentar a renda, estratégias acessíveis para todos os públicos e a oportunidade única de adquirir o livro por um preço especial. Inclua uma chamada para ação clara, incentivando a compra imediata, e mencione que a promoção é por tempo limitado. A descrição deve ser curta, ideal para um post no Instagram, com até 100 palavras, e incluir emojis para engajamento."
-        
-            payload = {
-                "model": "llama3-8b-8192",
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": "Você é um especialista em marketing digital e criação de conteúdo para Instagram, especializado em promoções de ebooks e produtos digitais."
-                    },
-                    {
-                        "role": "user",
-                        "content": ebook_prompt
-                    }
-                ],
-                "max_tokens": 300,
-                "temperature": 0.7
-            }
-        
-            response = requests.post(url, headers=headers, json=payload, timeout=15)
-        
-            if response.status_code == 200:
-                data = response.json()
-                description = data['choices'][0]['message']['content'].strip()
-                logging.info(f"✅ Descrição gerada com Groq: {description}")
-                return description
-            
-        except Exception as e:
-            logging.warning(f"⚠️ Erro no Groq: {str(e)}")
+        # Não chama a API aqui: o estoque é reabastecido em segundo plano
+        description = self.caption_pool.pop(video_prompt)
+        if description:
+            self.reserved_caption = description
+            logging.info(f"✅ Descrição gerada com Groq: {description}")
+            return description
     
+        logging.warning("⚠️ Estoque de legendas vazio, reposição em andamento")
         description = random.choice(fallback_descriptions)
         logging.info(f"✅ Usando descrição fallback: {description}")
         return description
@@ -268,30 +1104,36 @@ class InstagramVideoBot:
             "//button[text()='OK']"
         ]
     
-        for i, selector in enumerate(selectors):
-            try:
-                logging.info(f"🔍 Tentando seletor #{i+1} para o botão OK...")
-                ok_button = WebDriverWait(driver, 7).until(
-                    EC.element_to_be_clickable((By.XPATH, selector))
-                )
-            
-                if ok_button.is_displayed():
-                    logging.info(f"✅ Pop-up/Botão OK encontrado com o seletor #{i+1}!")
-                    driver.execute_script("arguments[0].click();", ok_button)
-                    time.sleep(2)
-                    logging.info("✅ Botão OK clicado com sucesso via JavaScript!")
-                    return True
-                
-            except TimeoutException:
-                logging.info(f"ℹ️ Seletor #{i+1} não encontrou o botão, tentando próximo...")
-                continue # Tenta o próximo seletor
-            except Exception as e:
-                logging.warning(f"⚠️ Erro inesperado ao tentar clicar no botão OK: {str(e)}")
-                return False
+        try:
+            # Todos os seletores sondados juntos numa única espera de 7s (antes: 7s por seletor)
+            index, ok_button = probe_elements(driver, [(By.XPATH, selector) for selector in selectors], timeout=7)
+            if ok_button is not None:
+                logging.info(f"✅ Pop-up/Botão OK encontrado com o seletor #{index+1}!")
+                driver.execute_script("arguments[0].click();", ok_button)
+                time.sleep(2)
+                logging.info("✅ Botão OK clicado com sucesso via JavaScript!")
+                return True
+    
+        except Exception as e:
+            logging.warning(f"⚠️ Erro inesperado ao tentar clicar no botão OK: {str(e)}")
+            return False
 
         logging.info("ℹ️ Pop-up 'Video posts are now reels' não apareceu ou não foi encontrado. Continuando...")
         return False
 
+    def is_vertical_9_16(self, video_path):
+        """Verifica pelo próprio arquivo se o vídeo já está na proporção 9:16"""
+        capture = cv2.VideoCapture(video_path)
+        try:
+            width = capture.get(cv2.CAP_PROP_FRAME_WIDTH)
+            height = capture.get(cv2.CAP_PROP_FRAME_HEIGHT)
+        finally:
+            capture.release()
+    
+        if not width or not height:
+            return False
+        return abs(width / height - 9 / 16) < 0.01
+
     def change_video_format_to_9_16(self, driver, wait):
         """Mudar formato do vídeo para 9:16"""
         logging.info("📐 Tentando mudar formato para 9:16...")
@@ -351,38 +1193,38 @@ class InstagramVideoBot:
             f"//*[contains(text(), '{button_text}') and (@role='button' or self::button)]"
         ]
     
-        for selector in selectors:
+        # Último vencedor na frente; todos sondados juntos numa única espera de 10s
+        step = f"advance:{button_text}"
+        selectors = self.selector_stats.prioritized(step, selectors)
+        for _ in range(2):
+            index, button = probe_elements(driver, [(By.XPATH, selector) for selector in selectors], timeout=10)
+            if button is None:
+                break
+            selector = selectors[index]
+            logging.info(f"🔍 Botão encontrado com o seletor: {selector}")
+        
             try:
-                logging.info(f"🔍 Tentando seletor: {selector}")
-            
-                button = WebDriverWait(driver, 10).until(
-                    EC.element_to_be_clickable((By.XPATH, selector))
-                )
+                # Scroll para o elemento
+                driver.execute_script("arguments[0].scrollIntoView({block: 'center', behavior: 'smooth'});", button)
+                time.sleep(1)
             
-                if button.is_displayed():
-                    # Scroll para o elemento
-                    driver.execute_script("arguments[0].scrollIntoView({block: 'center', behavior: 'smooth'});", button)
-                    time.sleep(1)
-                
-                    # Tentar clicar
-                    try:
-                        button.click()
-                        logging.info(f"✅ {step_name} clicado!")
-                        time.sleep(2)
-                        return True
-                    except ElementClickInterceptedException:
-                        # Tentar JavaScript click
-                        driver.execute_script("arguments[0].click();", button)
-                        logging.info(f"✅ {step_name} clicado com JavaScript!")
-                        time.sleep(2)
-                        return True
-                    
-            except TimeoutException:
-                continue
+                # Tentar clicar
+                try:
+                    button.click()
+                    logging.info(f"✅ {step_name} clicado!")
+                except ElementClickInterceptedException:
+                    # Tentar JavaScript click
+                    driver.execute_script("arguments[0].click();", button)
+                    logging.info(f"✅ {step_name} clicado com JavaScript!")
+                self.selector_stats.record_probe(step, selectors, selector)
+                time.sleep(2)
+                return True
+        
             except Exception as e:
+                # Botão re-renderizado entre a sondagem e o clique: sonda de novo
                 logging.warning(f"⚠️ Erro no seletor: {str(e)}")
-                continue
     
+        self.selector_stats.record_probe(step, selectors, None)
         raise Exception(f"❌ Não foi possível encontrar/clicar no botão '{button_text}'")
 
     def insert_caption(self, driver, wait, caption):
@@ -476,132 +1318,222 @@ class InstagramVideoBot:
 
         return caption_inserted
 
-    def post_to_instagram(self):
-        """Função principal para postar vídeo no Instagram - Baseada na função que funciona"""
+    def open_instagram_for_upload(self):
+        """Abre o Chrome (perfil persistente), garante o login e deixa a tela de nova publicação pronta"""
+        if self.browser_pool is not None:
+            driver = self.browser_pool.lease(self.instagram_session)
+        else:
+            driver = self.instagram_session.start_driver()
+        wait = WebDriverWait(driver, 15)
+
         try:
-            logging.info("🚀 Iniciando processo de postagem automática...")
-        
-            video_path = self.generate_video_with_fallbacks()
-            if not video_path:
-                logging.error("❌ Falha na geração do vídeo. Abortando.")
-                return False
+            # Perfil/cookies válidos pulam o formulário de login e os pop-ups; um navegador do
+            # pool já está logado na página inicial
+            if self.browser_pool is None or not self.instagram_session.is_logged_in(driver):
+                self.instagram_session.ensure_logged_in(driver, wait, self.page_waiter)
+
+            # Menu de criar aberto (opção 'Post') ou diálogo de upload já na tela
+            create_menu_ready = EC.any_of(
+                EC.presence_of_element_located((By.XPATH, "//span[text()='Post']")),
+                EC.presence_of_element_located((By.CSS_SELECTOR, 'input[type="file"]'))
+            )
 
-            video_description = self.generate_description_with_groq("vídeo artístico e criativo com cores vibrantes")
+            # Encontrar e clicar no botão de nova publicação
+            create_button_selectors = [
+                'svg[aria-label="Nova publicação"]',
+                'svg[aria-label="New post"]',
+                'svg[aria-label="Create"]',
+                'a[href*="/create/"]'
+            ]
+        
+            # Último vencedor na frente; todos sondados juntos numa única espera de 15s
+            create_button_selectors = self.selector_stats.prioritized("create_button", create_button_selectors)
+            logging.info("Procurando botão criar...")
+            index, create_button = probe_elements(
+                driver, [(By.CSS_SELECTOR, selector) for selector in create_button_selectors], timeout=15)
+            winner = None if index is None else create_button_selectors[index]
+            self.selector_stats.record_probe("create_button", create_button_selectors, winner)
+            if winner is not None:
+                logging.info(f"Botão criar encontrado com: {winner}")
         
-            # A função de limpeza agora mantém os emojis
-            description_clean = self.clean_text_for_selenium(video_description)
-            logging.info(f"Descrição a ser postada: {description_clean}")
+            if create_button is None:
+                logging.info("Tentando navegar diretamente para página de criar...")
+                driver.get("https://www.instagram.com/create/select/")
+                self.page_waiter.until(driver, "página de criar", create_menu_ready, timeout=3, fixed=3)
+            else:
+                create_button.click()
+                logging.info("✅ Clicou no botão de criar post!")
+                self.page_waiter.until(driver, "menu de criar", create_menu_ready, timeout=4, fixed=3)
 
-            options = Options()
-            options.add_argument("--no-sandbox")
-            options.add_argument("--disable-dev-shm-usage")
-            options.add_argument("--disable-gpu")
-            driver = webdriver.Chrome(options=options)
-            wait = WebDriverWait(driver, 15)
+            # Tentar clicar no botão "Post" se disponível
+            try:
+                post_button_selectors = [
+                    "//div[contains(@class, 'xdj266r') and contains(@class, 'x14z9mp')]//span[text()='Post']",
+                    "//span[text()='Post']",
+                    "//div[@role='button']//span[text()='Post']"
+                ]
+            
+                # Todos os seletores sondados juntos numa única espera de 5s (antes: 5s por seletor)
+                _, post_button = probe_elements(driver, [(By.XPATH, selector) for selector in post_button_selectors], timeout=5)
+            
+                if post_button:
+                    driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", post_button)
+                    time.sleep(1)
+                    post_button.click()
+                    logging.info("✅ Clicou no botão 'Post'!")
+                    self.page_waiter.until(driver, "diálogo de upload", EC.presence_of_element_located(
+                        (By.CSS_SELECTOR, 'input[type="file"]')), timeout=4, fixed=3)
+                
+            except Exception as e:
+                logging.warning(f"Erro ao tentar clicar em 'Post', continuando: {str(e)[:50]}...")
 
+        except Exception:
             try:
-                driver.get("https://www.instagram.com/")
-                time.sleep(random.uniform(2, 5))
+                driver.save_screenshot(f"erro_debug_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png")
+                logging.info("📸 Screenshot salvo para debug")
+            except:
+                pass
+            self.release_browser(driver, healthy=False)
+            raise
+
+        return driver, wait
+
+    def release_browser(self, driver, healthy=True):
+        """Devolve o navegador ao pool (ou fecha, sem pool); healthy=False força a reciclagem"""
+        if self.browser_pool is not None:
+            self.browser_pool.release(driver, healthy)
+        else:
+            driver.quit()
 
-                # Login
-                username_field = driver.find_element(By.NAME, "username")
-                username_field.send_keys(self.username)
-                time.sleep(random.uniform(1, 3))
+    def prepare_caption(self):
+        """Retira a legenda do estoque e limpa para o Selenium"""
+        video_description = self.generate_description_with_groq(self.caption_prompt)
+    
+        # A função de limpeza agora mantém os emojis
+        description_clean = self.clean_text_for_selenium(video_description)
+        logging.info(f"Descrição a ser postada: {description_clean}")
+        return description_clean
+
+    def settle_caption(self, shared):
+        """Confirma a legenda do estoque se o reel foi compartilhado; senão, devolve ao estoque"""
+        if self.reserved_caption is None:
+            return
+        if shared:
+            self.caption_pool.commit(self.reserved_caption)
+        else:
+            self.caption_pool.restore(self.reserved_caption)
+        self.reserved_caption = None
+
+    def settle_prerendered_image(self, shared):
+        """Marca a imagem do vídeo pré-renderizado como usada se o reel foi compartilhado"""
+        if self.prerendered_image is None:
+            return
+        self.prerender_service.settle(self.prerendered_image, shared)
+        self.prerendered_image = None
+
+    def prepare_post(self):
+        """Gera o vídeo, a legenda e abre o navegador logado ao mesmo tempo.
+
+        As três etapas só se encontram no upload. Retorna (video_path, legenda,
+        driver, wait), ou None se o vídeo ou o navegador falharem; nesse caso o
+        que ficou pronto é descartado.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        durations = {}
+
+        def timed(stage, function):
+            def run():
+                started = time.perf_counter()
+                try:
+                    return function()
+                finally:
+                    durations[stage] = time.perf_counter() - started
+            return run
+
+        # Legenda e navegador passam quase todo o tempo esperando rede ou o Chrome, então threads
+        # bastam para eles. O caminho rápido da imagem parada roda no ffmpeg (outro processo);
+        # o efeito de movimento, frame a frame em Python, segura o GIL e disputa com essas threads
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = {
+                'vídeo': executor.submit(timed('vídeo', self.generate_video_with_fallbacks)),
+                'legenda': executor.submit(timed('legenda', self.prepare_caption)),
+                'navegador': executor.submit(timed('navegador', self.open_instagram_for_upload)),
+            }
+        wall_time = time.perf_counter() - started
+
+        stages = ', '.join(f"{stage} {seconds:.1f}s" for stage, seconds in durations.items())
+        logging.info(f"⏱️ Preparação: {wall_time:.1f}s em paralelo (em série seria {sum(durations.values()):.1f}s: {stages})")
 
-                password_field = driver.find_element(By.NAME, "password")
-                password_field.send_keys(self.password)
-                time.sleep(random.uniform(1, 3))
+        results = {}
+        for stage, future in futures.items():
+            try:
+                results[stage] = future.result()
+            except Exception as e:
+                logging.error(f"❌ Erro na preparação ({stage}): {e}")
+                results[stage] = None
 
-                login_button = driver.find_element(By.CSS_SELECTOR, 'button[type="submit"]')
-                login_button.click()
-                time.sleep(10)
+        video_path = results['vídeo']
+        session = results['navegador']
+        if video_path and session:
+            driver, wait = session
+            return video_path, results['legenda'] or '', driver, wait
 
-                # Lidar com pop-ups pós-login
-                try:
-                    not_now_specific = wait.until(EC.element_to_be_clickable((
-                        By.XPATH,
-                        "//div[@role='button' and contains(@class, 'x1i10hfl') and text()='Not now']"
-                    )))
-                    not_now_specific.click()
-                    logging.info("✅ Clicou no botão 'Not now'!")
-                    time.sleep(random.uniform(2, 4))
-                except TimeoutException:
-                    logging.info("Botão 'Not now' não encontrado...")
-
-                # Encontrar e clicar no botão de nova publicação
-                create_button_selectors = [
-                    'svg[aria-label="Nova publicação"]',
-                    'svg[aria-label="New post"]',
-                    'svg[aria-label="Create"]',
-                    'a[href*="/create/"]'
-                ]
-            
-                create_button = None
-                for selector in create_button_selectors:
-                    try:
-                        logging.info(f"Tentando encontrar botão criar com: {selector}")
-                        create_button = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, selector)))
-                        break
-                    except TimeoutException:
-                        continue
-            
-                if create_button is None:
-                    logging.info("Tentando navegar diretamente para página de criar...")
-                    driver.get("https://www.instagram.com/create/select/")
-                    time.sleep(3)
-                else:
-                    create_button.click()
-                    logging.info("✅ Clicou no botão de criar post!")
-                    time.sleep(random.uniform(2, 4))
+        if not video_path:
+            logging.error("❌ Falha na geração do vídeo. Abortando.")
+        if session:
+            self.release_browser(session[0])
+        if video_path and os.path.exists(video_path):
+            os.remove(video_path)
+        return None
 
-                # Tentar clicar no botão "Post" se disponível
-                try:
-                    post_button_selectors = [
-                        "//div[contains(@class, 'xdj266r') and contains(@class, 'x14z9mp')]//span[text()='Post']",
-                        "//span[text()='Post']",
-                        "//div[@role='button']//span[text()='Post']"
-                    ]
-                
-                    post_button = None
-                    for selector in post_button_selectors:
-                        try:
-                            post_button = WebDriverWait(driver, 5).until(
-                                EC.element_to_be_clickable((By.XPATH, selector))
-                            )
-                            break
-                        except TimeoutException:
-                            continue
-                
-                    if post_button:
-                        driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", post_button)
-                        time.sleep(1)
-                        post_button.click()
-                        logging.info("✅ Clicou no botão 'Post'!")
-                        time.sleep(random.uniform(2, 4))
-                    
-                except Exception as e:
-                    logging.warning(f"Erro ao tentar clicar em 'Post', continuando: {str(e)[:50]}...")
+    def post_to_instagram(self):
+        """Função principal para postar vídeo no Instagram - Baseada na função que funciona"""
+        job_started = time.perf_counter()
+        shared = False
+        try:
+            logging.info("🚀 Iniciando processo de postagem automática...")
+        
+            # Vídeo, legenda e login só dependem um do outro no upload: preparados em paralelo
+            prepared = self.prepare_post()
+            if prepared is None:
+                return False
+            video_path, description_clean, driver, wait = prepared
+            browser_healthy = True
+            success_xpath = ('//h3[contains(text(), "Your reel has been shared")] | //h3[contains(text(), "Seu reel foi compartilhado")] | '
+                             '//h3[contains(text(), "Your post has been shared")]')
 
+            try:
                 # Upload do vídeo
                 logging.info("Procurando input de arquivo...")
                 file_input = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, 'input[type="file"]')))
                 file_input.send_keys(os.path.abspath(video_path))
                 logging.info("✅ Vídeo enviado!")
-                time.sleep(random.uniform(5, 8))  # Mais tempo para vídeo
+                # Vídeo carregado: aparece o pop-up de reels, o botão de formato ou o Next
+                self.page_waiter.until(driver, "upload do vídeo", EC.any_of(
+                    EC.presence_of_element_located((By.XPATH, "//button[text()='OK']")),
+                    EC.presence_of_element_located((By.CSS_SELECTOR, 'svg[aria-label="Select crop"]')),
+                    EC.presence_of_element_located((By.XPATH, "//div[@role='button' and text()='Next']"))
+                ), timeout=8, fixed=6.5)
 
                 # NOVO: Verificar e clicar no botão OK se aparecer
                 self.handle_ok_button_after_upload(driver, wait)
 
-                # NOVO: Mudar formato para 9:16 antes do primeiro Next
-                self.change_video_format_to_9_16(driver, wait)
+                # NOVO: Mudar formato para 9:16 antes do primeiro Next (só se o vídeo ainda não for 9:16)
+                if self.is_vertical_9_16(video_path):
+                    logging.info("📐 Vídeo já está em 9:16, pulando ajuste de formato no navegador")
+                else:
+                    self.change_video_format_to_9_16(driver, wait)
 
                 # Primeiro Next
                 self.safe_click_advance(driver, wait, "primeiro Next", "Next")
-                time.sleep(random.uniform(3, 5))
+                self.page_waiter.until(driver, "tela de edição", network_idle(quiet=0.5), timeout=5, fixed=4)
 
                 # Segundo Next
                 self.safe_click_advance(driver, wait, "segundo Next", "Next")
-                time.sleep(random.uniform(3, 5))
+                self.page_waiter.until(driver, "tela de legenda", EC.presence_of_element_located(
+                    (By.CSS_SELECTOR, 'div[aria-label="Write a caption..."][contenteditable="true"]')), timeout=5, fixed=4)
 
                 # Inserir legenda
                 caption_inserted = self.insert_caption(driver, wait, description_clean)
@@ -611,7 +1543,10 @@ class InstagramVideoBot:
                 else:
                     logging.info(f"✅ Legenda final inserida: '{description_clean}'")
             
-                time.sleep(random.uniform(20, 35))
+                # Upload em segundo plano concluído: a barra de progresso sumiu (a rede do Instagram
+                # nunca fica ociosa por causa das requisições de fundo, então ela não entra aqui)
+                self.page_waiter.until(driver, "processamento do upload", EC.invisibility_of_element_located(
+                    (By.CSS_SELECTOR, '[role="progressbar"]')), timeout=35, fixed=27.5)
 
                 # Aguardar horário correto antes de compartilhar
                 logging.info("🕐 Verificando se chegou a hora de postar...")
@@ -619,23 +1554,20 @@ class InstagramVideoBot:
 
                 # Compartilhar
                 self.safe_click_advance(driver, wait, "Compartilhar", "Share")
-                time.sleep(random.uniform(85, 95))  # Mais tempo para processamento do reel
-
-                # Verificar sucesso - NOVO: Procurar pela mensagem específica de reel
-                try:
-                    # Tentar encontrar a mensagem de sucesso para reel
-                    success_message = wait.until(EC.presence_of_element_located((
-                        By.XPATH,
-                        '//h3[contains(text(), "Your reel has been shared")] | //h3[contains(text(), "Seu reel foi compartilhado")] | //h3[contains(text(), "Your post has been shared")]'
-                    )))
-                    logging.info("🎉 REEL PUBLICADO COM SUCESSO!")
-                    return True
-                except TimeoutException:
-                    logging.warning("⚠️ Reel pode ter sido publicado, mas confirmação não encontrada")
-                    return True
+                shared = True
+                published = self.page_waiter.until(driver, "publicação do reel", EC.presence_of_element_located(
+                    (By.XPATH, success_xpath)), timeout=95, fixed=90)
+
+                # Sem a mensagem de sucesso o job falha (antes seguia como se tivesse publicado)
+                if not published:
+                    logging.error("❌ Confirmação de publicação do reel não encontrada")
+                    return False
+                logging.info("🎉 REEL PUBLICADO COM SUCESSO!")
+                return True
 
             except Exception as e:
                 logging.error(f"❌ Erro durante o posting: {e}")
+                browser_healthy = False
                 try:
                     driver.save_screenshot(f"erro_debug_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png")
                     logging.info("📸 Screenshot salvo para debug")
@@ -646,7 +1578,7 @@ class InstagramVideoBot:
             finally:
                 logging.info("🔧 Limpando recursos...")
                 try:
-                    driver.quit()
+                    self.release_browser(driver, browser_healthy)
                     # Remover vídeo após uso
                     if os.path.exists(video_path):
                         os.remove(video_path)
@@ -658,6 +1590,17 @@ class InstagramVideoBot:
             logging.error(f"❌ Erro geral na postagem: {e}")
             return False
 
+        finally:
+            self.settle_caption(shared)
+            self.settle_prerendered_image(shared)
+            self.page_waiter.log_summary()
+            logging.info(f"⏱️ Tempo total do job: {time.perf_counter() - job_started:.1f}s")
+
+
+# Serviço de pré-renderização e pool de navegadores compartilhados pelos jobs agendados (iniciados em main)
+prerender_service = None
+browser_pool = None
+
 
 def job_with_timing(target_time_str, PREPARATION_MINUTES):
     """Job executado pelo scheduler"""
@@ -665,7 +1608,8 @@ def job_with_timing(target_time_str, PREPARATION_MINUTES):
 
     try:
         target_time = datetime.strptime(target_time_str, "%H:%M").time()
-        bot = InstagramVideoBot(target_post_time=target_time)
+        bot = InstagramVideoBot(target_post_time=target_time, prerender_service=prerender_service,
+                               browser_pool=browser_pool)
         success = bot.post_to_instagram()
     
         if success:
@@ -673,6 +1617,9 @@ def job_with_timing(target_time_str, PREPARATION_MINUTES):
         else:
             logging.error("❌ Job falhou!")
         
+        get_http_client().log_latency_summary()
+        get_circuit_breakers().log_summary()
+        
     except Exception as e:
         logging.error(f"❌ Erro no job: {str(e)}")
 
@@ -731,6 +1678,15 @@ def main():
     job_with_timing(POST_TIME, PREPARATION_MINUTES)
     #return #descomente caso só queira testar a psotagem e não reagendar
     """
+    # Pré-renderizar vídeos em segundo plano, fora da janela de postagem
+    global prerender_service
+    prerender_service = VideoPreRenderService(EbookImageVideoGenerator(), workers=2, max_ready=3)
+    prerender_service.start()
+
+    # Navegador aberto e logado entre os jobs (fechado ao sair do processo)
+    global browser_pool
+    browser_pool = BrowserPool()
+
     # Agendar
     current_time = datetime.now()
     if current_time.time() > datetime.strptime(start_time_str, "%H:%M").time():
@@ -0,0 +1,198 @@
+"""Saída de vídeo compartilhada pelos bots v2 e v3.
+
+FFmpegPipeWriter envia os frames direto para o ffmpeg e RenderCache guarda os
+vídeos já renderizados em render_cache/, endereçados pelo conteúdo.
+"""
+import os
+import json
+import logging
+from datetime import datetime
+
+
+class FFmpegPipeWriter:
+    """Escritor de vídeo que envia frames brutos direto para o stdin do ffmpeg.
+
+    Mesma interface do cv2.VideoWriter (isOpened/write/release), sem gravar
+    frames intermediários em disco. Aceita arrays do OpenCV/NumPy e imagens PIL.
+    """
+
+    def __init__(self, video_path, fps, frame_size, input_pix_fmt='bgr24', codec='libx264', extra_args=None):
+        import subprocess
+
+        width, height = frame_size
+        self.video_path = video_path
+        self.stderr = ''
+        self.returncode = None
+
+        cmd = [
+            'ffmpeg', '-y', '-loglevel', 'error',
+            '-f', 'rawvideo', '-pix_fmt', input_pix_fmt,
+            '-s', f'{width}x{height}', '-r', str(fps),
+            '-i', '-',
+            '-c:v', codec, '-pix_fmt', 'yuv420p',
+        ]
+        if width % 2 or height % 2:
+            # yuv420p exige dimensões pares
+            cmd += ['-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2']
+        cmd += extra_args or []
+        cmd.append(video_path)
+
+        try:
+            self.process = subprocess.Popen(
+                cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+            )
+        except OSError as e:
+            logging.error(f"❌ Não foi possível iniciar o ffmpeg: {str(e)}")
+            self.process = None
+
+    def isOpened(self):
+        return self.process is not None and self.process.poll() is None
+
+    def write(self, frame):
+        """Envia um frame (BGR/RGB conforme input_pix_fmt) para o ffmpeg"""
+        try:
+            # Arrays contíguos vão sem cópia; imagens PIL são convertidas em bytes
+            data = memoryview(frame)
+        except TypeError:
+            data = frame.tobytes()
+
+        try:
+            self.process.stdin.write(data)
+        except (BrokenPipeError, AttributeError):
+            raise RuntimeError(f"ffmpeg encerrou durante a codificação de {self.video_path}")
+
+    def release(self):
+        """Fecha o pipe, aguarda o ffmpeg e retorna True se o vídeo foi codificado"""
+        if self.process is None:
+            return self.returncode == 0
+
+        try:
+            self.process.stdin.close()
+        except BrokenPipeError:
+            pass
+
+        self.stderr = self.process.stderr.read().decode('utf-8', errors='replace')
+        self.process.stderr.close()
+        self.returncode = self.process.wait()
+        self.process = None
+        return self.returncode == 0
+
+
+class RenderCache:
+    """Cache de vídeos renderizados endereçado por conteúdo.
+
+    A chave é o hash do nome do gerador, dos seus parâmetros, da semente e do
+    digest do arquivo de origem. Os artefatos ficam em `cache_dir` com um
+    orçamento de disco; ao estourar, os menos usados recentemente (mtime) saem.
+    """
+
+    # Incrementar quando a saída dos geradores mudar, invalidando o cache antigo
+    VERSION = 1
+
+    def __init__(self, cache_dir='render_cache', max_bytes=2 * 1024 ** 3):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def file_digest(path, chunk_size=1024 * 1024):
+        """SHA-256 do conteúdo do arquivo, lido em blocos"""
+        import hashlib
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def make_key(self, generator, params, seed=None, source_path=None):
+        import hashlib
+
+        payload = {
+            'version': self.VERSION,
+            'generator': generator,
+            'params': params,
+            'seed': seed,
+            'source': self.file_digest(source_path) if source_path else None,
+        }
+        encoded = json.dumps(payload, sort_keys=True, default=str).encode('utf-8')
+        return hashlib.sha256(encoded).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, f'{key}.mp4')
+
+    def fetch(self, key, output_dir):
+        """Entrega uma cópia do artefato em cache em `output_dir` (ou None se não houver).
+
+        A cópia é um hard link quando possível, então é instantânea e pode ser
+        apagada após o post sem afetar o cache.
+        """
+        import shutil
+
+        entry_path = self._entry_path(key)
+        if not os.path.exists(entry_path):
+            return None
+
+        os.makedirs(output_dir, exist_ok=True)
+        output_path = os.path.join(output_dir, f'cached_{key[:12]}_{datetime.now().strftime("%Y%m%d_%H%M%S_%f")}.mp4')
+        try:
+            os.link(entry_path, output_path)
+        except FileNotFoundError:
+            # Despejada por outra thread entre a checagem e o link
+            return None
+        except OSError:
+            shutil.copyfile(entry_path, output_path)
+
+        # Marca como usado recentemente para a política LRU (se ainda estiver lá)
+        try:
+            os.utime(entry_path)
+        except FileNotFoundError:
+            pass
+        return output_path
+
+    def store(self, key, video_path):
+        """Guarda uma cópia do vídeo no cache e aplica o orçamento de disco"""
+        import shutil
+
+        entry_path = self._entry_path(key)
+        temp_path = f'{entry_path}.tmp'
+        try:
+            # Cópia (não link): os geradores reescrevem o mesmo caminho de saída
+            shutil.copyfile(video_path, temp_path)
+            os.replace(temp_path, entry_path)
+        except OSError as e:
+            logging.warning(f"⚠️ Não foi possível salvar no cache de renderização: {str(e)}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return False
+
+        self.evict()
+        return True
+
+    def evict(self):
+        """Remove as entradas menos usadas até caber no orçamento de disco.
+
+        Outras threads podem estar despejando ao mesmo tempo: um arquivo que some
+        no meio do caminho já foi removido por elas e é só ignorado.
+        """
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.mp4'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            total_bytes -= size
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            logging.info(f"🗑️ Cache de renderização: removido {os.path.basename(path)}")